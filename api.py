@@ -0,0 +1,246 @@
+"""
+JSON API for bulk impact calculation, served by the Dash app's Flask server.
+
+POST /api/v1/impact
+    Body: {"requests": [{"model": "o3", "provider": "azure-us",
+                         "tokens_out": 812, "tps": 400, "latency_s": 0.075}, ...]}
+    (a bare JSON list is accepted too).  Only "model" and "tokens_out" are
+    required; an "id" is echoed back.  The whole batch is evaluated with one
+    calculate_impact_batch call.
+
+    Response: {"results": [{"energy_kwh", "water_l", "carbon_kg"}, ...],
+               "totals": {"requests", "energy_kwh", "water_l", "carbon_kg"}}
+
+    With "Accept: application/x-ndjson" (or ?stream=1) the results are
+    streamed back one JSON object per line.  A request body sent as
+    "Content-Type: application/x-ndjson" is read and answered chunk by
+    chunk, so neither side has to hold a large batch in memory.
+"""
+import json
+import os
+import time
+
+from flask import Response, jsonify, request
+
+from emissions_counter.rolling import MAX_SKEW_S, RESOLUTIONS, RollingAggregator, combine, epoch_seconds
+from emissions_counter.stream import DEFAULT_CHUNK, Chunk, impact_of_chunk, invalid_row, iter_chunks
+
+NDJSON = 'application/x-ndjson'
+
+# Live fleet totals, fed by POST /api/v1/events and read by the dashboard.
+# serve.py runs one aggregator for all its workers and passes its address
+# in FLEET_ADDRESS / FLEET_AUTHKEY; otherwise each process keeps its own.
+FLEET_ADDRESS = os.environ.get('FLEET_ADDRESS')
+if FLEET_ADDRESS:
+    from emissions_counter.fleet import connect_shared, parse_address
+    fleet = connect_shared(parse_address(FLEET_ADDRESS), bytes.fromhex(os.environ['FLEET_AUTHKEY']))
+else:
+    fleet = RollingAggregator()
+
+# Accepted event times: no older than the longest ring, little clock skew
+FLEET_SPAN_S = max(width * size for width, size in RESOLUTIONS)
+
+DEFAULT_FLEET_WINDOW = 300
+
+
+class BadRequest(ValueError):
+    """Invalid batch; the message is returned to the client with HTTP 400"""
+
+
+def parse_batch(payload):
+    """Turn a decoded JSON body into a Chunk of request columns"""
+    items = payload.get('requests') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise BadRequest('expected a JSON list or {"requests": [...]}')
+    chunk = Chunk()
+    for i, item in enumerate(items):
+        try:
+            chunk.append(item)
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise BadRequest(f'requests[{i}]: missing or invalid field {exc}') from exc
+    return chunk
+
+
+def validate_batch(chunk, offset=0):
+    """Raise BadRequest naming the first row with a missing or out-of-range value
+
+    tokens_out and latency_s must be finite and >= 0, tps finite and > 0;
+    anything else would put NaN or Infinity into the response.  ``offset``
+    is the index of the chunk's first row in the whole request body.
+    """
+    bad = invalid_row(chunk)
+    if bad is not None:
+        raise BadRequest(f'requests[{offset + bad[0]}]: {bad[1]}')
+
+
+def compute_batch(chunk, offset=0):
+    """(energy_kWh, water_L, carbon_kg) arrays for a Chunk, or BadRequest"""
+    validate_batch(chunk, offset)
+    try:
+        return impact_of_chunk(chunk)
+    except KeyError as exc:
+        raise BadRequest(f'unknown model or provider: {exc.args[0]!r}') from exc
+    except (TypeError, ValueError) as exc:
+        raise BadRequest(f'non-numeric tokens_out, tps or latency_s ({exc})') from exc
+
+
+def result_records(chunk, e, w, c):
+    """Per-request result dicts, echoing "id" when the request had one"""
+    for rec, ei, wi, ci in zip(chunk.records, e.tolist(), w.tolist(), c.tolist()):
+        out = {'energy_kwh': ei, 'water_l': wi, 'carbon_kg': ci}
+        if 'id' in rec:
+            out = {'id': rec['id'], **out}
+        yield out
+
+
+def ndjson_lines(chunk, e, w, c, lines_per_write=1000):
+    """Serialise results as NDJSON, a block of lines per yielded string"""
+    block = []
+    for out in result_records(chunk, e, w, c):
+        block.append(json.dumps(out))
+        if len(block) >= lines_per_write:
+            yield '\n'.join(block) + '\n'
+            block = []
+    if block:
+        yield '\n'.join(block) + '\n'
+
+
+def record_events(chunk, e, w, c, offset=0):
+    """Add a computed chunk to the fleet totals; returns the number of events"""
+    now = time.time()
+    ts = []
+    for i, t in enumerate(chunk.ts):
+        try:
+            t = None if t is None else epoch_seconds(t)
+        except (TypeError, ValueError) as exc:
+            raise BadRequest(f'requests[{offset + i}]: invalid "ts" ({exc})') from exc
+        if t is not None and not now - FLEET_SPAN_S <= t <= now + MAX_SKEW_S:
+            raise BadRequest(f'requests[{offset + i}]: "ts" {chunk.ts[i]!r} is more than '
+                             f'{FLEET_SPAN_S}s old or {MAX_SKEW_S:g}s in the future')
+        ts.append(t)
+    return fleet.add_many(list(zip(chunk.model, chunk.provider, e.tolist(), w.tolist(), c.tolist(), ts)))
+
+
+def _totals_dict(totals):
+    n, e, w, c = totals
+    return {'requests': n, 'energy_kwh': e, 'water_l': w, 'carbon_kg': c}
+
+
+def fleet_summary(window_s=DEFAULT_FLEET_WINDOW):
+    """Cumulative and last-``window_s`` fleet totals as a JSON-ready dict"""
+    try:
+        recent = fleet.window(window_s)
+    except ValueError as exc:
+        raise BadRequest(str(exc)) from exc
+    cumulative = fleet.totals()
+    return {
+        'window_s': window_s,
+        'total': _totals_dict(combine(cumulative)),
+        'window': _totals_dict(combine(recent)),
+        'by_model': [
+            {'model': model, 'provider': provider,
+             'total': _totals_dict(totals),
+             'window': _totals_dict(recent.get((model, provider), (0, 0.0, 0.0, 0.0)))}
+            for (model, provider), totals in sorted(cumulative.items())
+        ],
+    }
+
+
+def _error(message, status=400):
+    return jsonify({'error': message}), status
+
+
+def _wants_stream():
+    return request.args.get('stream') in ('1', 'true') or \
+        request.accept_mimetypes.best == NDJSON
+
+
+def _stream_ndjson_body():
+    """Answer an NDJSON request body chunk by chunk"""
+    lines = (line.decode('utf-8') for line in request.stream)
+    try:
+        chunks = iter_chunks(lines, DEFAULT_CHUNK, validate=False)
+        first = next(chunks, None)
+        first_result = compute_batch(first) if first is not None else None
+    except (ValueError, BadRequest) as exc:
+        return _error(str(exc))
+
+    def generate():
+        if first is None:
+            return
+        yield from ndjson_lines(first, *first_result)
+        offset = len(first)
+        for chunk in chunks:
+            try:
+                yield from ndjson_lines(chunk, *compute_batch(chunk, offset))
+                offset += len(chunk)
+            except (ValueError, BadRequest) as exc:
+                # Status is already sent; report the error as the last line
+                yield json.dumps({'error': str(exc)}) + '\n'
+                return
+
+    return Response(generate(), mimetype=NDJSON)
+
+
+def impact_endpoint():
+    if request.mimetype == NDJSON:
+        return _stream_ndjson_body()
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return _error('request body must be JSON')
+    try:
+        chunk = parse_batch(payload)
+        e, w, c = compute_batch(chunk)
+    except BadRequest as exc:
+        return _error(str(exc))
+
+    if _wants_stream():
+        return Response(ndjson_lines(chunk, e, w, c), mimetype=NDJSON)
+
+    return jsonify({
+        'results': list(result_records(chunk, e, w, c)),
+        'totals': {
+            'requests': len(chunk),
+            'energy_kwh': float(e.sum()),
+            'water_l': float(w.sum()),
+            'carbon_kg': float(c.sum()),
+        },
+    })
+
+
+def events_endpoint():
+    if request.mimetype == NDJSON:
+        lines = (line.decode('utf-8') for line in request.stream)
+        ingested = 0
+        try:
+            for chunk in iter_chunks(lines, DEFAULT_CHUNK, validate=False):
+                ingested += record_events(chunk, *compute_batch(chunk, ingested), ingested)
+        except (ValueError, BadRequest) as exc:
+            return jsonify({'error': str(exc), 'ingested': ingested}), 400
+        return jsonify({'ingested': ingested})
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return _error('request body must be JSON')
+    try:
+        chunk = parse_batch(payload)
+        ingested = record_events(chunk, *compute_batch(chunk))
+    except BadRequest as exc:
+        return _error(str(exc))
+    return jsonify({'ingested': ingested})
+
+
+def fleet_endpoint():
+    try:
+        window_s = float(request.args.get('window', DEFAULT_FLEET_WINDOW))
+        return jsonify(fleet_summary(window_s))
+    except (ValueError, BadRequest) as exc:
+        return _error(str(exc))
+
+
+def register_api(server):
+    """Mount the JSON API on a Flask server (app.server)"""
+    server.add_url_rule('/api/v1/impact', 'impact_api', impact_endpoint, methods=['POST'])
+    server.add_url_rule('/api/v1/events', 'events_api', events_endpoint, methods=['POST'])
+    server.add_url_rule('/api/v1/fleet', 'fleet_api', fleet_endpoint, methods=['GET'])
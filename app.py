@@ -1,13 +1,69 @@
 import dash
-from dash import dcc, html, Input, Output, callback
-import plotly.graph_objects as go
-import plotly.express as px
-from emissions_counter.core import calculate_impact
-from counter_component import create_counter_display, counter_css
-import re
+import flask
+from dash import dcc, html, Input, Output, State, Patch, ClientsideFunction, callback, clientside_callback, ctx, no_update
+from emissions_counter.core import coefficients_version, current_defaults, on_defaults_change
+from emissions_counter.registry import Registry
+from emissions_counter.tables import ImpactTable
+from emissions_counter import tokens
+from emissions_counter.tokens import BPECounter, count_tokens, estimate_tokens, register_counter
+from api import fleet, register_api
+from emissions_counter.rolling import combine
+from counter_component import create_counter_display, create_compact_counter, compact_counter_patch
+from functools import lru_cache
+import os
+
+# Size of each callback result cache (entries)
+METRICS_CACHE_SIZE = int(os.environ.get('METRICS_CACHE_SIZE', 512))
+
+# Compute counters and chart values in the browser (assets/emissions.js)
+CLIENTSIDE = os.environ.get('CLIENTSIDE', 'False').lower() == 'true'
+
+# Render counters with CSS classes and update them with per-digit patches
+COMPACT_COUNTERS = os.environ.get('COMPACT_COUNTERS', 'False').lower() == 'true'
+
+# Pause in typing (ms) before the prompt is sent to the server callbacks
+PROMPT_DEBOUNCE_MS = int(os.environ.get('PROMPT_DEBOUNCE_MS', 300))
+
+# Response-length slider range (tokens)
+RESPONSE_MIN, RESPONSE_MAX, RESPONSE_STEP = 10, 2000, 10
+
+# Longest prompt (tokens) covered by the precomputed impact table; longer
+# prompts are computed directly
+PROMPT_TABLE_TOKENS = int(os.environ.get('PROMPT_TABLE_TOKENS', 8192))
+
+# Coefficient tables file or directory, reloaded when it changes
+COEFFICIENTS_PATH = os.environ.get('COEFFICIENTS_PATH')
+COEFFICIENTS_POLL_S = float(os.environ.get('COEFFICIENTS_POLL_S', 5))
+
+# Show live fleet totals (fed by POST /api/v1/events) under the counters
+FLEET_DASHBOARD = os.environ.get('FLEET_DASHBOARD', 'False').lower() == 'true'
+FLEET_REFRESH_MS = int(os.environ.get('FLEET_REFRESH_MS', 2000))
+FLEET_WINDOW_S = int(os.environ.get('FLEET_WINDOW_S', 300))
+
+# BPE merges (merges.txt or tokenizer.json) for the server-side prompt
+# token count; unset keeps the words / 0.75 heuristic
+TOKENIZER_FILE = os.environ.get('TOKENIZER_FILE')
+if TOKENIZER_FILE:
+    register_counter('bpe', BPECounter.from_file(TOKENIZER_FILE))
+    tokens.DEFAULT_TOKENIZER = 'bpe'
+
+class CachedLayoutDash(dash.Dash):
+    """Serializes the (static) layout once instead of on every page load"""
+    _layout_json = None
+
+    def serve_layout(self):
+        if self._layout_json is None:
+            from plotly.io.json import to_json_plotly
+            layout = self.layout() if callable(self.layout) else self.layout
+            self._layout_json = to_json_plotly(layout)
+        return flask.Response(self._layout_json, mimetype='application/json')
+
+    def invalidate_layout(self):
+        """Call after changing app.layout once the server is running"""
+        self._layout_json = None
 
 # Initialize the Dash app
-app = dash.Dash(__name__)
+app = CachedLayoutDash(__name__)
 
 # Layout with Modern Design
 app.layout = html.Div([
@@ -64,6 +120,8 @@ app.layout = html.Div([
                     'boxShadow': '0 1px 2px rgba(0,0,0,0.05)'
                 }
             ),
+            dcc.Store(id='prompt-debounced'),
+            dcc.Store(id='prompt-debounce-ms', data=PROMPT_DEBOUNCE_MS),
         ], style={'marginBottom': '24px'}),
         
         html.Div([
@@ -77,9 +135,9 @@ app.layout = html.Div([
             }),
             dcc.Slider(
                 id='response-length-slider',
-                min=10,
-                max=2000,
-                step=10,
+                min=RESPONSE_MIN,
+                max=RESPONSE_MAX,
+                step=RESPONSE_STEP,
                 value=1000,
                 marks={10: '10', 1000: '1000', 2000: '2000'},
                 tooltip={"placement": "bottom", "always_visible": True},
@@ -355,6 +413,8 @@ app.layout = html.Div([
             config={'displayModeBar': False}
         ),
         
+        dcc.Store(id='tip-flags'),
+
         html.Div(id='tips-section', style={
             'marginTop': '24px',
             'padding': '20px',
@@ -403,43 +463,69 @@ app.layout = html.Div([
     'paddingBottom': '100px'
 })
 
+# Phase times of every (model, provider) over the slider and prompt range,
+# built at startup and again whenever the coefficient tables change
+IMPACT_TABLE = ImpactTable(PROMPT_TABLE_TOKENS, RESPONSE_MAX)
+IMPACT_TABLE.rebuild()
+
+def prompt_and_response_impact(model, prompt_tokens, response_length):
+    """(energy kWh, water L, CO₂e kg) of the prompt (prefill) plus the response (decode)"""
+    return IMPACT_TABLE.lookup(model, "azure-us", prompt_tokens, response_length)
+
 # Helper functions (same as original)
-def create_impact_chart(comparison_models, prompt_tokens, response_length):
-    """Create interactive chart comparing different models"""
-    if not comparison_models:
-        comparison_models = ['o3']
-    
+def display_name(model):
+    return 'Claude-3.7' if model == 'Claude-3.7 Sonnet' else model
+
+# The cached results below are keyed on coefficients_version(), so a result
+# computed with replaced tables is never served again, even if it is
+# stored after the caches were cleared.
+def chart_models(comparison_key):
+    """The models on the comparison chart (o3 when none is selected)"""
+    return comparison_key or ('o3',)
+
+def chart_prompt_tokens(prompt_text, comparison_key):
+    """Prompt tokens for each charted model, counted with that model's tokenizer"""
+    return tuple(estimate_prompt_tokens(prompt_text, model) for model in chart_models(comparison_key))
+
+def chart_values(comparison_key, prompt_tokens, response_length):
+    """Per-model (names, CO₂e g, energy Wh, water mL) for the comparison chart
+
+    prompt_tokens is one count for every model or one per charted model."""
+    if isinstance(prompt_tokens, int):
+        prompt_tokens = (prompt_tokens,) * len(chart_models(comparison_key))
+    return _chart_values(comparison_key, tuple(prompt_tokens), response_length, coefficients_version())
+
+@lru_cache(maxsize=METRICS_CACHE_SIZE)
+def _chart_values(comparison_key, prompt_tokens, response_length, version):
     models = []
     co2_values = []
     energy_values = []
     water_values = []
     
-    for model in comparison_models:
-        if model == 'Claude-3.7 Sonnet':
-            display_name = 'Claude-3.7'
-        else:
-            display_name = model
-        models.append(display_name)
-        
-        e_prompt, w_prompt, c_prompt = calculate_impact(
-            model_name=model,
-            provider="azure-us",
-            tokens_out=prompt_tokens,
-            tps=400,
-            latency_s=0.0
-        )
-        
-        e_resp, w_resp, c_resp = calculate_impact(
-            model_name=model,
-            provider="azure-us",
-            tokens_out=response_length,
-            tps=400,
-            latency_s=0.075
-        )
-        
-        co2_values.append((c_prompt + c_resp) * 1000)
-        energy_values.append((e_prompt + e_resp) * 1000)
-        water_values.append((w_prompt + w_resp) * 1000)
+    for model, model_prompt_tokens in zip(chart_models(comparison_key), prompt_tokens):
+        models.append(display_name(model))
+        energy, water, co2 = prompt_and_response_impact(model, model_prompt_tokens, response_length)
+        co2_values.append(co2 * 1000)
+        energy_values.append(energy * 1000)
+        water_values.append(water * 1000)
+    
+    return models, co2_values, energy_values, water_values
+
+def bar_labels(co2_values, energy_values, water_values):
+    return ([f'{v:.1f}g' for v in co2_values],
+            [f'{v:.1f}Wh' for v in energy_values],
+            [f'{v:.1f}mL' for v in water_values])
+
+def create_impact_chart(comparison_models, prompt_tokens, response_length):
+    """Create interactive chart comparing different models"""
+    # Imported on first use: plotly.graph_objects is slow to import and
+    # the page can be served before any chart is built
+    import plotly.graph_objects as go
+
+    comparison_key = tuple(comparison_models) if comparison_models else ()
+    models, co2_values, energy_values, water_values = chart_values(
+        comparison_key, prompt_tokens, response_length)
+    co2_text, energy_text, water_text = bar_labels(co2_values, energy_values, water_values)
     
     fig = go.Figure()
     
@@ -449,7 +535,7 @@ def create_impact_chart(comparison_models, prompt_tokens, response_length):
         x=models,
         y=co2_values,
         marker_color='#10b981',  # Green for CO2
-        text=[f'{v:.1f}g' for v in co2_values],
+        text=co2_text,
         textposition='auto',
         textfont=dict(size=12, color='white', family='-apple-system, BlinkMacSystemFont, "Segoe UI", "Inter", sans-serif')
     ))
@@ -459,7 +545,7 @@ def create_impact_chart(comparison_models, prompt_tokens, response_length):
         x=models,
         y=energy_values,
         marker_color='#f59e0b',  # Orange for energy
-        text=[f'{v:.1f}Wh' for v in energy_values],
+        text=energy_text,
         textposition='auto',
         textfont=dict(size=12, color='white', family='-apple-system, BlinkMacSystemFont, "Segoe UI", "Inter", sans-serif')
     ))
@@ -469,7 +555,7 @@ def create_impact_chart(comparison_models, prompt_tokens, response_length):
         x=models,
         y=water_values,
         marker_color='#3b82f6',  # Blue for water
-        text=[f'{v:.1f}mL' for v in water_values],
+        text=water_text,
         textposition='auto',
         textfont=dict(size=12, color='white', family='-apple-system, BlinkMacSystemFont, "Segoe UI", "Inter", sans-serif')
     ))
@@ -499,10 +585,15 @@ def create_impact_chart(comparison_models, prompt_tokens, response_length):
     
     return fig
 
-def generate_tips(co2, energy, water, comparison_models=None):
-    """Generate interactive tips based on environmental impact and selected models"""
-    if not comparison_models:
-        comparison_models = []
+def tip_flags(co2, energy, water):
+    """The impact thresholds the tips depend on"""
+    return [energy > 0.1, water > 0.1, co2 > 0.001]
+
+@lru_cache(maxsize=METRICS_CACHE_SIZE)
+def tips_for_flags(flags, comparison_key):
+    """Tips section, based on the impact thresholds (tip_flags) and the selected models"""
+    comparison_models = comparison_key
+    high_energy, high_water, high_co2 = flags
     
     tips = []
     
@@ -520,16 +611,16 @@ def generate_tips(co2, energy, water, comparison_models=None):
         tips.append("🎯 Claude-3.7 Sonnet is efficient for general-purpose tasks")
     
     # Impact-based tips
-    if energy > 0.1:
+    if high_energy:
         if len(comparison_models) > 1:
             tips.append("⚡ Comparing multiple models increases energy usage - select only what you need")
         else:
             tips.append("⚡ High energy usage - try to be more concise")
     
-    if water > 0.1:
+    if high_water:
         tips.append("💧 Significant water usage - batch your requests when possible")
     
-    if co2 > 0.001:
+    if high_co2:
         if len(comparison_models) > 1:
             tips.append("🌱 Comparing multiple models multiplies emissions - choose one model for simple tasks")
         else:
@@ -729,67 +820,301 @@ app.index_string = '''
 </html>
 '''
 
-@callback(
-    [Output('tokens-counter', 'children'),
-     Output('words-counter', 'children'),
-     Output('energy-counter', 'children'),
-     Output('water-counter', 'children'),
-     Output('co2-counter', 'children'),
-     Output('impact-chart', 'figure'),
-     Output('tips-section', 'children')],
-    [Input('prompt-input', 'value'),
-     Input('response-length-slider', 'value'),
-     Input('model-selector', 'value'),
-     Input('model-comparison', 'value')]
-)
-def update_metrics(prompt_text, response_length, model_name, comparison_models):
-    if prompt_text:
-        words = re.findall(r'\w+', prompt_text)
-        prompt_tokens = int(len(words) / 0.75)
-    else:
-        prompt_tokens = 0
+def estimate_prompt_tokens(prompt_text, model_name=None):
+    """Prompt tokens with the model's tokenizer (the browser's heuristic in clientside mode)"""
+    if CLIENTSIDE:
+        return estimate_tokens(prompt_text)
+    return count_tokens(prompt_text, model_name)
+
+def selected_model_impact(prompt_tokens, response_length, model_name, version=None):
+    """(energy kWh, water L, CO₂e kg) of prompt + response for the selected model"""
+    if version is None:
+        version = coefficients_version()
+    return _selected_model_impact(prompt_tokens, response_length, model_name, version)
 
+@lru_cache(maxsize=METRICS_CACHE_SIZE)
+def _selected_model_impact(prompt_tokens, response_length, model_name, version):
+    if prompt_tokens + response_length <= 0:
+        return 0, 0, 0
+    return prompt_and_response_impact(model_name, prompt_tokens, response_length)
+
+# (element id, label, unit) of the five counters, in display order
+COUNTERS = [('tokens-counter', "TOKENS", ""),
+            ('words-counter', "WORDS", ""),
+            ('energy-counter', "ENERGY", "Wh"),
+            ('water-counter', "WATER", "mL"),
+            ('co2-counter', "CO₂e", "g")]
+
+def counter_values(prompt_tokens, response_length, model_name, version=None):
+    """Tokens, words, Wh, mL and g shown by the counters"""
     total_tokens = prompt_tokens + response_length
     total_words = int(total_tokens * 0.75)
+    total_energy, total_water, total_co2 = selected_model_impact(
+        prompt_tokens, response_length, model_name, version)
+
+    return (total_tokens, total_words,
+            int(total_energy*1000), int(total_water*1000), int(total_co2*1000))
+
+def counter_outputs(prompt_tokens, response_length, model_name):
+    """The five counter displays for one input state"""
+    return _counter_outputs(prompt_tokens, response_length, model_name, coefficients_version())
+
+@lru_cache(maxsize=METRICS_CACHE_SIZE)
+def _counter_outputs(prompt_tokens, response_length, model_name, version):
+    values = counter_values(prompt_tokens, response_length, model_name, version)
+    return tuple(create_counter_display(value, label, unit)
+                 for value, (_, label, unit) in zip(values, COUNTERS))
+
+# Counters: prompt, response length and model. The tip thresholds are
+# written to a store only when they flip, so typing does not re-render tips.
+COUNTER_OUTPUTS = [Output('tokens-counter', 'children'),
+                   Output('words-counter', 'children'),
+                   Output('energy-counter', 'children'),
+                   Output('water-counter', 'children'),
+                   Output('co2-counter', 'children'),
+                   Output('tip-flags', 'data')]
+# The server callbacks read the debounced copy of the prompt
+PROMPT_INPUT = Input('prompt-input', 'value') if CLIENTSIDE else Input('prompt-debounced', 'data')
+
+COUNTER_INPUTS = [PROMPT_INPUT,
+                  Input('response-length-slider', 'value'),
+                  Input('model-selector', 'value')]
+
+def update_counters(prompt_text, response_length, model_name, previous_flags):
+    prompt_tokens = estimate_prompt_tokens(prompt_text, model_name)
+    version = coefficients_version()
+    counters = _counter_outputs(prompt_tokens, response_length, model_name, version)
 
-    if total_tokens > 0:
-        e_prompt, w_prompt, c_prompt = calculate_impact(
-            model_name=model_name,
-            provider="azure-us",
-            tokens_out=prompt_tokens,
-            tps=400,
-            latency_s=0.0
-        )
-
-        e_resp, w_resp, c_resp = calculate_impact(
-            model_name=model_name,
-            provider="azure-us",
-            tokens_out=response_length,
-            tps=400,
-            latency_s=0.075
-        )
-
-        total_energy = e_prompt + e_resp
-        total_water = w_prompt + w_resp
-        total_co2 = c_prompt + c_resp
+    total_energy, total_water, total_co2 = selected_model_impact(
+        prompt_tokens, response_length, model_name, version)
+    flags = tip_flags(total_co2, total_energy, total_water)
+    return (*counters, no_update if flags == previous_flags else flags)
+
+def update_compact_counters(prompt_text, response_length, model_name, previous_flags, previous_values):
+    prompt_tokens = estimate_prompt_tokens(prompt_text, model_name)
+    version = coefficients_version()
+    values = counter_values(prompt_tokens, response_length, model_name, version)
+    previous_values = previous_values or [None] * len(COUNTERS)
+    patches = [compact_counter_patch(value, previous, label, unit)
+               for value, previous, (_, label, unit) in zip(values, previous_values, COUNTERS)]
+
+    total_energy, total_water, total_co2 = selected_model_impact(
+        prompt_tokens, response_length, model_name, version)
+    flags = tip_flags(total_co2, total_energy, total_water)
+    return (*patches, no_update if flags == previous_flags else flags, list(values))
+
+# Chart: only the bar values change while typing or sliding, so those
+# updates are sent as a Patch; the full figure is built on first load.
+def update_chart(prompt_text, response_length, comparison_models):
+    comparison_key = tuple(comparison_models) if comparison_models else ()
+    prompt_tokens = chart_prompt_tokens(prompt_text, comparison_key)
+    if ctx.triggered_id is None:
+        return create_impact_chart(comparison_models, prompt_tokens, response_length)
+
+    models, *values = chart_values(comparison_key, prompt_tokens, response_length)
+    labels = bar_labels(*values)
+
+    patched = Patch()
+    for i in range(3):
+        if ctx.triggered_id == 'model-comparison':
+            patched['data'][i]['x'] = models
+        patched['data'][i]['y'] = values[i]
+        patched['data'][i]['text'] = labels[i]
+    return patched
+
+def comparison_chart(comparison_models, prompt_text, response_length):
+    comparison_key = tuple(comparison_models) if comparison_models else ()
+    return create_impact_chart(comparison_models, chart_prompt_tokens(prompt_text, comparison_key),
+                               response_length)
+
+if CLIENTSIDE:
+    # The coefficient tables ship with the page once; keystrokes then only
+    # run the browser-side mirror of calculate_impact. The server still
+    # builds the chart when the comparison set changes and renders tips
+    # when a threshold flips.
+    app.layout.children.append(dcc.Store(id='impact-defaults', data=current_defaults()))
+    clientside_callback(
+        ClientsideFunction('emissions', 'updateCounters'),
+        COUNTER_OUTPUTS,
+        COUNTER_INPUTS,
+        [State('impact-defaults', 'data'),
+         State('tip-flags', 'data')]
+    )
+    callback(
+        Output('impact-chart', 'figure'),
+        Input('model-comparison', 'value'),
+        [State('prompt-input', 'value'),
+         State('response-length-slider', 'value')]
+    )(comparison_chart)
+    clientside_callback(
+        ClientsideFunction('emissions', 'updateChart'),
+        Output('impact-chart', 'figure', allow_duplicate=True),
+        [Input('prompt-input', 'value'),
+         Input('response-length-slider', 'value')],
+        [State('model-comparison', 'value'),
+         State('impact-chart', 'figure'),
+         State('impact-defaults', 'data')],
+        prevent_initial_call=True
+    )
+else:
+    clientside_callback(
+        ClientsideFunction('emissions', 'debouncePrompt'),
+        Output('prompt-debounced', 'data'),
+        Input('prompt-input', 'value'),
+        State('prompt-debounce-ms', 'data'),
+        prevent_initial_call=True
+    )
+    if COMPACT_COUNTERS:
+        # Counters start rendered at zero; the store remembers the values
+        # on screen so only changed digits are patched.
+        for counter_id, label, unit in COUNTERS:
+            app.layout[counter_id].children = create_compact_counter(0, label, unit)
+        app.layout.children.append(dcc.Store(id='counter-values', data=[0] * len(COUNTERS)))
+        callback(
+            COUNTER_OUTPUTS + [Output('counter-values', 'data')],
+            COUNTER_INPUTS,
+            [State('tip-flags', 'data'),
+             State('counter-values', 'data')]
+        )(update_compact_counters)
     else:
-        total_energy = 0
-        total_water = 0
-        total_co2 = 0
-
-    tokens_counter = create_counter_display(total_tokens, "TOKENS")
-    words_counter = create_counter_display(total_words, "WORDS")
-    energy_counter = create_counter_display(int(total_energy*1000), "ENERGY", "Wh")
-    water_counter = create_counter_display(int(total_water*1000), "WATER", "mL")
-    co2_counter = create_counter_display(int(total_co2*1000), "CO₂e", "g")
-    
-    chart_figure = create_impact_chart(comparison_models, prompt_tokens, response_length)
-    tips_text = generate_tips(total_co2, total_energy, total_water, comparison_models)
-    
-    return tokens_counter, words_counter, energy_counter, water_counter, co2_counter, chart_figure, tips_text
+        callback(COUNTER_OUTPUTS, COUNTER_INPUTS, State('tip-flags', 'data'))(update_counters)
+    callback(
+        Output('impact-chart', 'figure'),
+        [PROMPT_INPUT,
+         Input('response-length-slider', 'value'),
+         Input('model-comparison', 'value')]
+    )(update_chart)
+
+# Fleet view: cumulative totals from the rolling aggregator, refreshed by
+# an interval. Each refresh reads a few buckets per model, however many
+# events were ingested.
+FLEET_COUNTERS = [('fleet-requests-counter', "REQUESTS", ""),
+                  ('fleet-energy-counter', "FLEET ENERGY", "Wh"),
+                  ('fleet-water-counter', "FLEET WATER", "mL"),
+                  ('fleet-co2-counter', "FLEET CO₂e", "g")]
+
+def fleet_values():
+    """Requests, Wh, mL and g since start, and the same for the last FLEET_WINDOW_S"""
+    n, e, w, c = combine(fleet.totals())
+    wn, we, ww, wc = combine(fleet.window(FLEET_WINDOW_S))
+    return (n, int(e*1000), int(w*1000), int(c*1000)), (wn, we*1000, ww*1000, wc*1000)
+
+def fleet_window_text(window_values):
+    n, energy, water, co2 = window_values
+    minutes = FLEET_WINDOW_S / 60
+    return (f"Last {minutes:g} min: {n} requests · {energy:.1f} Wh · "
+            f"{water:.1f} mL · {co2:.1f} g CO₂e")
+
+def update_fleet(n_intervals, previous_values):
+    values, window_values = fleet_values()
+    previous_values = previous_values or [None] * len(FLEET_COUNTERS)
+    if COMPACT_COUNTERS:
+        displays = [compact_counter_patch(value, previous, label, unit)
+                    for value, previous, (_, label, unit) in zip(values, previous_values, FLEET_COUNTERS)]
+    else:
+        displays = [no_update if value == previous else create_counter_display(value, label, unit)
+                    for value, previous, (_, label, unit) in zip(values, previous_values, FLEET_COUNTERS)]
+    return (*displays, fleet_window_text(window_values), list(values))
+
+if FLEET_DASHBOARD:
+    make_counter = create_compact_counter if COMPACT_COUNTERS else create_counter_display
+    fleet_section = html.Div([
+        html.H3("Fleet (live)", style={
+            'textAlign': 'center',
+            'fontFamily': '-apple-system, BlinkMacSystemFont, "Segoe UI", "Inter", sans-serif',
+            'fontSize': '1.25rem',
+            'fontWeight': '600',
+            'color': '#111827',
+            'margin': '0 0 8px 0'
+        }),
+        html.Div([
+            html.Div(make_counter(0, label, unit), id=counter_id, style={'display': 'inline-block'})
+            for counter_id, label, unit in FLEET_COUNTERS
+        ], style={
+            'display': 'flex',
+            'flexDirection': 'row',
+            'justifyContent': 'center',
+            'alignItems': 'center',
+            'maxWidth': '900px',
+            'margin': '0 auto',
+            'gap': '16px',
+            'flexWrap': 'wrap'
+        }),
+        html.Div(fleet_window_text((0, 0.0, 0.0, 0.0)), id='fleet-window', style={
+            'textAlign': 'center',
+            'fontSize': '13px',
+            'color': '#6b7280',
+            'marginTop': '8px'
+        }),
+        dcc.Store(id='fleet-values', data=[0] * len(FLEET_COUNTERS)),
+        dcc.Interval(id='fleet-interval', interval=FLEET_REFRESH_MS)
+    ], style={'marginBottom': '40px'}, id='fleet-container')
+    position = app.layout.children.index(app.layout['counters-container']) + 1
+    app.layout.children.insert(position, fleet_section)
+    callback(
+        [Output(counter_id, 'children') for counter_id, _, _ in FLEET_COUNTERS]
+        + [Output('fleet-window', 'children'), Output('fleet-values', 'data')],
+        Input('fleet-interval', 'n_intervals'),
+        State('fleet-values', 'data')
+    )(update_fleet)
+
+# Tips: threshold flags and the comparison set
+@callback(
+    Output('tips-section', 'children'),
+    [Input('tip-flags', 'data'),
+     Input('model-comparison', 'value')]
+)
+def update_tips(flags, comparison_models):
+    comparison_key = tuple(comparison_models) if comparison_models else ()
+    return tips_for_flags(tuple(flags or (False, False, False)), comparison_key)
+
+def metrics_cache_info():
+    """Hit / miss / size counters of the callback result caches"""
+    caches = {
+        'model_impact': _selected_model_impact,
+        'counters': _counter_outputs,
+        'chart': _chart_values,
+        'tips': tips_for_flags,
+    }
+    stats = {}
+    for name, fn in caches.items():
+        info = fn.cache_info()
+        stats[name] = {'hits': info.hits, 'misses': info.misses,
+                       'size': info.currsize, 'maxsize': info.maxsize}
+    return stats
+
+@app.server.route('/_metrics-cache')
+def metrics_cache_stats():
+    return metrics_cache_info()
+
+def clear_metrics_caches():
+    """Rebuild the impact table and free the cached results of the previous coefficient tables"""
+    # Only frees memory: the caches are keyed on the coefficients version
+    for fn in (_selected_model_impact, _counter_outputs, _chart_values):
+        fn.cache_clear()
+    IMPACT_TABLE.rebuild()
+    if CLIENTSIDE:
+        app.layout['impact-defaults'].data = current_defaults()
+        app.invalidate_layout()
+
+on_defaults_change(clear_metrics_caches)
+
+# External coefficient tables: loaded at startup, then swapped in whenever
+# the files change (invalid files are reported and the old tables kept)
+registry = None
+if COEFFICIENTS_PATH:
+    registry = Registry(COEFFICIENTS_PATH)
+    registry.reload()
+    registry.watch(COEFFICIENTS_POLL_S)
+
+@app.server.route('/_coefficients')
+def coefficients_info():
+    return registry.info() if registry else {'source': 'built-in'}
+
+# Bulk JSON API (POST /api/v1/impact) and fleet ingestion (POST /api/v1/events)
+register_api(app.server)
 
 if __name__ == '__main__':
-    import os
     # Hugging Face Spaces uses port 7860, but also checks PORT env var
     port = int(os.environ.get('PORT', os.environ.get('SPACE_PORT', 7860)))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
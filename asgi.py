@@ -0,0 +1,237 @@
+"""
+ASGI front end for production serving (see serve.py).
+
+POST /api/v1/impact, POST /api/v1/events, GET /api/v1/fleet and GET
+/healthz are answered directly on the event loop; large batches and
+every call to the fleet aggregator (a proxy to another process when
+several workers share it) run in a worker thread so the loop keeps
+accepting connections.  Every other path (the Dash UI) is handed to the
+Flask app through a WSGI adapter, unless API_ONLY=true, in which case the
+Dash app is never imported.
+
+The request and response formats are the same as api.py.
+"""
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs
+
+from api import (DEFAULT_FLEET_WINDOW, NDJSON, BadRequest, compute_batch, fleet_summary,
+                 ndjson_lines, parse_batch, record_events, result_records)
+from emissions_counter.stream import DEFAULT_CHUNK, iter_chunks
+
+# Batches above this many requests are computed off the event loop
+OFFLOAD_THRESHOLD = int(os.environ.get('OFFLOAD_THRESHOLD', 4096))
+
+API_ONLY = os.environ.get('API_ONLY', 'False').lower() == 'true'
+
+
+async def _compute(chunk, offset=0):
+    if len(chunk) > OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(compute_batch, chunk, offset)
+    return compute_batch(chunk, offset)
+
+
+async def _record(chunk, e, w, c, offset=0):
+    # With several workers the aggregator is a manager proxy, so every
+    # call is a round-trip to another process; keep it off the event loop
+    return await asyncio.to_thread(record_events, chunk, e, w, c, offset)
+
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+async def _iter_body_lines(receive):
+    """Yield lists of complete lines as the request body arrives"""
+    pending = b''
+    while True:
+        message = await receive()
+        data = pending + message.get('body', b'')
+        more = message.get('more_body', False)
+        lines = data.split(b'\n')
+        pending = lines.pop() if more else b''
+        if lines:
+            yield [line.decode('utf-8') for line in lines]
+        if not more:
+            return
+
+
+async def _start(send, status, content_type):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type.encode())]})
+
+
+async def _send_json(send, status, obj):
+    await _start(send, status, 'application/json')
+    await send({'type': 'http.response.body', 'body': json.dumps(obj).encode()})
+
+
+async def _send_ndjson(send, chunk, e, w, c):
+    for block in ndjson_lines(chunk, e, w, c):
+        await send({'type': 'http.response.body', 'body': block.encode(), 'more_body': True})
+
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+async def _impact_ndjson_body(receive, send):
+    """Answer an NDJSON request body chunk by chunk while it is uploaded"""
+    started = False
+    offset = 0
+
+    async def emit(lines):
+        nonlocal started, offset
+        for chunk in iter_chunks(lines, DEFAULT_CHUNK, validate=False):
+            e, w, c = await _compute(chunk, offset)
+            offset += len(chunk)
+            if not started:
+                await _start(send, 200, NDJSON)
+                started = True
+            await _send_ndjson(send, chunk, e, w, c)
+
+    buffered = []
+    try:
+        async for lines in _iter_body_lines(receive):
+            buffered.extend(lines)
+            if len(buffered) >= DEFAULT_CHUNK:
+                await emit(buffered)
+                buffered = []
+        await emit(buffered)
+    except (ValueError, BadRequest) as exc:
+        if not started:
+            return await _send_json(send, 400, {'error': str(exc)})
+        # Status is already sent; report the error as the last line
+        error = json.dumps({'error': str(exc)}) + '\n'
+        await send({'type': 'http.response.body', 'body': error.encode()})
+        return
+
+    if not started:
+        await _start(send, 200, NDJSON)
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def impact(scope, receive, send):
+    """POST /api/v1/impact"""
+    content_type = _header(scope, b'content-type').split(';')[0].strip()
+    if content_type == NDJSON:
+        return await _impact_ndjson_body(receive, send)
+
+    try:
+        payload = json.loads(await _read_body(receive))
+    except ValueError:
+        return await _send_json(send, 400, {'error': 'request body must be JSON'})
+    try:
+        chunk = parse_batch(payload)
+        e, w, c = await _compute(chunk)
+    except BadRequest as exc:
+        return await _send_json(send, 400, {'error': str(exc)})
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    if query.get('stream', [''])[0] in ('1', 'true') or NDJSON in _header(scope, b'accept'):
+        await _start(send, 200, NDJSON)
+        await _send_ndjson(send, chunk, e, w, c)
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    await _send_json(send, 200, {
+        'results': list(result_records(chunk, e, w, c)),
+        'totals': {
+            'requests': len(chunk),
+            'energy_kwh': float(e.sum()),
+            'water_l': float(w.sum()),
+            'carbon_kg': float(c.sum()),
+        },
+    })
+
+
+async def events(scope, receive, send):
+    """POST /api/v1/events"""
+    ingested = 0
+    try:
+        if _header(scope, b'content-type').split(';')[0].strip() == NDJSON:
+            buffered = []
+            async for lines in _iter_body_lines(receive):
+                buffered.extend(lines)
+                if len(buffered) >= DEFAULT_CHUNK:
+                    for chunk in iter_chunks(buffered, DEFAULT_CHUNK, validate=False):
+                        ingested += await _record(chunk, *await _compute(chunk, ingested), ingested)
+                    buffered = []
+            for chunk in iter_chunks(buffered, DEFAULT_CHUNK, validate=False):
+                ingested += await _record(chunk, *await _compute(chunk, ingested), ingested)
+        else:
+            try:
+                payload = json.loads(await _read_body(receive))
+            except ValueError:
+                return await _send_json(send, 400, {'error': 'request body must be JSON'})
+            chunk = parse_batch(payload)
+            ingested = await _record(chunk, *await _compute(chunk))
+    except (ValueError, BadRequest) as exc:
+        return await _send_json(send, 400, {'error': str(exc), 'ingested': ingested})
+    await _send_json(send, 200, {'ingested': ingested})
+
+
+async def fleet(scope, receive, send):
+    """GET /api/v1/fleet"""
+    query = parse_qs(scope.get('query_string', b'').decode())
+    try:
+        window_s = float(query.get('window', [DEFAULT_FLEET_WINDOW])[0])
+        summary = await asyncio.to_thread(fleet_summary, window_s)
+        await _send_json(send, 200, summary)
+    except (ValueError, BadRequest) as exc:
+        await _send_json(send, 400, {'error': str(exc)})
+
+
+class ImpactASGI:
+    """Routes the API natively and everything else to ``fallback`` (a WSGI adapter)"""
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        path = scope.get('path', '')
+        if path == '/api/v1/impact':
+            if scope['method'] != 'POST':
+                return await _send_json(send, 405, {'error': 'use POST'})
+            return await impact(scope, receive, send)
+        if path == '/api/v1/events':
+            if scope['method'] != 'POST':
+                return await _send_json(send, 405, {'error': 'use POST'})
+            return await events(scope, receive, send)
+        if path == '/api/v1/fleet':
+            return await fleet(scope, receive, send)
+        if path == '/healthz':
+            return await _send_json(send, 200, {'status': 'ok'})
+        if self.fallback is not None:
+            return await self.fallback(scope, receive, send)
+        return await _send_json(send, 404, {'error': 'not found'})
+
+
+def _dash_fallback():
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError:
+        from uvicorn.middleware.wsgi import WSGIMiddleware
+    from app import app as dash_app
+    return WSGIMiddleware(dash_app.server)
+
+
+app = ImpactASGI(None if API_ONLY else _dash_fallback())
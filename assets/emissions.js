@@ -0,0 +1,275 @@
+/*
+ * Clientside helpers for app.py.
+ *
+ * debouncePrompt: forwards the prompt text to the server callbacks only
+ * after typing has paused (server mode).
+ *
+ * Clientside calculator (CLIENTSIDE=true):
+ * Mirrors emissions_counter/core.py, app.py and counter_component.py so
+ * that typing in the prompt box is handled entirely in the browser.  The
+ * Python code stays the reference: keep the arithmetic below in the same
+ * order as calculate_impact / calculate_phase_impact so both produce
+ * identical floats, and run benchmarks/check_clientside_parity.py after
+ * changing either side.
+ */
+(function (root) {
+    'use strict';
+
+    // ── emissions_counter/core.py ─────────────────────────────────────
+    const PHASE_DEFAULTS = {prefill_tps: 400, decode_tps: 400, ttft_s: 0.075, batch: 8};
+
+    const BATCH_SCALING = {
+        batch: [1, 2, 4, 8, 16, 32, 64, 128, 256],
+        factor: [4.5714, 2.8571, 1.7143, 1.0, 0.5714, 0.3214, 0.1786, 0.0893, 0.0446]
+    };
+
+    function phaseParam(spec, hw, field) {
+        if (field in spec) {
+            return spec[field];
+        }
+        return field in hw ? hw[field] : PHASE_DEFAULTS[field];
+    }
+
+    function interpolate(x, xs, ys) {
+        if (x <= xs[0]) {
+            return ys[0];
+        }
+        if (x >= xs[xs.length - 1]) {
+            return ys[ys.length - 1];
+        }
+        let i = 1;
+        while (xs[i] <= x) {
+            i++;
+        }
+        return ys[i - 1] + (ys[i] - ys[i - 1]) * (x - xs[i - 1]) / (xs[i] - xs[i - 1]);
+    }
+
+    // [gpu, non_gpu] share of one request at batch, at most 1 node (core.utilisation_at)
+    function utilisationAt(util, batch) {
+        const curve = util.by_batch;
+        let gpu, nonGpu;
+        if (curve) {
+            gpu = interpolate(batch, curve.batch, curve.gpu);
+            nonGpu = interpolate(batch, curve.batch, curve.non_gpu);
+        } else {
+            const f = interpolate(batch, BATCH_SCALING.batch, BATCH_SCALING.factor);
+            gpu = util.gpu * f;
+            nonGpu = util.non_gpu * f;
+        }
+        const total = gpu + nonGpu;
+        if (total > 1.0) {
+            return [gpu / total, nonGpu / total];
+        }
+        return [gpu, nonGpu];
+    }
+
+    // IT kW of one request at the model's batch (core.request_it_kw)
+    function requestItKw(spec, hw, util) {
+        const share = utilisationAt(util, phaseParam(spec, hw, 'batch'));
+        return hw.node_kw * (share[0] + share[1]);
+    }
+
+    function calculateImpact(defaults, modelName, tokensOut, tps, latencyS, provider) {
+        const spec = defaults.models[modelName];
+        const hw = defaults.hardware[spec.hardware];
+        const util = defaults.utilisation[spec.class];
+        const env = defaults.env[provider];
+
+        const kwhPerS = requestItKw(spec, hw, util) * env.pue / 3600;
+        const waterPerKwh = env.wue_site / env.pue + env.wue_src;
+
+        const e = (tokensOut / tps + latencyS) * kwhPerS;
+        return [e, e * waterPerKwh, e * env.cif];
+    }
+
+    function calculatePhaseImpact(defaults, modelName, promptTokens, tokensOut, provider) {
+        const spec = defaults.models[modelName];
+        const hw = defaults.hardware[spec.hardware];
+        const util = defaults.utilisation[spec.class];
+        const env = defaults.env[provider];
+
+        const kwhPerS = requestItKw(spec, hw, util) * env.pue / 3600;
+        const waterPerKwh = env.wue_site / env.pue + env.wue_src;
+        const seconds = phaseParam(spec, hw, 'ttft_s')
+            + promptTokens / phaseParam(spec, hw, 'prefill_tps')
+            + tokensOut / phaseParam(spec, hw, 'decode_tps');
+
+        const e = seconds * kwhPerS;
+        return [e, e * waterPerKwh, e * env.cif];
+    }
+
+    // ── app.py ────────────────────────────────────────────────────────
+    const WORD_RE = /[\p{L}\p{N}_]+/gu;   // Python's unicode \w
+
+    function estimatePromptTokens(promptText) {
+        if (!promptText) {
+            return 0;
+        }
+        const words = promptText.match(WORD_RE);
+        return Math.trunc((words ? words.length : 0) / 0.75);
+    }
+
+    function selectedModelImpact(defaults, promptTokens, responseLength, modelName) {
+        if (promptTokens + responseLength <= 0) {
+            return [0, 0, 0];
+        }
+        return calculatePhaseImpact(defaults, modelName, promptTokens, responseLength, 'azure-us');
+    }
+
+    function tipFlags(co2, energy, water) {
+        return [energy > 0.1, water > 0.1, co2 > 0.001];
+    }
+
+    function chartValues(defaults, comparison, promptTokens, responseLength) {
+        const models = [], co2 = [], energy = [], water = [];
+        const selected = comparison && comparison.length ? comparison : ['o3'];
+        selected.forEach(function (model) {
+            models.push(model === 'Claude-3.7 Sonnet' ? 'Claude-3.7' : model);
+            const impact = calculatePhaseImpact(defaults, model, promptTokens, responseLength, 'azure-us');
+            co2.push(impact[2] * 1000);
+            energy.push(impact[0] * 1000);
+            water.push(impact[1] * 1000);
+        });
+        return [models, co2, energy, water];
+    }
+
+    // ── counter_component.py ──────────────────────────────────────────
+    function component(type, props) {
+        return {type: type, namespace: 'dash_html_components', props: props};
+    }
+
+    const DIGIT_STYLE = {
+        display: 'block', height: '30px', lineHeight: '30px', textAlign: 'center',
+        fontFamily: 'monospace', fontSize: '24px', fontWeight: 'bold', color: '#2c3e50'
+    };
+
+    function digitWheel(value) {
+        const digits = [];
+        for (let i = 0; i < 10; i++) {
+            digits.push(component('Span', {children: String(i), style: DIGIT_STYLE}));
+        }
+        return component('Div', {
+            children: [component('Div', {
+                children: [component('Div', {
+                    children: digits,
+                    style: {transform: 'translateY(-' + (value * 30) + 'px)', transition: 'transform 0.5s ease-out'}
+                })],
+                style: {
+                    height: '30px', overflow: 'hidden', border: '2px solid #34495e',
+                    borderRadius: '4px', backgroundColor: '#ecf0f1'
+                }
+            })],
+            style: {display: 'inline-block', margin: '0 2px', verticalAlign: 'top'}
+        });
+    }
+
+    function counterDisplay(value, label, unit) {
+        const wheels = String(value).padStart(4, '0').split('').map(function (d) {
+            return digitWheel(parseInt(d, 10));
+        });
+        wheels.push(unit ? component('Span', {
+            children: unit,
+            style: {
+                fontFamily: 'monospace', fontSize: '12px', color: '#7f8c8d', fontWeight: 'bold',
+                marginLeft: '8px', verticalAlign: 'top', lineHeight: '30px'
+            }
+        }) : null);
+
+        return component('Div', {
+            children: [
+                component('Div', {
+                    children: label,
+                    style: {
+                        fontFamily: 'monospace', fontSize: '10px', color: '#7f8c8d',
+                        textAlign: 'center', marginBottom: '5px', fontWeight: 'bold'
+                    }
+                }),
+                component('Div', {children: wheels, style: {textAlign: 'center', marginBottom: '5px'}})
+            ],
+            style: {
+                padding: '12px', border: '3px solid #34495e', borderRadius: '8px',
+                backgroundColor: '#ffffff', margin: '8px', minWidth: '140px',
+                boxShadow: '3px 3px 6px rgba(0,0,0,0.3)', textAlign: 'center'
+            }
+        });
+    }
+
+    // ── Clientside callbacks ──────────────────────────────────────────
+    function noUpdate() {
+        return root.dash_clientside ? root.dash_clientside.no_update : undefined;
+    }
+
+    function updateCounters(promptText, responseLength, modelName, defaults, previousFlags) {
+        const promptTokens = estimatePromptTokens(promptText);
+        const totalTokens = promptTokens + responseLength;
+        const totalWords = Math.trunc(totalTokens * 0.75);
+        const impact = selectedModelImpact(defaults, promptTokens, responseLength, modelName);
+        const flags = tipFlags(impact[2], impact[0], impact[1]);
+        const unchanged = previousFlags && flags.every(function (f, i) { return f === previousFlags[i]; });
+
+        return [
+            counterDisplay(totalTokens, 'TOKENS', ''),
+            counterDisplay(totalWords, 'WORDS', ''),
+            counterDisplay(Math.trunc(impact[0] * 1000), 'ENERGY', 'Wh'),
+            counterDisplay(Math.trunc(impact[1] * 1000), 'WATER', 'mL'),
+            counterDisplay(Math.trunc(impact[2] * 1000), 'CO₂e', 'g'),
+            unchanged ? noUpdate() : flags
+        ];
+    }
+
+    function updateChart(promptText, responseLength, comparison, figure, defaults) {
+        if (!figure || !figure.data) {
+            return noUpdate();
+        }
+        const chart = chartValues(defaults, comparison, estimatePromptTokens(promptText), responseLength);
+        const suffixes = ['g', 'Wh', 'mL'];
+        const data = figure.data.slice(0, 3).map(function (trace, i) {
+            const values = chart[i + 1];
+            return Object.assign({}, trace, {
+                x: chart[0],
+                y: values,
+                text: values.map(function (v) { return v.toFixed(1) + suffixes[i]; })
+            });
+        });
+        return Object.assign({}, figure, {data: data});
+    }
+
+    // Resolves with the latest value once no newer call arrived within
+    // delayMs; superseded calls resolve with no_update.
+    let cancelPending = null;
+
+    function debouncePrompt(value, delayMs) {
+        if (cancelPending) {
+            cancelPending();
+        }
+        return new Promise(function (resolve) {
+            const timer = setTimeout(function () {
+                cancelPending = null;
+                resolve(value);
+            }, delayMs);
+            cancelPending = function () {
+                clearTimeout(timer);
+                resolve(noUpdate());
+            };
+        });
+    }
+
+    const api = {
+        calculateImpact: calculateImpact,
+        calculatePhaseImpact: calculatePhaseImpact,
+        estimatePromptTokens: estimatePromptTokens,
+        selectedModelImpact: selectedModelImpact,
+        chartValues: chartValues,
+        counterDisplay: counterDisplay,
+        updateCounters: updateCounters,
+        updateChart: updateChart,
+        debouncePrompt: debouncePrompt
+    };
+
+    root.dash_clientside = Object.assign({}, root.dash_clientside);
+    root.dash_clientside.emissions = Object.assign({}, root.dash_clientside.emissions, api);
+
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = api;
+    }
+})(typeof window !== 'undefined' ? window : globalThis);
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Re-deriving a year of totals after a table change: rescan vs History.
+
+Builds a History with daily buckets from N synthetic requests spread
+over a year, changes one provider's PUE, and times
+  - rescanning the events already in memory (calculate_impact_batch),
+  - rescanning them from a JSONL log (measured on a sample and scaled),
+  - History.totals() under the new tables,
+and checks the totals agree.
+
+    python benchmarks/bench_incremental.py --events 20000000
+"""
+import argparse
+import copy
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emissions_counter.batch import calculate_impact_batch
+from emissions_counter.core import DEFAULTS, install_defaults
+from emissions_counter.incremental import History
+from emissions_counter.stream import iter_chunks
+
+MODELS = list(DEFAULTS["models"])
+PROVIDERS = list(DEFAULTS["env"])
+YEAR_S = 365 * 86400.0
+
+
+def synthetic(rng, n):
+    return (rng.choice(MODELS, n), rng.choice(PROVIDERS, n), rng.integers(10, 2000, n),
+            rng.uniform(50, 800, n), rng.uniform(0.0, 1.0, n), rng.uniform(0, YEAR_S, n))
+
+
+def log_seconds_per_event(rng, n=200_000):
+    models, providers, tokens, tps, latency, ts = synthetic(rng, n)
+    buf = io.StringIO()
+    for row in zip(models.tolist(), providers.tolist(), tokens.tolist(),
+                   tps.tolist(), latency.tolist(), ts.tolist()):
+        buf.write(json.dumps(dict(zip(("model", "provider", "tokens_out", "tps", "latency_s", "ts"), row))))
+        buf.write("\n")
+    buf.seek(0)
+    t = time.perf_counter()
+    for chunk in iter_chunks(buf):
+        calculate_impact_batch(chunk.model, chunk.tokens_out, chunk.tps, chunk.latency_s, chunk.provider)
+    return (time.perf_counter() - t) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=5_000_000)
+    parser.add_argument("--batch", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    history = History(bucket_s=86400)
+    events = []
+    for start in range(0, args.events, args.batch):
+        batch = synthetic(rng, min(args.batch, args.events - start))
+        history.add(batch[0], batch[2], batch[3], batch[4], batch[1], batch[5])
+        events.append(batch)
+    print(f"history:    {history.requests} requests in {len(history.stats)} groups")
+
+    old = DEFAULTS
+    new = copy.deepcopy(old)
+    new["env"]["aws-us"]["pue"] *= 1.1
+    install_defaults(new)
+    try:
+        t = time.perf_counter()
+        rescan = np.zeros(3)
+        for models, providers, tokens, tps, latency, _ in events:
+            rescan += [v.sum() for v in calculate_impact_batch(models, tokens, tps, latency, providers)]
+        t_rescan = time.perf_counter() - t
+
+        t = time.perf_counter()
+        totals = history.totals(by=())[()]
+        t_totals = time.perf_counter() - t
+    finally:
+        install_defaults(old)
+
+    err = np.max(np.abs(np.array(totals[1:]) - rescan) / rescan)
+    t_log = log_seconds_per_event(rng) * args.events
+    print(f"rescan (log, scaled): {t_log:9.2f} s")
+    print(f"rescan (in memory):   {t_rescan:9.3f} s")
+    print(f"History.totals:       {t_totals * 1e3:9.2f} ms   max rel. diff {err:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for emissions_counter.parallel.
+
+Writes a synthetic JSONL log, then times account_parallel with 1, 2, 4 …
+workers (up to the CPU count) and prints throughput and speed-up.
+
+    python benchmarks/bench_parallel.py --requests 2000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emissions_counter.core import DEFAULTS
+from emissions_counter.parallel import account_parallel
+
+
+def write_log(path, n, seed=0):
+    rng = random.Random(seed)
+    models = list(DEFAULTS["models"])
+    providers = list(DEFAULTS["env"])
+    t0 = 1_760_000_000
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(n):
+            fh.write(json.dumps({
+                "model": rng.choice(models),
+                "provider": rng.choice(providers),
+                "tokens_out": rng.randint(1, 2000),
+                "tps": rng.choice((100, 200, 400)),
+                "latency_s": 0.075,
+                "ts": t0 + i * 0.01,
+            }))
+            fh.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--bucket", type=int, default=3600)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "requests.jsonl")
+        write_log(path, args.requests)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.requests:,} requests, {size_mb:.0f} MB")
+
+        workers, baseline, reference = 1, None, None
+        while workers <= args.max_workers:
+            start = time.perf_counter()
+            totals = account_parallel([path], workers, args.bucket, min_shard_bytes=1 << 20)
+            elapsed = time.perf_counter() - start
+
+            energy = sum(v[1] for v in totals.values())
+            if reference is None:
+                baseline, reference = elapsed, energy
+            drift = abs(energy - reference) / reference
+            print(
+                f"workers={workers:<3} {elapsed:7.2f}s  "
+                f"{args.requests / elapsed:12,.0f} req/s  "
+                f"speed-up {baseline / elapsed:5.2f}x  rel. drift {drift:.1e}"
+            )
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
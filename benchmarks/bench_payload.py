@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Callback payload benchmark for the Dash app.
+
+Replays typical interactions (typing, moving the slider, switching model,
+toggling comparison models) against app.server with Flask's test client
+and reports how many server callbacks fire and how many response bytes
+are sent.  Clientside callbacks are not counted.
+
+    python benchmarks/bench_payload.py
+    CLIENTSIDE=true python benchmarks/bench_payload.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as dash_app
+
+# Server callbacks see the prompt through the debounced store
+PROMPT = ("prompt-input", "value") if dash_app.CLIENTSIDE else ("prompt-debounced", "data")
+
+STATE = {
+    PROMPT: "Summarise the following report " * 40,
+    ("response-length-slider", "value"): 1000,
+    ("model-selector", "value"): "o3",
+    ("model-comparison", "value"): ["o3", "GPT-4o"],
+}
+
+INTERACTIONS = [
+    ("type", PROMPT, lambda v: v + "more words "),
+    ("slide", ("response-length-slider", "value"), lambda v: v + 10 if v < 2000 else 10),
+    ("model", ("model-selector", "value"), lambda v: "GPT-4o" if v == "o3" else "o3"),
+    ("compare", ("model-comparison", "value"),
+     lambda v: v + ["DeepSeek-R1"] if "DeepSeek-R1" not in v else v[:-1]),
+]
+
+
+def _outputs(key):
+    parts = key.strip(".").split("...")
+    return [{"id": p.rsplit(".", 1)[0], "property": p.rsplit(".", 1)[1]} for p in parts]
+
+
+def _value(dep, state):
+    return state.get((dep["id"], dep["property"]))
+
+
+def fire(client, changed, state):
+    """Post every server callback triggered by ``changed``; return (calls, bytes)."""
+    calls = size = 0
+    for key, cb in dash_app.app.callback_map.items():
+        if "callback" not in cb:
+            continue  # clientside: runs in the browser, no payload
+        if not any((d["id"], d["property"]) == changed for d in cb["inputs"]):
+            continue
+        outputs = _outputs(key)
+        body = {
+            "output": key,
+            "outputs": outputs if key.startswith("..") else outputs[0],
+            "inputs": [dict(d, value=_value(d, state)) for d in cb["inputs"]],
+            "state": [dict(d, value=_value(d, state)) for d in cb.get("state", [])],
+            "changedPropIds": [".".join(changed)],
+        }
+        resp = client.post("/_dash-update-component", json=body)
+        if resp.status_code == 204:
+            calls += 1
+            continue
+        if resp.status_code != 200:
+            raise RuntimeError(f"{key}: HTTP {resp.status_code}\n{resp.get_data(True)[:500]}")
+        calls += 1
+        size += len(resp.data)
+        for out_id, props in resp.get_json().get("response", {}).items():
+            for prop, value in props.items():
+                if not isinstance(value, dict) or "__dash_patch_update" not in value:
+                    state[(out_id, prop)] = value
+    return calls, size
+
+
+def main(rounds=50):
+    client = dash_app.app.server.test_client()
+    client.get("/")  # registers the global callbacks in callback_map
+    state = dict(STATE)
+    print(f"{'interaction':<10} {'callbacks':>9} {'bytes/event':>12} {'ms/event':>9}")
+    for name, changed, step in INTERACTIONS:
+        calls = size = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            state[changed] = step(state[changed])
+            c, s = fire(client, changed, state)
+            calls += c
+            size += s
+        elapsed = (time.perf_counter() - start) / rounds * 1000
+        print(f"{name:<10} {calls / rounds:9.1f} {size / rounds:12,.0f} {elapsed:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Cold-start cost of the Dash entry point.
+
+Measures, each in a fresh interpreter:
+
+    import      time to ``import app`` (module-level work included)
+    first 200   time from spawning ``python app.py`` until GET / and
+                GET /_dash-layout both answer 200
+
+then times repeated /_dash-layout requests against the running server.
+Pass --importtime to print the slowest modules from ``python -X importtime``.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_seconds():
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                         capture_output=True, text=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT,
+                         check=True, capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(url, timeout=5.0):
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        resp.read()
+        return resp.status
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if get(url) == 200:
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def first_200(port, layout_requests):
+    env = dict(os.environ, PORT=str(port), DEBUG="False")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "app.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_for(base + "/", t0 + 60)
+        t_index = time.perf_counter() - t0
+        wait_for(base + "/_dash-layout", t0 + 60)
+        t_layout = time.perf_counter() - t0
+
+        t = time.perf_counter()
+        for _ in range(layout_requests):
+            get(base + "/_dash-layout")
+        per_layout = (time.perf_counter() - t) / max(layout_requests, 1)
+        return t_index, t_layout, per_layout
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def ms(values):
+    return f"median {statistics.median(values) * 1e3:7.1f} ms   min {min(values) * 1e3:7.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--layout-requests", type=int, default=50)
+    parser.add_argument("--importtime", type=int, nargs="?", const=15, default=0,
+                        metavar="N", help="also list the N slowest imports")
+    args = parser.parse_args()
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    print(f"import app        {ms(imports)}")
+
+    runs = [first_200(free_port(), args.layout_requests) for _ in range(args.runs)]
+    print(f"first 200 /       {ms([r[0] for r in runs])}")
+    print(f"first 200 layout  {ms([r[1] for r in runs])}")
+    print(f"/_dash-layout     {ms([r[2] for r in runs])}   (warm, per request)")
+
+    if args.importtime:
+        print("\nslowest imports (cumulative):")
+        for cumulative, name in slowest_imports(args.importtime):
+            print(f"  {cumulative / 1e3:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
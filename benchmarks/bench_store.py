@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Memory and speed of EventStore against a list of per-request tuples.
+
+Appends N synthetic accounted requests in batches, then times a time
+slice and group-by sums.  The tuple baseline is measured on a smaller
+sample and scaled, since it is the thing we cannot afford at full size.
+
+    python benchmarks/bench_store.py --events 20000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emissions_counter.batch import calculate_impact_batch
+from emissions_counter.core import DEFAULTS
+from emissions_counter.store import EventStore
+
+MODELS = list(DEFAULTS["models"])
+PROVIDERS = list(DEFAULTS["env"])
+
+
+def synthetic(rng, n, t0):
+    models = rng.choice(MODELS, n)
+    providers = rng.choice(PROVIDERS, n)
+    tokens = rng.integers(10, 2000, n)
+    ts = t0 + np.sort(rng.uniform(0, 3600, n))
+    e, w, c = calculate_impact_batch(models, tokens, providers=providers)
+    return models, providers, ts, tokens, e, w, c
+
+
+def tuple_bytes_per_event(rng, n=200_000):
+    models, providers, ts, tokens, e, w, c = synthetic(rng, n, 0.0)
+    cols = [models.tolist(), providers.tolist(), ts.tolist(), tokens.tolist(),
+            e.tolist(), w.tolist(), c.tolist()]
+    tracemalloc.start()
+    rows = list(zip(*cols))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+    # the floats/ints inside the tuples were already allocated by tolist()
+    per_value = sum(sys.getsizeof(col[0]) for col in cols[2:])
+    return size / n + per_value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=5_000_000)
+    parser.add_argument("--batch", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"tuples:     ~{tuple_bytes_per_event(rng):.0f} bytes/event")
+
+    store = EventStore()
+    t_append = 0.0
+    for i, start in enumerate(range(0, args.events, args.batch)):
+        n = min(args.batch, args.events - start)
+        batch = synthetic(rng, n, i * 3600.0)
+        t = time.perf_counter()
+        store.append_batch(*batch)
+        t_append += time.perf_counter() - t
+    print(f"EventStore: {store.nbytes / len(store):.1f} bytes/event, "
+          f"{len(store):,} events, {store.nbytes / 2**20:.0f} MiB")
+    print(f"append:     {len(store) / t_append / 1e6:.1f} M events/s")
+
+    hours = args.events // args.batch or 1
+    t = time.perf_counter()
+    part = store.slice(1800.0, hours * 3600 / 2)
+    print(f"slice:      {len(part['ts']):,} events in {time.perf_counter() - t:.3f}s")
+
+    t = time.perf_counter()
+    sums = store.group_sums()
+    print(f"group-by:   {len(sums)} groups in {time.perf_counter() - t:.3f}s")
+
+    t = time.perf_counter()
+    sums = store.group_sums(by=("model",), bucket_s=3600)
+    print(f"hourly:     {len(sums)} groups in {time.perf_counter() - t:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the token-counting backends.
+
+Counts a large synthetic prompt with every backend, cold (fresh backend
+and cache) and warm (same text again through count_tokens' hash cache).
+Without --merges, a small BPE merge list is trained on the sample text
+so the BPE backend can run offline.
+
+    python benchmarks/bench_tokens.py --words 50000
+    python benchmarks/bench_tokens.py --merges path/to/tokenizer.json
+"""
+import argparse
+import collections
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emissions_counter import tokens
+
+VOCAB = ("the energy water carbon model prompt response token inference data "
+         "centre hardware utilisation naïve café 2025 H100 x_1 co₂e , . ; : ! ?").split()
+
+
+def sample_text(words, seed=0):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCAB) for _ in range(words))
+
+
+def train_merges(text, n_merges=300):
+    """Tiny BPE trainer, only so the benchmark has a merge list to load."""
+    enc = tokens.BPECounter._BYTE_ENCODER
+    words = collections.Counter(
+        tuple(enc[b] for b in piece.encode("utf-8"))
+        for piece in tokens.BPECounter.PRETOKEN_RE.findall(text)
+    )
+    merges = []
+    for _ in range(n_merges):
+        pairs = collections.Counter()
+        for word, freq in words.items():
+            for pair in zip(word, word[1:]):
+                pairs[pair] += freq
+        if not pairs:
+            break
+        best = max(pairs, key=pairs.get)
+        merges.append(best)
+        merged = collections.Counter()
+        for word, freq in words.items():
+            out, i = [], 0
+            while i < len(word):
+                if i < len(word) - 1 and (word[i], word[i + 1]) == best:
+                    out.append(word[i] + word[i + 1])
+                    i += 2
+                else:
+                    out.append(word[i])
+                    i += 1
+            merged[tuple(out)] += freq
+        words = merged
+    return merges
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--words", type=int, default=50_000)
+    parser.add_argument("--merges", help="merges.txt or tokenizer.json to load")
+    args = parser.parse_args()
+
+    text = sample_text(args.words)
+    mb = len(text.encode("utf-8")) / 1e6
+    if args.merges:
+        bpe = tokens.BPECounter.from_file(args.merges)
+    else:
+        bpe = tokens.BPECounter(train_merges(sample_text(5_000, seed=1)))
+
+    backends = {
+        "regex": tokens.RegexCounter,
+        "chars": tokens.CharRatioCounter,
+        "bpe": lambda: bpe,
+    }
+    print(f"prompt: {args.words:,} words, {mb:.2f} MB")
+    print(f"{'backend':<8} {'tokens':>9} {'cold ms':>9} {'MB/s':>8} {'cached ms':>10}")
+    for name, make in backends.items():
+        tokens.register_counter(name, make())
+        tokens.DEFAULT_TOKENIZER = name
+        n, cold = timed(tokens.count_tokens, text)
+        _, warm = timed(tokens.count_tokens, text)
+        print(f"{name:<8} {n:9,} {cold * 1000:9.2f} {mb / cold:8.1f} {warm * 1000:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Parity check between the Python calculator and assets/emissions.js.
+
+Runs the clientside functions under Node.js for a grid of inputs and
+compares them with calculate_impact, calculate_phase_impact (also with
+phase parameters and utilisation curves set in the tables), the app's counter/chart helpers and
+create_counter_display.  Exits non-zero on any mismatch.
+
+    python benchmarks/check_clientside_parity.py
+"""
+import copy
+import itertools
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import plotly
+
+import app as dash_app
+from emissions_counter.core import DEFAULTS, calculate_impact, calculate_phase_impact, install_defaults
+
+NODE_HARNESS = r"""
+const api = require(process.argv[1]);
+const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const d = input.defaults;
+const out = {
+    impact: input.impact.map(c => api.calculateImpact(d, c[0], c[1], c[2], c[3], c[4])),
+    phase: input.phase.map(c => api.calculatePhaseImpact(input.phase_defaults, c[0], c[1], c[2], c[3])),
+    tokens: input.prompts.map(p => api.estimatePromptTokens(p)),
+    counters: input.counters.map(c => api.updateCounters(c[0], c[1], c[2], d, null)),
+    chart: input.charts.map(c => api.chartValues(d, c[0], c[1], c[2])),
+};
+process.stdout.write(JSON.stringify(out));
+"""
+
+PROMPTS = [None, "", "hello", "Hello, world!", "naïve café déjà-vu", "x_1 y_2 3 4 5 " * 50]
+
+
+def main():
+    models = list(DEFAULTS["models"])
+    providers = list(DEFAULTS["env"])
+    impact = [
+        [m, t, tps, lat, p]
+        for m, p in itertools.product(models, providers)
+        for t, tps, lat in [(0, 400, 0.0), (1, 400, 0.075), (1234, 37, 0.4), (2000, 400, 0.075)]
+    ]
+    phase = [[m, pt, t, p]
+             for m, p in itertools.product(models, providers)
+             for pt, t in [(0, 0), (0, 1), (17, 10), (5000, 2000)]]
+    # phase parameters set on a model and on a hardware entry, one class
+    # with its own utilisation curve
+    phase_defaults = copy.deepcopy(DEFAULTS)
+    phase_defaults["models"]["o3"].update(prefill_tps=3100, decode_tps=37, batch=3)
+    phase_defaults["hardware"]["H100"].update(ttft_s=0.21, decode_tps=55, batch=24)
+    phase_defaults["utilisation"]["Large"]["by_batch"] = {
+        "batch": [1, 6, 40], "gpu": [0.31, 0.12, 0.02], "non_gpu": [0.2, 0.07, 0.011]}
+    counters = [[p, r, m] for p in PROMPTS for r in (10, 1000, 2000) for m in models]
+    charts = [[list(c), pt, r]
+              for c in ([], ["o3"], models) for pt in (0, 17, 5000) for r in (10, 2000)]
+
+    payload = {"defaults": DEFAULTS, "impact": impact, "prompts": PROMPTS,
+               "phase": phase, "phase_defaults": phase_defaults,
+               "counters": counters, "charts": charts}
+    proc = subprocess.run(
+        ["node", "-e", NODE_HARNESS, os.path.join(ROOT, "assets", "emissions.js")],
+        input=json.dumps(payload), capture_output=True, text=True, check=True,
+    )
+    js = json.loads(proc.stdout)
+
+    failures = []
+
+    def check(name, expected, actual):
+        if expected != actual:
+            failures.append(f"{name}: python={expected!r} js={actual!r}")
+
+    for case, got in zip(impact, js["impact"]):
+        check(f"calculate_impact{tuple(case)}", list(calculate_impact(*case[:4], provider=case[4])), got)
+    install_defaults(phase_defaults)
+    for case, got in zip(phase, js["phase"]):
+        check(f"calculate_phase_impact{tuple(case)}", list(calculate_phase_impact(*case)), got)
+    install_defaults(DEFAULTS)
+    for prompt, got in zip(PROMPTS, js["tokens"]):
+        check(f"estimate_prompt_tokens({prompt!r:.20})", dash_app.estimate_prompt_tokens(prompt), got)
+    for (prompt, r, m), got in zip(counters, js["counters"]):
+        tokens = dash_app.estimate_prompt_tokens(prompt)
+        expected = json.loads(json.dumps(
+            dash_app.counter_outputs(tokens, r, m), cls=plotly.utils.PlotlyJSONEncoder))
+        check(f"counters({prompt!r:.20}, {r}, {m})", expected, got[:5])
+    for (comparison, pt, r), got in zip(charts, js["chart"]):
+        check(f"chart_values({comparison}, {pt}, {r})",
+              [list(v) for v in dash_app.chart_values(tuple(comparison), pt, r)], got)
+
+    total = len(impact) + len(phase) + len(PROMPTS) + len(counters) + len(charts)
+    for failure in failures:
+        print(failure)
+    print(f"{total - len(failures)}/{total} cases match")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
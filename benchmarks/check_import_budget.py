@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Import budget of the core calculator.
+
+Imports each target in a fresh interpreter and checks that it
+
+    * loads no module outside the standard library (and the package),
+    * adds at most --max-modules modules to a bare interpreter, and
+    * takes at most --max-ms milliseconds (best of --runs).
+
+Exits non-zero if any target is over budget.  Meant for CI, so batch
+jobs and sidecars that only need the math keep starting in milliseconds.
+
+    python benchmarks/check_import_budget.py
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import sysconfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = ("emissions_counter", "emissions_counter.core")
+
+# The snapshot is taken before the probe imports anything itself (time is
+# already loaded at startup), and json is imported only after the module
+# list is taken, so whatever the target pulls in is counted.
+PROBE = r"""
+before = set(sys.modules)
+from time import perf_counter
+t = perf_counter()
+import {target}
+elapsed = perf_counter() - t
+{target}.calculate_impact("GPT-4o", 300)
+modules = sorted(set(sys.modules) - before)
+import json
+print(json.dumps({{"seconds": elapsed, "modules": modules}}))
+"""
+
+
+def probe(target):
+    # -I: ignore user site-packages and PYTHON* variables; the package
+    # is found through the working directory instead
+    out = subprocess.run([sys.executable, "-I", "-c", f"import sys; sys.path.insert(0, {ROOT!r})\n"
+                          + PROBE.format(target=target)],
+                         check=True, capture_output=True, text=True)
+    return json.loads(out.stdout)
+
+
+def is_stdlib(name):
+    if hasattr(sys, "stdlib_module_names"):        # Python 3.10+
+        return name in sys.stdlib_module_names
+    if name in sys.builtin_module_names:
+        return True
+    spec = importlib.util.find_spec(name)
+    origin = spec and spec.origin
+    if not origin or origin in ("built-in", "frozen"):
+        return bool(origin)
+    stdlib = os.path.normcase(os.path.realpath(sysconfig.get_paths()["stdlib"]))
+    path = os.path.normcase(os.path.realpath(origin))
+    return path.startswith(stdlib + os.sep) and "site-packages" not in path
+
+
+def third_party(modules):
+    return sorted({
+        m.split(".")[0] for m in modules
+        if not is_stdlib(m.split(".")[0]) and m.split(".")[0] != "emissions_counter"
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-ms", type=float, default=20.0)
+    parser.add_argument("--max-modules", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for target in TARGETS:
+        results = [probe(target) for _ in range(args.runs)]
+        best_ms = min(r["seconds"] for r in results) * 1e3
+        modules = results[0]["modules"]
+        foreign = third_party(modules)
+
+        problems = []
+        if foreign:
+            problems.append(f"imports non-stdlib modules: {', '.join(foreign)}")
+        if len(modules) > args.max_modules:
+            problems.append(f"{len(modules)} modules > {args.max_modules}: {' '.join(modules)}")
+        if best_ms > args.max_ms:
+            problems.append(f"{best_ms:.1f} ms > {args.max_ms:g} ms")
+
+        status = "FAIL" if problems else "ok"
+        print(f"{status:4}  import {target:24} {best_ms:6.1f} ms  {len(modules):3d} modules")
+        for problem in problems:
+            print(f"      {problem}")
+        failed |= bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
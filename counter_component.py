@@ -1,5 +1,5 @@
 import dash
-from dash import html, dcc
+from dash import html, dcc, Patch, no_update
 
 def create_digit_wheel(value, max_value=9):
     """Create a single digit wheel that scrolls like a mechanical counter"""
@@ -93,4 +93,44 @@ counter_css = """
     animation: digitRoll 0.5s ease-out;
 }
 </style>
-""" 
\ No newline at end of file
+"""
+
+# Compact counters: the static styling lives in assets/counters.css (served
+# once by Dash), each wheel is a single element whose text is the digit
+# strip, and updates are Patches that only touch the wheels whose digit
+# changed.
+DIGIT_HEIGHT = 30
+DIGIT_STRIP = "\n".join(str(i) for i in range(10))
+
+def _digit_offset(digit):
+    return {'transform': f'translateY(-{digit * DIGIT_HEIGHT}px)'}
+
+def create_compact_counter(value, label, unit=""):
+    """Counter display with the same look as create_counter_display, styled by CSS classes"""
+    value_str = str(value).zfill(4)
+    
+    return html.Div([
+        html.Div(label, className='counter-label'),
+        html.Div([
+            *[html.Div(html.Div(DIGIT_STRIP, className='digit-strip', style=_digit_offset(int(digit))),
+                       className='digit-window')
+              for digit in value_str],
+            html.Span(unit, className='counter-unit') if unit else None
+        ], className='counter-digits')
+    ], className='counter')
+
+def compact_counter_patch(value, previous, label, unit=""):
+    """Patch moving only the wheels that differ between previous and value"""
+    if value == previous:
+        return no_update
+    value_str = str(value).zfill(4)
+    previous_str = str(previous).zfill(4) if previous is not None else None
+    if previous_str is None or len(previous_str) != len(value_str):
+        return create_compact_counter(value, label, unit)
+    
+    patched = Patch()
+    wheels = patched['props']['children'][1]['props']['children']
+    for i, (old, new) in enumerate(zip(previous_str, value_str)):
+        if old != new:
+            wheels[i]['props']['children']['props']['style'] = _digit_offset(int(new))
+    return patched
@@ -0,0 +1,77 @@
+"""
+emissions_counter  –  Energy, water and carbon of LLM inference.
+
+The scalar calculator (core) needs only the standard library and is
+imported with the package.  Everything else is imported on first use,
+so ``from emissions_counter import calculate_impact`` never loads NumPy,
+pandas or any web framework:
+
+    calculate_impact, …_phase_impact     core      (standard library)
+    calculate_impact_batch / _frame,
+    calculate_phase_impact_batch         batch     numpy         [fast]
+    ImpactTable                          tables    numpy         [fast]
+    UtilisationIndex                     utilisation  numpy      [fast]
+    EventStore, RecordFile, …            store …   numpy         [fast]
+    impact_percentiles                   uncertainty  numpy      [fast]
+    Workload, sweep                      scenarios numpy, pandas [scenarios]
+    Registry                             registry  (PyYAML for .yaml) [yaml]
+    Grid                                 grid      numpy, pandas [grid]
+    History                              incremental  numpy      [fast]
+
+The names in brackets are the pip extras that install those dependencies.
+"""
+
+from .core import (
+    DEFAULTS,
+    calculate_impact,
+    calculate_phase_impact,
+    current_defaults,
+    defaults_fingerprint,
+    install_defaults,
+    invalidate_coefficients,
+    on_defaults_change,
+    update_defaults,
+)
+
+__version__ = "0.1.0"
+
+# name → submodule, imported by __getattr__ on first access
+_LAZY = {
+    "calculate_impact_batch":       "batch",
+    "calculate_impact_frame":       "batch",
+    "calculate_phase_impact_batch": "batch",
+    "ImpactTable":                  "tables",
+    "UtilisationIndex":             "utilisation",
+    "estimate_tokens":              "tokens",
+    "RollingAggregator":            "rolling",
+    "EventStore":                   "store",
+    "RecordFile":                   "records",
+    "RecordWriter":                 "records",
+    "impact_percentiles":           "uncertainty",
+    "Workload":                     "scenarios",
+    "sweep":                        "scenarios",
+    "Registry":                     "registry",
+    "Grid":                         "grid",
+    "History":                      "incremental",
+}
+
+__all__ = [
+    "DEFAULTS", "calculate_impact", "calculate_phase_impact", "current_defaults",
+    "defaults_fingerprint", "install_defaults", "invalidate_coefficients",
+    "on_defaults_change", "update_defaults",
+    *_LAZY,
+]
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,181 @@
+"""
+batch.py  –  Vectorised counterpart of core.calculate_impact.
+
+Public entry points:
+    calculate_impact_batch(model_names, tokens_out, tps, latency_s, providers)
+    calculate_phase_impact_batch(model_names, prompt_tokens, tokens_out, providers)
+    calculate_impact_frame(df)
+
+The compiled coefficient table is consulted once per unique (model,
+provider) pair; the paper equations then run as NumPy array math over
+the whole batch.  A per-request ``batch_size`` (concurrency) is looked up
+in a precomputed UtilisationIndex, so it stays vectorised too.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from .core import Coefficients, _snapshot
+from .utilisation import UtilisationIndex
+
+
+_UTILISATION = UtilisationIndex()
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Helpers
+# ────────────────────────────────────────────────────────────────────
+def _broadcast(values, n: int, dtype=None) -> np.ndarray:
+    """Turn a scalar or sequence into a length-n array."""
+    arr = np.asarray(values, dtype=dtype)
+    if arr.ndim == 0:
+        return np.full(n, arr, dtype=arr.dtype)
+    if arr.shape != (n,):
+        raise ValueError(f"expected {n} values, got shape {arr.shape}")
+    return arr
+
+
+def _resolve_pairs(
+    models: np.ndarray,
+    providers: np.ndarray,
+    fields: Tuple[str, ...] = ("kwh_per_s", "water_per_kwh", "cif"),
+    batch_size=None,
+):
+    """
+    Look up the compiled coefficients once for each unique (model, provider).
+
+    Returns one array per Coefficients field in ``fields``, expanded to
+    batch length.  With ``batch_size`` (scalar or per request), kwh_per_s
+    is taken at that concurrency instead of the model's batch.
+    """
+    model_keys, model_idx = np.unique(models.astype(str), return_inverse=True)
+    prov_keys, prov_idx   = np.unique(providers.astype(str), return_inverse=True)
+
+    active = _snapshot()         # table, env and utilisation of the same version
+    table = active.table
+    k = np.array([
+        [table[model_name, provider] for provider in prov_keys.tolist()]
+        for model_name in model_keys.tolist()
+    ], dtype=float).reshape(len(model_keys), len(prov_keys), len(Coefficients._fields))
+    model_idx, prov_idx = model_idx.reshape(-1), prov_idx.reshape(-1)
+    k = k[model_idx, prov_idx]
+    out = [k[:, Coefficients._fields.index(f)] for f in fields]
+
+    if batch_size is not None and "kwh_per_s" in fields:
+        env = active.cfg["env"]
+        pue = np.array([env[provider]["pue"] for provider in prov_keys.tolist()])[prov_idx]
+        it_kw = _UTILISATION.it_kw(model_idx, model_keys.tolist(), batch_size, active)
+        out[fields.index("kwh_per_s")] = it_kw * pue / 3600
+    return tuple(out)
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Public helpers
+# ────────────────────────────────────────────────────────────────────
+def calculate_impact_batch(
+    model_names,
+    tokens_out,
+    tps=400,
+    latency_s=0.075,
+    providers="azure-us",
+    batch_size=None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return (energy_kWh, water_L, carbon_kg) arrays for a batch of queries.
+
+    Every argument may be a scalar (applied to the whole batch) or a
+    1-D sequence; the batch length is taken from the first non-scalar
+    argument.  Unknown models or providers raise KeyError, as in
+    calculate_impact.  ``batch_size`` (concurrent requests on the node)
+    defaults to each model's batch in the tables.
+    """
+    lengths = [
+        np.shape(v)[0]
+        for v in (model_names, tokens_out, tps, latency_s, providers, batch_size)
+        if np.ndim(v) > 0
+    ]
+    n = lengths[0] if lengths else 1
+
+    models    = _broadcast(model_names, n)
+    provs     = _broadcast(providers, n)
+    tokens    = _broadcast(tokens_out, n, dtype=float)
+    tps_arr   = _broadcast(tps, n, dtype=float)
+    latency   = _broadcast(latency_s, n, dtype=float)
+    batch     = None if batch_size is None else _broadcast(batch_size, n, dtype=float)
+
+    if n == 0:
+        empty = np.empty(0)
+        return empty, empty.copy(), empty.copy()
+
+    kwh_per_s, water_per_kwh, cif = _resolve_pairs(models, provs, batch_size=batch)
+
+    e = (tokens / tps_arr + latency) * kwh_per_s
+    return e, e * water_per_kwh, e * cif
+
+
+def calculate_phase_impact_batch(
+    model_names,
+    prompt_tokens,
+    tokens_out,
+    providers="azure-us",
+    batch_size=None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorised calculate_phase_impact: prefill and decode of every query in one pass.
+
+    Arguments broadcast as in calculate_impact_batch; the phase
+    parameters (prefill_tps, decode_tps, ttft_s) come from the tables of
+    each query's model, the concurrency from ``batch_size`` if given.
+    """
+    lengths = [
+        np.shape(v)[0]
+        for v in (model_names, prompt_tokens, tokens_out, providers, batch_size)
+        if np.ndim(v) > 0
+    ]
+    n = lengths[0] if lengths else 1
+
+    models  = _broadcast(model_names, n)
+    provs   = _broadcast(providers, n)
+    prompt  = _broadcast(prompt_tokens, n, dtype=float)
+    tokens  = _broadcast(tokens_out, n, dtype=float)
+    batch   = None if batch_size is None else _broadcast(batch_size, n, dtype=float)
+
+    if n == 0:
+        empty = np.empty(0)
+        return empty, empty.copy(), empty.copy()
+
+    kwh_per_s, water_per_kwh, cif, prefill_tps, decode_tps, ttft_s = _resolve_pairs(
+        models, provs, Coefficients._fields, batch)
+
+    e = (ttft_s + prompt / prefill_tps + tokens / decode_tps) * kwh_per_s
+    return e, e * water_per_kwh, e * cif
+
+
+def calculate_impact_frame(df, **defaults):
+    """
+    Apply calculate_impact_batch to a pandas DataFrame.
+
+    Expected columns: model, tokens_out and optionally provider, tps,
+    latency_s.  Missing optional columns fall back to ``defaults`` or to
+    the calculate_impact defaults.  Returns a copy of ``df`` with
+    energy_kwh, water_l and carbon_kg columns added.
+    """
+    fallback = {"provider": "azure-us", "tps": 400, "latency_s": 0.075}
+    fallback.update(defaults)
+
+    def col(name):
+        return df[name].to_numpy() if name in df.columns else fallback[name]
+
+    e, w, c = calculate_impact_batch(
+        df["model"].to_numpy(),
+        df["tokens_out"].to_numpy(),
+        tps=col("tps"),
+        latency_s=col("latency_s"),
+        providers=col("provider"),
+    )
+    out = df.copy()
+    out["energy_kwh"] = e
+    out["water_l"]    = w
+    out["carbon_kg"]  = c
+    return out
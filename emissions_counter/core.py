@@ -2,13 +2,21 @@
 core.py  –  Industry-average electricity / water / carbon calculator
            based on “How Hungry is AI?” (July 2025).
 
-Public entry point:
+Public entry points:
     calculate_impact(model_name, tokens_out, tps, latency_s, provider)
+    calculate_phase_impact(model_name, prompt_tokens, tokens_out, provider)
 
-All lookup tables are in DEFAULTS.  Update them as better data arrives.
+The built-in lookup tables are in DEFAULTS.  The tables in use are
+current_defaults(): DEFAULTS unless install_defaults() (or the file-based
+registry in registry.py) swapped in others.  Change single entries with
+update_defaults(); if you edit the active tables in place, call
+invalidate_coefficients() afterwards so the compiled table is rebuilt.
 """
 
-from typing import Dict, Tuple
+import copy
+import math
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
 
 # ────────────────────────────────────────────────────────────────────
@@ -33,6 +41,7 @@ DEFAULTS: Dict[str, Dict] = {
 
     # ❸ Average utilisation per model-class
     #     (GPU% + non-GPU% of node power, batch-8, latency-sensitive)
+    #     An entry may add a "by_batch" curve, see BATCH_SCALING below.
     "utilisation": {
         "Micro":  {"gpu": 0.012, "non_gpu": 0.014},   # GPT-4o
         "Medium": {"gpu": 0.035, "non_gpu": 0.031},
@@ -54,6 +63,39 @@ DEFAULTS: Dict[str, Dict] = {
     },
 }
 
+# ❺ Inference phases.  A "models" or "hardware" entry may set any of these
+#    (the model entry wins); the rest come from PHASE_DEFAULTS.
+#      prefill_tps  prompt tokens processed per second
+#      decode_tps   output tokens generated per second
+#      ttft_s       fixed time before the first token, on top of prefill
+#      batch        requests served concurrently (sets the utilisation)
+#    The defaults reproduce the single-phase numbers (400 tok/s, 0.075 s,
+#    the batch-8 utilisation table).
+PHASE_DEFAULTS: Dict[str, float] = {
+    "prefill_tps": 400, "decode_tps": 400, "ttft_s": 0.075, "batch": 8,
+}
+PHASE_FIELDS = tuple(PHASE_DEFAULTS)
+
+# ❻ Utilisation by concurrency.  The "utilisation" values are one
+#    request's share of node power at REFERENCE_BATCH.  At other batch
+#    sizes the share is read from the class's own curve,
+#        "by_batch": {"batch": [1, 8, 64], "gpu": […], "non_gpu": […]},
+#    or, without one, the batch-8 values are scaled by BATCH_SCALING.
+#    Curves are interpolated linearly in batch and clamped at both ends.
+#    BATCH_SCALING assumes a node that draws 40 % of its power serving one
+#    request, rising linearly in log2(batch) to 100 % at 64, shared evenly
+#    by the concurrent requests; normalised to 1 at REFERENCE_BATCH.
+#    One request never draws more than the whole node: a share whose
+#    gpu + non_gpu exceeds 1 is scaled down to 1 (high-utilisation classes
+#    at small batches).  (Mirrored in assets/emissions.js.)
+#    Batch sizes and curve knots are at most MAX_BATCH.
+REFERENCE_BATCH = 8
+MAX_BATCH       = 4096
+BATCH_SCALING: Dict[str, List[float]] = {
+    "batch":  [1,      2,      4,      8,   16,     32,     64,     128,    256],
+    "factor": [4.5714, 2.8571, 1.7143, 1.0, 0.5714, 0.3214, 0.1786, 0.0893, 0.0446],
+}
+
 
 # ────────────────────────────────────────────────────────────────────
 #  Equations (from the paper)
@@ -73,6 +115,53 @@ def eq_energy(
     return hours * it_kw * pue
 
 
+def eq_phase_energy(
+    prompt_tokens: int,
+    tokens_out: int,
+    prefill_tps: float,
+    decode_tps: float,
+    ttft_s: float,
+    node_kw: float,
+    util_gpu: float,
+    util_nongpu: float,
+    pue: float,
+) -> float:
+    """Energy per query in kWh, with prefill and decode timed separately."""
+    hours = (ttft_s + prompt_tokens / prefill_tps + tokens_out / decode_tps) / 3600
+    it_kw = node_kw * (util_gpu + util_nongpu)
+    return hours * it_kw * pue
+
+
+def interpolate(x: float, xs: List[float], ys: List[float]) -> float:
+    """Piecewise-linear y(x) through (xs, ys), clamped outside; exact at the knots."""
+    if x <= xs[0]:
+        return ys[0]
+    if x >= xs[-1]:
+        return ys[-1]
+    i = 1
+    while xs[i] <= x:
+        i += 1
+    x0, x1, y0, y1 = xs[i - 1], xs[i], ys[i - 1], ys[i]
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+
+def utilisation_at(entry: Dict, batch: float) -> Tuple[float, float]:
+    """(gpu, non_gpu) share of one request of a utilisation entry at ``batch``, at most 1 node."""
+    if not math.isfinite(batch):
+        raise ValueError(f"batch size must be a finite number, got {batch!r}")
+    curve = entry.get("by_batch")
+    if curve is not None:
+        gpu     = interpolate(batch, curve["batch"], curve["gpu"])
+        non_gpu = interpolate(batch, curve["batch"], curve["non_gpu"])
+    else:
+        f = interpolate(batch, BATCH_SCALING["batch"], BATCH_SCALING["factor"])
+        gpu, non_gpu = entry["gpu"] * f, entry["non_gpu"] * f
+    total = gpu + non_gpu
+    if total > 1.0:
+        return gpu / total, non_gpu / total
+    return gpu, non_gpu
+
+
 def eq_water(e_kwh: float, pue: float, wue_site: float, wue_src: float) -> float:
     """Total water (site + source) in litres."""
     return (e_kwh / pue) * wue_site + e_kwh * wue_src
@@ -83,6 +172,178 @@ def eq_carbon(e_kwh: float, cif: float) -> float:
     return e_kwh * cif
 
 
+# ────────────────────────────────────────────────────────────────────
+#  Compiled coefficients  (one entry per (model, provider) pair)
+# ────────────────────────────────────────────────────────────────────
+class Coefficients(NamedTuple):
+    """Per-pair constants folded from DEFAULTS."""
+    kwh_per_s: float        # node_kw × (gpu + non_gpu) × PUE / 3600, at the model's batch
+    water_per_kwh: float    # WUEsite / PUE + WUEsrc
+    cif: float              # kg CO₂e per kWh
+    prefill_tps: float      # phase parameters of the model, see PHASE_DEFAULTS
+    decode_tps: float
+    ttft_s: float
+
+
+CoefficientTable = Dict[Tuple[str, str], Coefficients]
+
+
+class _Active(NamedTuple):
+    """
+    Tables in use, their compiled form and the version counter.
+
+    Replaced as a whole, never mutated, so a reader that grabs it once
+    sees a consistent triple without taking a lock.
+    """
+    cfg: Dict[str, Dict]
+    table: Optional[CoefficientTable]
+    version: int
+
+
+_active = _Active(DEFAULTS, None, 0)
+_write_lock = threading.Lock()
+_listeners: List[Callable[[], None]] = []
+
+
+def current_defaults() -> Dict[str, Dict]:
+    """The lookup tables in use (DEFAULTS unless others were installed)."""
+    return _active.cfg
+
+
+def model_phases(model_name: str, cfg: Optional[Dict[str, Dict]] = None) -> Dict[str, float]:
+    """Phase parameters of a model: its entry, then its hardware, then PHASE_DEFAULTS."""
+    cfg  = _active.cfg if cfg is None else cfg
+    spec = cfg["models"][model_name]
+    hw   = cfg["hardware"][spec["hardware"]]
+    return {f: spec.get(f, hw.get(f, PHASE_DEFAULTS[f])) for f in PHASE_FIELDS}
+
+
+def request_it_kw(
+    model_name: str,
+    batch: Optional[float] = None,
+    cfg: Optional[Dict[str, Dict]] = None,
+) -> float:
+    """IT power (kW) drawn for one request of a model at ``batch`` (default: the model's)."""
+    cfg  = _active.cfg if cfg is None else cfg
+    spec = cfg["models"][model_name]
+    hw   = cfg["hardware"][spec["hardware"]]
+    if batch is None:
+        batch = model_phases(model_name, cfg)["batch"]
+    gpu, non_gpu = utilisation_at(cfg["utilisation"][spec["class"]], batch)
+    return hw["node_kw"] * (gpu + non_gpu)
+
+
+def _kwh_per_s_at(cfg: Dict[str, Dict], model_name: str, provider: str, batch: float) -> float:
+    """Coefficients.kwh_per_s of a pair, at another batch size."""
+    return request_it_kw(model_name, batch, cfg) * cfg["env"][provider]["pue"] / 3600
+
+
+def compile_coefficients(cfg: Optional[Dict[str, Dict]] = None) -> CoefficientTable:
+    """Fold the lookup tables into one Coefficients entry per pair."""
+    cfg = _active.cfg if cfg is None else cfg
+    table: CoefficientTable = {}
+    for model_name in cfg["models"]:
+        phases = model_phases(model_name, cfg)
+        it_kw = request_it_kw(model_name, phases.pop("batch"), cfg)
+        for provider, env in cfg["env"].items():
+            table[model_name, provider] = Coefficients(
+                kwh_per_s     = it_kw * env["pue"] / 3600,
+                water_per_kwh = env["wue_site"] / env["pue"] + env["wue_src"],
+                cif           = env["cif"],
+                **phases,
+            )
+    return table
+
+
+def _snapshot() -> _Active:
+    """The active tables with their compiled table, rebuilt if it was invalidated."""
+    global _active
+    active = _active
+    if active.table is None:
+        with _write_lock:
+            if _active.table is None:
+                _active = _active._replace(table=compile_coefficients(_active.cfg))
+            active = _active
+    return active
+
+
+def coefficients() -> CoefficientTable:
+    """Return the compiled table, rebuilding it if it was invalidated."""
+    return _snapshot().table
+
+
+def coefficients_version() -> int:
+    """Counter bumped whenever the tables change; lets derived caches detect changes."""
+    return _active.version
+
+
+def on_defaults_change(listener: Callable[[], None]) -> None:
+    """Call ``listener()`` after every table change (e.g. to clear result caches)."""
+    _listeners.append(listener)
+
+
+def _notify() -> None:
+    for listener in list(_listeners):
+        listener()
+
+
+def invalidate_coefficients() -> None:
+    """Drop the compiled table after the active tables were edited in place."""
+    global _active
+    with _write_lock:
+        _active = _Active(_active.cfg, None, _active.version + 1)
+    _notify()
+
+
+def install_defaults(cfg: Dict[str, Dict]) -> int:
+    """
+    Make ``cfg`` the tables in use and return the new version.
+
+    The table is compiled before the swap, and the tables, compiled
+    table and version are replaced in one assignment, so concurrent
+    calculate_impact calls see either the old or the new tables.  ``cfg``
+    must not be modified afterwards.
+    """
+    global _active
+    table = compile_coefficients(cfg)
+    with _write_lock:
+        _active = _Active(cfg, table, _active.version + 1)
+        version = _active.version
+    _notify()
+    return version
+
+
+def update_defaults(section: str, key: str, **values) -> None:
+    """
+    Change one entry of the tables in use, e.g.
+
+        update_defaults("env", "aws-us", pue=1.15)
+
+    The change is applied to a copy that is then installed, so readers
+    never see it half-done.  Copy, change and swap happen under the write
+    lock, so concurrent updates are applied one after the other instead
+    of overwriting each other.
+    """
+    global _active
+    with _write_lock:
+        cfg = copy.deepcopy(_active.cfg)
+        cfg[section].setdefault(key, {}).update(values)
+        table = compile_coefficients(cfg)
+        _active = _Active(cfg, table, _active.version + 1)
+    _notify()
+
+
+def defaults_fingerprint(cfg: Optional[Dict[str, Dict]] = None) -> str:
+    """Short hash of the lookup tables, stored alongside computed results."""
+    # imported here so that importing core stays cheap
+    import hashlib
+    import json
+
+    cfg = _active.cfg if cfg is None else cfg
+    blob = json.dumps(cfg, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
 # ────────────────────────────────────────────────────────────────────
 #  Public helper
 # ────────────────────────────────────────────────────────────────────
@@ -92,6 +353,7 @@ def calculate_impact(
     tps: int = 400,
     latency_s: float = 0.075,
     provider: str = "azure-us",
+    batch_size: Optional[float] = None,
 ) -> Tuple[float, float, float]:
     """
     Return (energy_kWh, water_L, carbon_kg) for one query.
@@ -101,20 +363,39 @@ def calculate_impact(
     * tps         – decoding speed (tokens per second)
     * latency_s   – added latency before first token
     * provider    – "azure-us", "aws-us", "deepseek-cn"
+    * batch_size  – concurrent requests on the node (default: the model's batch)
     """
-    cfg   = DEFAULTS
-    spec  = cfg["models"][model_name]
-    hw    = cfg["hardware"][spec["hardware"]]
-    util  = cfg["utilisation"][spec["class"]]
-    env   = cfg["env"][provider]
-
-    e = eq_energy(
-        tokens_out, tps, latency_s,
-        hw["node_kw"],
-        util["gpu"], util["non_gpu"],
-        env["pue"]
-    )
-    w = eq_water(e, env["pue"], env["wue_site"], env["wue_src"])
-    c = eq_carbon(e, env["cif"])
-    return e, w, c
+    # Same result as eq_energy → eq_water / eq_carbon, with the constant
+    # factors pre-multiplied in the compiled table.
+    active = _snapshot()         # table and cfg of the same version
+    k = active.table[model_name, provider]
+    kwh_per_s = (k.kwh_per_s if batch_size is None
+                 else _kwh_per_s_at(active.cfg, model_name, provider, batch_size))
+    e = (tokens_out / tps + latency_s) * kwh_per_s
+    return e, e * k.water_per_kwh, e * k.cif
+
+
+def calculate_phase_impact(
+    model_name: str = "GPT-4o",
+    prompt_tokens: int = 0,
+    tokens_out: int = 300,
+    provider: str = "azure-us",
+    batch_size: Optional[float] = None,
+) -> Tuple[float, float, float]:
+    """
+    Return (energy_kWh, water_L, carbon_kg) for one query, prompt included.
+
+    The prompt is processed at the model's prefill_tps and the output
+    generated at its decode_tps, after ttft_s; utilisation is taken at
+    ``batch_size`` (default: the model's batch).  Same result as
+    eq_phase_energy → eq_water / eq_carbon.
+    """
+    active = _snapshot()         # table and cfg of the same version
+    k = active.table[model_name, provider]
+    kwh_per_s = (k.kwh_per_s if batch_size is None
+                 else _kwh_per_s_at(active.cfg, model_name, provider, batch_size))
+    e = (k.ttft_s + prompt_tokens / k.prefill_tps + tokens_out / k.decode_tps) * kwh_per_s
+    return e, e * k.water_per_kwh, e * k.cif
+
 
+_active = _Active(DEFAULTS, compile_coefficients(DEFAULTS), 0)
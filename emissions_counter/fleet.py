@@ -0,0 +1,67 @@
+"""
+fleet.py  –  One RollingAggregator shared by several processes.
+
+Each server worker is its own process, so an in-process aggregator only
+sees the events that worker received, and /api/v1/fleet would show
+whichever worker answered.  Instead, one aggregator runs in a manager
+process (standard library multiprocessing.managers) and every worker
+talks to it through a proxy with the same methods:
+
+    authkey = os.urandom(16)
+    manager = serve_shared(authkey)                # once, in the parent
+    fleet = connect_shared(manager.address, authkey)   # in each worker
+    fleet.add_many(rows); fleet.window(300)
+
+Every call is one round trip over a local socket; ingestion sends a
+whole chunk of rows per call.
+"""
+
+from multiprocessing.managers import BaseManager
+from typing import Optional, Tuple
+
+from .rolling import RollingAggregator
+
+
+_shared: Optional[RollingAggregator] = None
+
+
+def _shared_aggregator() -> RollingAggregator:
+    # runs in the manager process; every proxy refers to the same instance
+    global _shared
+    if _shared is None:
+        _shared = RollingAggregator()
+    return _shared
+
+
+class FleetManager(BaseManager):
+    """Manager process holding the one shared RollingAggregator."""
+
+
+FleetManager.register(
+    "aggregator", callable=_shared_aggregator,
+    exposed=("add", "add_many", "accepts", "window", "series", "totals", "clear"),
+)
+
+
+def format_address(address: Tuple[str, int]) -> str:
+    """"host:port", e.g. for an environment variable."""
+    return f"{address[0]}:{address[1]}"
+
+
+def parse_address(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(":")
+    return host, int(port)
+
+
+def serve_shared(authkey: bytes, address: Tuple[str, int] = ("127.0.0.1", 0)) -> FleetManager:
+    """Start the manager process (on a free local port by default)."""
+    manager = FleetManager(address, authkey)
+    manager.start()
+    return manager
+
+
+def connect_shared(address: Tuple[str, int], authkey: bytes):
+    """Proxy to the aggregator of a running serve_shared() manager."""
+    manager = FleetManager(address, authkey)
+    manager.connect()
+    return manager.aggregator()
@@ -0,0 +1,271 @@
+"""
+grid.py  –  Hourly grid carbon intensity and water factors per region.
+
+DEFAULTS["env"] holds one static CIF / WUE per provider.  A Grid holds
+time series of any of cif, wue_site and wue_src per provider, loaded
+from CSV or Parquet files in long format:
+
+    ts,provider,cif,wue_site
+    2025-07-01T00:00:00Z,azure-us,0.341,0.28
+    2025-07-01T01:00:00Z,azure-us,0.322,0.27
+
+"ts" is epoch seconds or ISO 8601; "region" is accepted for "provider".
+Missing columns or empty cells keep the static value; samples sharing a
+time are merged per field, the last non-empty cell winning.  Loading
+needs the optional ``pandas`` package (and ``pyarrow`` for Parquet).
+
+Requests are joined as-of: a request at time t gets the latest sample at
+or before t, provided it is less than ``max_age_s`` old (default one
+hour); otherwise, and for providers without a series, the static value
+is used.  Each series is a sorted array of sample times, so the join is
+one np.searchsorted per provider over all of its requests, not a lookup
+per request.  PUE stays static.
+
+Library entry points:
+    grid = Grid.load("grid/2025-07.csv")
+    e, w, c = grid.impact(models, tokens_out, ts, providers=providers)
+    w, c = grid.water_carbon(energy_kwh, providers, ts)
+
+Command line:
+    python -m emissions_counter.grid requests.jsonl.gz --series grid/2025-07.csv
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batch import _broadcast, calculate_impact_batch
+from .core import current_defaults
+from .store import chunk_ts
+from .stream import DEFAULT_CHUNK, iter_chunks, impact_of_chunk, open_log
+
+
+FIELDS            = ("cif", "wue_site", "wue_src")
+DEFAULT_MAX_AGE_S = 3600.0
+
+
+def _epoch_seconds(column) -> np.ndarray:
+    """Epoch seconds from a pandas Series of numbers or date strings."""
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=float)
+    stamps = pd.to_datetime(column, utc=True, format="ISO8601")
+    return (stamps - pd.Timestamp(0, tz="UTC")).dt.total_seconds().to_numpy()
+
+
+def _normalise(df):
+    """Check the columns, rename "region" to "provider" and convert "ts" to epoch seconds."""
+    if "provider" not in df.columns and "region" in df.columns:
+        df = df.rename(columns={"region": "provider"})
+    if "provider" not in df.columns or "ts" not in df.columns:
+        raise ValueError("grid series need a 'ts' and a 'provider' (or 'region') column")
+    if not any(f in df.columns for f in FIELDS):
+        raise ValueError(f"grid series need at least one of {FIELDS}")
+    return df.assign(ts=_epoch_seconds(df["ts"]))
+
+
+def _water_carbon(e: np.ndarray, k: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    # same operation order as the compiled coefficients (calculate_impact)
+    return e * (k["wue_site"] / k["pue"] + k["wue_src"]), e * k["cif"]
+
+
+class Grid:
+    """Time series of cif / wue_site / wue_src per provider, joined as-of."""
+
+    def __init__(self, max_age_s: float = DEFAULT_MAX_AGE_S):
+        self.max_age_s = max_age_s
+        # provider → (sorted sample times, {field: values, NaN where unknown})
+        self.series: Dict[str, Tuple[np.ndarray, Dict[str, np.ndarray]]] = {}
+
+    # ── building ────────────────────────────────────────────────────
+    def add(self, provider: str, ts, **fields) -> None:
+        """Add samples for one provider; at the same time, each field keeps its latest non-NaN value."""
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"unknown grid fields {sorted(unknown)}; choose from {FIELDS}")
+        ts = np.asarray(ts, dtype=float)
+        values = {f: np.broadcast_to(np.asarray(v, dtype=float), ts.shape) for f, v in fields.items()}
+
+        old_ts, old_values = self.series.get(provider, (np.empty(0), {}))
+        all_ts = np.concatenate([old_ts, ts])
+        merged = {}
+        for f in set(old_values) | set(values):
+            merged[f] = np.concatenate([old_values.get(f, np.full(len(old_ts), np.nan)),
+                                        values.get(f, np.full(len(ts), np.nan))])
+
+        # stable sort, then per field take the last non-NaN value of each
+        # time: a running max of the known positions, read at the end of
+        # each run of equal times, is valid if it lies within that run
+        order = np.argsort(all_ts, kind="stable")
+        all_ts = all_ts[order]
+        last = np.flatnonzero(np.append(all_ts[1:] != all_ts[:-1], True)[:len(all_ts)])
+        first = np.concatenate(([0], last[:-1] + 1))
+        positions = np.arange(len(all_ts))
+        out = {}
+        for f, v in merged.items():
+            v = v[order]
+            known = np.maximum.accumulate(np.where(np.isnan(v), -1, positions))[last]
+            out[f] = np.where(known >= first, v[np.maximum(known, 0)], np.nan)
+        self.series[provider] = (all_ts[last], out)
+
+    @classmethod
+    def from_frame(cls, df, max_age_s: float = DEFAULT_MAX_AGE_S) -> "Grid":
+        """From a DataFrame with ts, provider (or region) and any of FIELDS."""
+        df = _normalise(df)
+        fields = [f for f in FIELDS if f in df.columns]
+
+        grid = cls(max_age_s)
+        ts = df["ts"].to_numpy(dtype=float)
+        providers = df["provider"].astype(str).to_numpy()
+        for provider in np.unique(providers).tolist():
+            rows = providers == provider
+            grid.add(provider, ts[rows],
+                     **{f: df[f].to_numpy(dtype=float, na_value=np.nan)[rows] for f in fields})
+        return grid
+
+    @classmethod
+    def load(cls, *paths: str, max_age_s: float = DEFAULT_MAX_AGE_S) -> "Grid":
+        """From one or more .csv / .parquet files (see the module docstring)."""
+        try:
+            import pandas as pd
+        except ImportError as exc:
+            raise ImportError("loading grid series requires the 'pandas' package") from exc
+
+        # normalised per file: one may use epoch seconds and "region",
+        # another ISO 8601 and "provider"
+        frames = [
+            _normalise(pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path))
+            for path in paths
+        ]
+        return cls.from_frame(pd.concat(frames, ignore_index=True), max_age_s)
+
+    def coverage(self) -> Dict[str, dict]:
+        """First / last sample time and sample count per provider."""
+        return {
+            provider: {"first": float(ts[0]), "last": float(ts[-1]), "samples": len(ts),
+                       "fields": sorted(values)}
+            for provider, (ts, values) in self.series.items() if len(ts)
+        }
+
+    # ── joining ─────────────────────────────────────────────────────
+    def factors(
+        self, providers, ts, cfg: Optional[Dict[str, Dict]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Per-request pue, cif, wue_site, wue_src, plus "matched" (any series value used)."""
+        cfg = current_defaults() if cfg is None else cfg
+        ts = np.asarray(ts, dtype=float).reshape(-1)
+        provs = _broadcast(providers, len(ts)).astype(str)
+        keys, idx = np.unique(provs, return_inverse=True)
+        idx = idx.reshape(-1)
+
+        try:
+            static = {f: np.array([cfg["env"][p][f] for p in keys.tolist()], dtype=float)[idx]
+                      for f in ("pue",) + FIELDS}
+        except KeyError as exc:
+            raise KeyError(exc.args[0]) from None
+        out = dict(static, matched=np.zeros(len(ts), dtype=bool))
+
+        for i, provider in enumerate(keys.tolist()):
+            series = self.series.get(provider)
+            if series is None or not len(series[0]):
+                continue
+            sample_ts, values = series
+            rows = np.flatnonzero(idx == i)
+            t = ts[rows]
+            j = np.searchsorted(sample_ts, t, side="right") - 1
+            fresh = (j >= 0) & (t - sample_ts[np.maximum(j, 0)] < self.max_age_s)
+            rows, j = rows[fresh], j[fresh]
+            for f, v in values.items():
+                vj = v[j]
+                known = ~np.isnan(vj)
+                out[f][rows[known]] = vj[known]
+                out["matched"][rows[known]] = True
+        return out
+
+    def water_carbon(
+        self, energy_kwh, providers, ts, cfg: Optional[Dict[str, Dict]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(water_L, carbon_kg) of requests whose energy is already known."""
+        return _water_carbon(np.asarray(energy_kwh, dtype=float), self.factors(providers, ts, cfg))
+
+    def impact(
+        self,
+        model_names,
+        tokens_out,
+        ts,
+        tps=400,
+        latency_s=0.075,
+        providers="azure-us",
+        batch_size=None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """calculate_impact_batch with water and carbon at each request's time."""
+        e, _, _ = calculate_impact_batch(model_names, tokens_out, tps, latency_s, providers, batch_size)
+        w, c = self.water_carbon(e, providers, _broadcast(ts, len(e), dtype=float))
+        return e, w, c
+
+    def impact_of_chunk(
+        self, chunk, default_ts: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Like stream.impact_of_chunk; requests without "ts" count as ``default_ts`` (now)."""
+        e, _, _ = impact_of_chunk(chunk)
+        w, c = self.water_carbon(e, chunk.provider, chunk_ts(chunk, default_ts))
+        return e, w, c
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Command line
+# ────────────────────────────────────────────────────────────────────
+def _report(inputs: Sequence[str], grid: Grid, chunk_size: int) -> Dict[str, List[float]]:
+    # provider → [requests, matched, energy, water, carbon, static water, static carbon]
+    totals: Dict[str, List[float]] = {}
+    for path in inputs:
+        with open_log(path) as fh:
+            for chunk in iter_chunks(fh, chunk_size):
+                e, w_static, c_static = impact_of_chunk(chunk)
+                k = grid.factors(chunk.provider, chunk_ts(chunk))
+                w, c = _water_carbon(e, k)
+                provs = np.asarray(chunk.provider, dtype=str)
+                for provider in np.unique(provs).tolist():
+                    rows = provs == provider
+                    acc = totals.setdefault(provider, [0, 0, 0.0, 0.0, 0.0, 0.0, 0.0])
+                    acc[0] += int(rows.sum())
+                    acc[1] += int(k["matched"][rows].sum())
+                    for slot, values in enumerate((e, w, c, w_static, c_static), 2):
+                        acc[slot] += float(values[rows].sum())
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m emissions_counter.grid",
+        description="Account request logs against hourly grid CIF / WUE series.",
+    )
+    parser.add_argument("inputs", nargs="+", help="JSONL logs with a 'ts' per request")
+    parser.add_argument("--series", action="append", required=True,
+                        help="CSV / Parquet grid series (repeatable)")
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE_S,
+                        help="oldest sample still applied, seconds (default: 3600)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK)
+    args = parser.parse_args(argv)
+
+    for path in args.series:
+        if not os.path.exists(path):
+            parser.error(f"no such series file: {path}")
+    grid = Grid.load(*args.series, max_age_s=args.max_age)
+    for provider, (n, matched, e, w, c, w_static, c_static) in sorted(
+            _report(args.inputs, grid, args.chunk_size).items()):
+        print(json.dumps({
+            "provider": provider, "requests": n, "matched": matched,
+            "energy_kwh": e, "water_l": w, "carbon_kg": c,
+            "static_water_l": w_static, "static_carbon_kg": c_static,
+        }))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
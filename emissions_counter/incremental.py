@@ -0,0 +1,276 @@
+"""
+incremental.py  –  Re-derive historical totals when the tables change.
+
+Energy is linear in time for a fixed (model, provider): a request takes
+``seconds`` and uses ``seconds × kwh_per_s`` kWh, water and carbon are
+that times water_per_kwh and cif.  So a History keeps, per (model,
+provider) and optionally per time bucket, only
+
+    requests, tokens_out, seconds        requests timed by their own
+                                         tps / latency (logs, calculate_impact)
+    phase_requests, prompt_tokens,       requests timed by the tables
+    phase_tokens_out                     (calculate_phase_impact)
+
+and totals() recomputes energy / water / carbon from those sums and
+compile_coefficients() for the current or any other tables.  Correcting
+one number (say aws-us PUE) and re-deriving a year of history takes
+milliseconds instead of a rescan of the raw events.  Results agree with
+summing per-request results up to floating-point rounding.
+
+Requests are accounted at each model's batch from the tables.
+
+Library entry points:
+    history = History(bucket_s=86400)
+    history.add_chunk(chunk)                    # or add / add_phase
+    history.save("history.json")
+    History.load("history.json").totals(cfg)    # {(model, provider, bucket): (n, e, w, c)}
+
+Command line:
+    python -m emissions_counter.incremental build logs/*.jsonl.gz -o history.json --bucket 86400
+    python -m emissions_counter.incremental report history.json --tables corrected.yaml
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batch import _broadcast
+from .core import coefficients, compile_coefficients, defaults_fingerprint
+from .store import chunk_ts
+from .stream import DEFAULT_CHUNK, iter_chunks, open_log
+
+
+FORMAT_VERSION = 1
+COLUMNS = ("requests", "tokens_out", "seconds",
+           "phase_requests", "prompt_tokens", "phase_tokens_out")
+GROUP_FIELDS = ("model", "provider", "bucket")
+
+Key = Tuple[str, str, Optional[float]]
+
+
+class History:
+    """Sufficient statistics of accounted requests per (model, provider, bucket)."""
+
+    def __init__(self, bucket_s: Optional[float] = None):
+        self.bucket_s = bucket_s
+        self.stats: Dict[Key, np.ndarray] = {}
+
+    # ── adding requests ─────────────────────────────────────────────
+    def _fold(self, models, providers, ts, n: int, columns: Dict[str, np.ndarray]) -> None:
+        models = _broadcast(models, n).astype(str)
+        provs  = _broadcast(providers, n).astype(str)
+        keys = np.char.add(np.char.add(models, "\t"), provs)
+        if self.bucket_s:
+            if ts is None:
+                raise ValueError("a bucketed History needs a timestamp per request")
+            buckets = np.floor(_broadcast(ts, n, dtype=float) / self.bucket_s) * self.bucket_s
+            keys = np.char.add(np.char.add(keys, "\t"), buckets.astype(str))
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        sums = np.zeros((len(uniq), len(COLUMNS)))
+        for name, values in columns.items():
+            col = COLUMNS.index(name)
+            sums[:, col] = (np.bincount(inverse, minlength=len(uniq)) if values is None
+                            else np.bincount(inverse, weights=values, minlength=len(uniq)))
+
+        for i, key in enumerate(uniq.tolist()):
+            parts = key.split("\t")
+            bucket = float(parts[2]) if self.bucket_s else None
+            acc = self.stats.get((parts[0], parts[1], bucket))
+            if acc is None:
+                self.stats[parts[0], parts[1], bucket] = sums[i].copy()
+            else:
+                acc += sums[i]
+
+    @staticmethod
+    def _length(*values) -> int:
+        lengths = [np.shape(v)[0] for v in values if v is not None and np.ndim(v) > 0]
+        return lengths[0] if lengths else 1
+
+    def add(self, model_names, tokens_out, tps=400, latency_s=0.075, providers="azure-us",
+            ts=None) -> None:
+        """Requests timed by their own tps / latency, as in calculate_impact_batch."""
+        n = self._length(model_names, tokens_out, tps, latency_s, providers, ts)
+        tokens = _broadcast(tokens_out, n, dtype=float)
+        seconds = tokens / _broadcast(tps, n, dtype=float) + _broadcast(latency_s, n, dtype=float)
+        self._fold(model_names, providers, ts, n,
+                   {"requests": None, "tokens_out": tokens, "seconds": seconds})
+
+    def add_phase(self, model_names, prompt_tokens, tokens_out, providers="azure-us",
+                  ts=None) -> None:
+        """Requests timed by the tables' phase parameters, as in calculate_phase_impact_batch."""
+        n = self._length(model_names, prompt_tokens, tokens_out, providers, ts)
+        self._fold(model_names, providers, ts, n, {
+            "phase_requests":   None,
+            "prompt_tokens":    _broadcast(prompt_tokens, n, dtype=float),
+            "phase_tokens_out": _broadcast(tokens_out, n, dtype=float),
+        })
+
+    def add_chunk(self, chunk, default_ts: Optional[float] = None) -> None:
+        """A stream.Chunk; requests without "ts" count as ``default_ts`` (now)."""
+        ts = chunk_ts(chunk, default_ts) if self.bucket_s else None
+        self.add(chunk.model, chunk.tokens_out, chunk.tps, chunk.latency_s, chunk.provider, ts)
+
+    def merge(self, other: "History") -> None:
+        if other.bucket_s != self.bucket_s:
+            raise ValueError(f"cannot merge bucket_s={other.bucket_s} into bucket_s={self.bucket_s}")
+        for key, sums in other.stats.items():
+            acc = self.stats.get(key)
+            if acc is None:
+                self.stats[key] = sums.copy()
+            else:
+                acc += sums
+
+    @classmethod
+    def from_logs(cls, paths: Sequence[str], bucket_s: Optional[float] = None,
+                  chunk_size: int = DEFAULT_CHUNK) -> "History":
+        """From JSONL request logs (see stream.py)."""
+        history = cls(bucket_s)
+        for path in paths:
+            with open_log(path) as fh:
+                for chunk in iter_chunks(fh, chunk_size):
+                    history.add_chunk(chunk)
+        return history
+
+    @property
+    def requests(self) -> int:
+        return int(sum(s[0] + s[3] for s in self.stats.values()))
+
+    # ── recomputing ─────────────────────────────────────────────────
+    def totals(
+        self,
+        cfg: Optional[Dict[str, Dict]] = None,
+        by: Sequence[str] = GROUP_FIELDS,
+    ) -> Dict[tuple, Tuple[int, float, float, float]]:
+        """
+        {key: (requests, energy_kWh, water_L, carbon_kg)} under ``cfg``
+        (default: the tables in use), grouped by the fields in ``by``.
+        """
+        for field in by:
+            if field not in GROUP_FIELDS:
+                raise ValueError(f"cannot group by {field!r}; choose from {GROUP_FIELDS}")
+        if not self.stats:
+            return {}
+        table = coefficients() if cfg is None else compile_coefficients(cfg)
+
+        keys = list(self.stats)
+        s = np.array([self.stats[key] for key in keys])
+        try:
+            k = np.array([table[model_name, provider] for model_name, provider, _ in keys], dtype=float)
+        except KeyError as exc:
+            raise KeyError(f"no coefficients for {exc.args[0]!r}") from None
+        kwh_per_s, water_per_kwh, cif, prefill_tps, decode_tps, ttft_s = k.T
+
+        seconds = (s[:, 2] + s[:, 3] * ttft_s
+                   + s[:, 4] / prefill_tps + s[:, 5] / decode_tps)
+        e = seconds * kwh_per_s
+        w = e * water_per_kwh
+        c = e * cif
+        n = s[:, 0] + s[:, 3]
+
+        pos = [GROUP_FIELDS.index(field) for field in by]
+        out: Dict[tuple, List[float]] = {}
+        for i, key in enumerate(keys):
+            acc = out.setdefault(tuple(key[p] for p in pos), [0, 0.0, 0.0, 0.0])
+            acc[0] += int(n[i])
+            acc[1] += float(e[i])
+            acc[2] += float(w[i])
+            acc[3] += float(c[i])
+        return {key: tuple(acc) for key, acc in out.items()}
+
+    def delta(
+        self,
+        old_cfg: Dict[str, Dict],
+        new_cfg: Optional[Dict[str, Dict]] = None,
+        by: Sequence[str] = ("model", "provider"),
+    ) -> Dict[tuple, Tuple[float, float, float]]:
+        """Change in (energy, water, carbon) per group from ``old_cfg`` to ``new_cfg``."""
+        old = self.totals(old_cfg, by)
+        new = self.totals(new_cfg, by)
+        return {key: tuple(b - a for a, b in zip(old[key][1:], new[key][1:])) for key in new}
+
+    # ── persistence ─────────────────────────────────────────────────
+    def save(self, path: str, cfg: Optional[Dict[str, Dict]] = None) -> None:
+        """Write the statistics as JSON, with the fingerprint of the tables in use."""
+        rows = [[m, p, b, *sums.tolist()] for (m, p, b), sums in sorted(
+            self.stats.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or 0.0))]
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({
+                "format":               FORMAT_VERSION,
+                "bucket_s":             self.bucket_s,
+                "columns":              ["model", "provider", "bucket", *COLUMNS],
+                "defaults_fingerprint": defaults_fingerprint(cfg),
+                "rows":                 rows,
+            }, fh)
+
+    @classmethod
+    def load(cls, path: str) -> "History":
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported format version {data.get('format')!r}")
+        history = cls(data["bucket_s"])
+        for m, p, b, *sums in data["rows"]:
+            history.stats[m, p, b] = np.array(sums, dtype=float)
+        return history
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Command line
+# ────────────────────────────────────────────────────────────────────
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m emissions_counter.incremental",
+        description="Keep sufficient statistics of request logs and recompute totals from them.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="accumulate JSONL logs into a history file")
+    build.add_argument("inputs", nargs="+", help="JSONL logs (.gz / .zst accepted, '-' for stdin)")
+    build.add_argument("-o", "--output", required=True)
+    build.add_argument("--bucket", type=float, default=None, help="also keep sums per time bucket (seconds)")
+    build.add_argument("--append", action="store_true", help="add to an existing history file")
+    build.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK)
+
+    rep = sub.add_parser("report", help="totals from a history file as JSONL")
+    rep.add_argument("path")
+    rep.add_argument("--tables", default=None,
+                     help="coefficient file or directory to use instead of the current tables")
+    rep.add_argument("--by", nargs="*", choices=GROUP_FIELDS, default=["model", "provider"])
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        history = History.from_logs(args.inputs, args.bucket, args.chunk_size)
+        if args.append:
+            previous = History.load(args.output)
+            previous.merge(history)
+            history = previous
+        history.save(args.output)
+        print(f"{history.requests} requests in {len(history.stats)} groups", file=sys.stderr)
+        return 0
+
+    cfg = None
+    if args.tables:
+        from .registry import load_tables, validate_tables
+        cfg, _ = load_tables(args.tables)
+        problems = validate_tables(cfg)
+        if problems:
+            print("\n".join(problems), file=sys.stderr)
+            return 1
+    for key, (n, e, w, c) in sorted(History.load(args.path).totals(cfg, args.by).items(),
+                                    key=lambda item: tuple(str(v) for v in item[0])):
+        row = dict(zip(args.by, key))
+        if row.get("bucket") is not None:
+            row["bucket"] = datetime.fromtimestamp(row["bucket"], timezone.utc).isoformat()
+        row.update(requests=n, energy_kwh=e, water_l=w, carbon_kg=c)
+        print(json.dumps(row))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
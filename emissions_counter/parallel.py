@@ -0,0 +1,321 @@
+"""
+parallel.py  –  Multi-process sharded accounting for large log archives.
+
+Input files are split into shards: compressed files are one shard each,
+plain JSONL files larger than ``min_shard_bytes`` are cut into byte
+ranges on line boundaries.  Every worker process streams its shards
+through calculate_impact_batch and returns partial sums per
+(model, provider, time bucket); the parent merges them.
+
+Partial sums are exact: every double is an integer multiple of 2**-1074,
+so each group keeps its energy / water / carbon as that integer and
+merging partials is integer addition.  Totals are the correctly rounded
+sums of the per-request results, identical for any number of workers,
+shard layout or chunk size.  Request counts merge exactly.
+
+Library entry point:
+    account_parallel(paths, workers, bucket_s)
+
+Command line:
+    python -m emissions_counter.parallel logs/*.jsonl.gz --workers 8 --bucket 3600
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .stream import DEFAULT_CHUNK, iter_chunks, impact_of_chunk, open_log
+
+
+MIN_SHARD_BYTES = 64 * 1024 * 1024
+
+# (path, start byte, end byte or None for "whole file")
+Shard = Tuple[str, int, Optional[int]]
+# (model, provider, bucket start in epoch seconds or None)
+GroupKey = Tuple[str, str, Optional[int]]
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Mergeable partial sums
+# ────────────────────────────────────────────────────────────────────
+_UNIT_BITS = 1074                  # every finite double is a multiple of 2**-1074
+_SPLIT     = 27                    # mantissa halves small enough to sum exactly in float64
+_MAX_ROWS  = 1 << 26               # … over at most this many rows at a time
+
+
+class ExactSum:
+    """
+    Exact sum of doubles, kept as an integer count of 2**-1074 units.
+
+    Adding and merging are integer additions, so the result does not
+    depend on the order; ``value`` is the correctly rounded total.  NaN
+    and infinities are carried in a separate float.
+    """
+
+    __slots__ = ("units", "special")
+
+    def __init__(self, units: int = 0, special: float = 0.0):
+        self.units   = units
+        self.special = special
+
+    def add(self, x: float) -> None:
+        if math.isfinite(x):
+            n, d = x.as_integer_ratio()
+            self.units += n << (_UNIT_BITS - d.bit_length() + 1)
+        else:
+            self.special += x
+
+    def merge(self, other: "ExactSum") -> None:
+        self.units   += other.units
+        self.special += other.special
+
+    @property
+    def value(self) -> float:
+        return self.units / (1 << _UNIT_BITS) + self.special
+
+    def __getstate__(self):
+        return self.units, self.special
+
+    def __setstate__(self, state):
+        self.units, self.special = state
+
+
+def group_units(codes: np.ndarray, values: np.ndarray, groups: int) -> List[ExactSum]:
+    """
+    Exact per-group sums of ``values`` (group ``codes[i]`` for row i).
+
+    Each value is split into its binary exponent and a 53-bit integer
+    mantissa, cut in two halves so that float64 bincount sums of a chunk
+    are exact; the sums per (group, exponent) are then shifted into
+    2**-1074 units as Python integers.
+    """
+    if len(values) > _MAX_ROWS:
+        sums = [ExactSum() for _ in range(groups)]
+        for start in range(0, len(values), _MAX_ROWS):
+            part = slice(start, start + _MAX_ROWS)
+            for acc, s in zip(sums, group_units(codes[part], values[part], groups)):
+                acc.merge(s)
+        return sums
+
+    sums = [ExactSum() for _ in range(groups)]
+    finite = np.isfinite(values)
+    if not finite.all():
+        for i in np.flatnonzero(~finite).tolist():
+            sums[codes[i]].add(float(values[i]))
+        codes, values = codes[finite], values[finite]
+    if not len(values):
+        return sums
+
+    mantissa, exponent = np.frexp(values)
+    m = (mantissa * (1 << 53)).astype(np.int64)            # value = m · 2**(exponent - 53)
+    hi, lo = m >> _SPLIT, m & ((1 << _SPLIT) - 1)
+    exps, exp_idx = np.unique(exponent, return_inverse=True)
+    key = codes * len(exps) + exp_idx.reshape(-1)
+    size = groups * len(exps)
+    hi_sums = np.bincount(key, weights=hi, minlength=size).tolist()
+    lo_sums = np.bincount(key, weights=lo, minlength=size).tolist()
+    for k in np.flatnonzero(np.bincount(key, minlength=size)).tolist():
+        total = (int(hi_sums[k]) << _SPLIT) + int(lo_sums[k])
+        shift = int(exps[k % len(exps)]) - 53 + _UNIT_BITS
+        sums[k // len(exps)].units += total << shift if shift >= 0 else total >> -shift
+    return sums
+
+
+class PartialTotals:
+    """Per-group request counts and energy / water / carbon sums."""
+
+    def __init__(self):
+        self.groups: Dict[GroupKey, list] = {}
+
+    def _slot(self, key: GroupKey) -> list:
+        slot = self.groups.get(key)
+        if slot is None:
+            slot = self.groups[key] = [0, ExactSum(), ExactSum(), ExactSum()]
+        return slot
+
+    def add(self, key: GroupKey, n: int, e: ExactSum, w: ExactSum, c: ExactSum) -> None:
+        slot = self._slot(key)
+        slot[0] += n
+        slot[1].merge(e)
+        slot[2].merge(w)
+        slot[3].merge(c)
+
+    def merge(self, other: "PartialTotals") -> None:
+        for key, (n, e, w, c) in other.groups.items():
+            slot = self._slot(key)
+            slot[0] += n
+            slot[1].merge(e)
+            slot[2].merge(w)
+            slot[3].merge(c)
+
+    def totals(self) -> Dict[GroupKey, Tuple[int, float, float, float]]:
+        """Return {key: (requests, energy_kWh, water_L, carbon_kg)}."""
+        return {
+            key: (n, e.value, w.value, c.value)
+            for key, (n, e, w, c) in self.groups.items()
+        }
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Sharding
+# ────────────────────────────────────────────────────────────────────
+def _is_compressed(path: str) -> bool:
+    return path.endswith((".gz", ".zst", ".zstd"))
+
+
+def plan_shards(
+    paths: Iterable[str], workers: int, min_shard_bytes: int = MIN_SHARD_BYTES
+) -> List[Shard]:
+    """Split the inputs into roughly equal shards for ``workers`` processes."""
+    paths = list(paths)
+    sizes = {p: os.path.getsize(p) for p in paths}
+    target = max(min_shard_bytes, sum(sizes.values()) // max(workers, 1) + 1)
+
+    shards: List[Shard] = []
+    for path in paths:
+        size = sizes[path]
+        if _is_compressed(path) or size <= target:
+            shards.append((path, 0, None))
+            continue
+        for start in range(0, size, target):
+            shards.append((path, start, min(start + target, size)))
+    return shards
+
+
+def _iter_range(path: str, start: int, end: int) -> Iterator[str]:
+    """Yield the lines that *start* inside [start, end) of a plain file."""
+    with open(path, "rb") as fh:
+        pos = start
+        if start > 0:
+            # The line straddling ``start`` belongs to the previous shard.
+            fh.seek(start - 1)
+            pos = start - 1 + len(fh.readline())
+        while pos < end:
+            line = fh.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line.decode("utf-8")
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Worker
+# ────────────────────────────────────────────────────────────────────
+def _epoch(ts) -> float:
+    if isinstance(ts, str):
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+    return float(ts)
+
+
+def _buckets(ts: List[object], bucket_s: Optional[int]) -> List[Optional[int]]:
+    if not bucket_s:
+        return [None] * len(ts)
+    return [
+        None if t is None else int(_epoch(t) // bucket_s * bucket_s)
+        for t in ts
+    ]
+
+
+def account_shard(
+    shard: Shard, bucket_s: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK
+) -> PartialTotals:
+    """Compute the partial totals for one shard (runs inside a worker)."""
+    path, start, end = shard
+    partial = PartialTotals()
+
+    if end is None:
+        source = open_log(path)
+    else:
+        source = closing(_iter_range(path, start, end))
+
+    with source as lines:
+        for chunk in iter_chunks(lines, chunk_size):
+            e, w, c = impact_of_chunk(chunk)
+            keys = list(zip(chunk.model, chunk.provider, _buckets(chunk.ts, bucket_s)))
+            index: Dict[GroupKey, int] = {}
+            codes = np.fromiter(
+                (index.setdefault(k, len(index)) for k in keys), dtype=np.intp, count=len(keys)
+            )
+            counts = np.bincount(codes, minlength=len(index))
+            sums = [group_units(codes, v, len(index)) for v in (e, w, c)]
+            for key, i in index.items():
+                partial.add(key, int(counts[i]), sums[0][i], sums[1][i], sums[2][i])
+    return partial
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Public helper
+# ────────────────────────────────────────────────────────────────────
+def account_parallel(
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    bucket_s: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK,
+    min_shard_bytes: int = MIN_SHARD_BYTES,
+) -> Dict[GroupKey, Tuple[int, float, float, float]]:
+    """
+    Account every request in ``paths`` using a pool of ``workers`` processes.
+
+    Returns {(model, provider, bucket): (requests, energy_kWh, water_L, carbon_kg)}
+    where bucket is the start of the ``bucket_s``-second window holding the
+    request's "ts" (None when bucket_s is not given or "ts" is missing).
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = plan_shards(paths, workers, min_shard_bytes)
+
+    merged = PartialTotals()
+    if workers == 1:
+        for shard in shards:
+            merged.merge(account_shard(shard, bucket_s, chunk_size))
+        return merged.totals()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(account_shard, s, bucket_s, chunk_size) for s in shards]
+        for future in futures:
+            merged.merge(future.result())
+    return merged.totals()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m emissions_counter.parallel",
+        description="Aggregate energy / water / carbon over JSONL logs with a process pool.",
+    )
+    parser.add_argument("inputs", nargs="+", help="JSONL logs (.gz / .zst accepted)")
+    parser.add_argument("-o", "--output", default="-", help="output JSONL (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--bucket", type=int, default=None, metavar="SECONDS",
+                        help="also group by time bucket of this width, using 'ts'")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK,
+                        help=f"records per vectorised batch (default: {DEFAULT_CHUNK})")
+    args = parser.parse_args(argv)
+
+    totals = account_parallel(args.inputs, args.workers, args.bucket, args.chunk_size)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for (model_name, provider, bucket), (n, e, w, c) in sorted(
+            totals.items(), key=lambda kv: (kv[0][0], kv[0][1], kv[0][2] or 0)
+        ):
+            out.write(json.dumps({
+                "model": model_name, "provider": provider, "bucket": bucket,
+                "requests": n, "energy_kwh": e, "water_l": w, "carbon_kg": c,
+            }))
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""
+records.py  –  Append-only binary files of accounting results.
+
+Layout:
+
+    bytes 0–7      magic  b"ECREC01\\n"
+    bytes 8–11     header length (uint32, little endian)
+    bytes 12–…     JSON header, space-padded up to "data_offset"
+    data_offset–   packed little-endian records, RECORD_DTYPE (28 bytes)
+
+The header records the column layout, the model / provider names the
+uint16 codes refer to, the DEFAULTS tables the results were computed
+with and their defaults_fingerprint().  "data_offset" is a multiple of
+the page size, so the records can be mapped with numpy.memmap and read
+without copying; several processes reading the same file share the page
+cache.  Row count is derived from the file size, so a record cut short
+by a crash is ignored (and dropped by the next writer).
+
+One writer per file.  New model / provider names are written to the
+header before the records that use them.  A new file reserves header
+room for every model and provider in the tables, and opening a file for
+appending fails if its header could not hold them, so the name tables
+cannot outgrow "data_offset" after records have been written.
+
+Library entry points:
+    with RecordWriter("history.ecr") as out:
+        out.append_chunk(chunk, e, w, c)
+    rec = RecordFile("history.ecr")
+    rec.column("energy_kwh")                    → zero-copy view
+    rec.group_sums(by=("model",), bucket_s=86400)
+
+Command line:
+    python -m emissions_counter.records convert logs/*.jsonl.gz -o history.ecr
+    python -m emissions_counter.records report history.ecr --by model --bucket 86400
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .core import current_defaults, defaults_fingerprint
+from .store import COLUMNS, GROUP_FIELDS, NameCodes, chunk_ts, encode_columns, group_parts
+from .stream import DEFAULT_CHUNK, iter_chunks, impact_of_chunk, open_log
+
+
+MAGIC          = b"ECREC01\n"
+FORMAT_VERSION = 1
+HEADER_BYTES   = 16 * 1024          # default data offset; a multiple of the page size
+SCAN_ROWS      = 1 << 22            # rows per block when scanning
+
+RECORD_DTYPE = np.dtype([(name, dt.newbyteorder("<")) for name, dt in COLUMNS.items()])
+
+_PREFIX = struct.Struct("<8sI")
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Header
+# ────────────────────────────────────────────────────────────────────
+def read_header(path: str) -> dict:
+    """Decode the JSON header of a records file."""
+    with open(path, "rb") as fh:
+        prefix = fh.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"{path}: not a records file (too short)")
+        magic, length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a records file (bad magic)")
+        header = json.loads(fh.read(length))
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported format version {header.get('format')!r}")
+    return header
+
+
+def _dtype_of(header: dict) -> np.dtype:
+    return np.dtype([tuple(field) for field in header["record_dtype"]])
+
+
+def _header_blob(header: dict) -> bytes:
+    return json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+
+def _encode_header(header: dict) -> bytes:
+    blob = _header_blob(header)
+    if _PREFIX.size + len(blob) > header["data_offset"]:
+        raise ValueError(
+            f"records header needs {_PREFIX.size + len(blob)} bytes, "
+            f"only {header['data_offset']} reserved"
+        )
+    raw = _PREFIX.pack(MAGIC, len(blob)) + blob
+    return raw + b" " * (header["data_offset"] - len(raw))
+
+
+def _full_header_bytes(header: dict, cfg: Dict[str, Dict]) -> int:
+    """Header size once every model / provider of ``cfg`` has been named."""
+    full = dict(header)
+    full["models"]    = header["models"] + [m for m in cfg["models"] if m not in header["models"]]
+    full["providers"] = header["providers"] + [p for p in cfg["env"] if p not in header["providers"]]
+    return _PREFIX.size + len(_header_blob(full))
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Writing
+# ────────────────────────────────────────────────────────────────────
+class RecordWriter:
+    """
+    Append records to ``path``, creating it if needed.
+
+    Appending to an existing file requires the current DEFAULTS (or
+    ``cfg``) to match the fingerprint in its header, so one file never
+    mixes results computed with different tables; pass
+    check_defaults=False to override.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cfg: Optional[Dict[str, Dict]] = None,
+        header_bytes: int = HEADER_BYTES,
+        check_defaults: bool = True,
+    ):
+        cfg = current_defaults() if cfg is None else cfg
+        self.path = path
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            header = read_header(path)
+            if _dtype_of(header) != RECORD_DTYPE:
+                raise ValueError(f"{path}: record layout differs from this version")
+            if check_defaults and header["defaults_fingerprint"] != defaults_fingerprint(cfg):
+                raise ValueError(
+                    f"{path} was written with DEFAULTS {header['defaults_fingerprint']}, "
+                    f"current tables are {defaults_fingerprint(cfg)}"
+                )
+            needed = _full_header_bytes(header, cfg)
+            if needed > header["data_offset"]:
+                raise ValueError(
+                    f"{path}: header has {header['data_offset']} bytes, naming every model "
+                    f"and provider of the tables needs {needed}; write to a new file"
+                )
+            self._fh = open(path, "r+b")
+            # drop a partial record left by an interrupted write
+            size = os.path.getsize(path)
+            whole = header["data_offset"] + (size - header["data_offset"]) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+            if whole != size:
+                self._fh.truncate(whole)
+        else:
+            page = mmap.ALLOCATIONGRANULARITY
+            header = {
+                "format":               FORMAT_VERSION,
+                "record_dtype":         [list(field) for field in RECORD_DTYPE.descr],
+                "data_offset":          0,
+                "created":              datetime.now(timezone.utc).isoformat(),
+                "defaults_fingerprint": defaults_fingerprint(cfg),
+                "defaults":             cfg,
+                "models":               [],
+                "providers":            [],
+            }
+            # room for the full name tables, with slack for the offset's own digits
+            needed = max(header_bytes, _full_header_bytes(header, cfg) + 32)
+            header["data_offset"] = -(-needed // page) * page
+            self._fh = open(path, "w+b")
+            self._fh.write(_encode_header(header))
+
+        self.header = header
+        self._models    = NameCodes(header["models"])
+        self._providers = NameCodes(header["providers"])
+
+    def _sync_names(self) -> None:
+        if (len(self._models) != len(self.header["models"])
+                or len(self._providers) != len(self.header["providers"])):
+            self.header["models"]    = list(self._models.names)
+            self.header["providers"] = list(self._providers.names)
+            self._fh.seek(0)
+            self._fh.write(_encode_header(self.header))
+
+    def append_batch(self, models, providers, ts, tokens_out, energy_kwh, water_l, carbon_kg) -> int:
+        """Append arrays of events; returns the number written."""
+        cols = encode_columns(self._models, self._providers,
+                              models, providers, ts, tokens_out, energy_kwh, water_l, carbon_kg)
+        n = len(cols["ts"])
+        if not n:
+            return 0
+        rows = np.empty(n, dtype=RECORD_DTYPE)
+        for name, values in cols.items():
+            rows[name] = values
+        self._sync_names()
+        self._fh.seek(0, os.SEEK_END)
+        self._fh.write(rows.tobytes())
+        return n
+
+    def append_chunk(self, chunk, e, w, c, default_ts: Optional[float] = None) -> int:
+        """Append a stream.Chunk and its results; events without "ts" get ``default_ts`` (now)."""
+        return self.append_batch(chunk.model, chunk.provider, chunk_ts(chunk, default_ts),
+                                 chunk.tokens_out, e, w, c)
+
+    def flush(self) -> None:
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Reading
+# ────────────────────────────────────────────────────────────────────
+class RecordFile:
+    """Read-only, memory-mapped view of a records file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header = read_header(path)
+        dtype = _dtype_of(self.header)
+        offset = self.header["data_offset"]
+        rows = max(0, os.path.getsize(path) - offset) // dtype.itemsize
+        if rows:
+            self.data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(rows,))
+        else:
+            self.data = np.empty(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def models(self) -> List[str]:
+        return self.header["models"]
+
+    @property
+    def providers(self) -> List[str]:
+        return self.header["providers"]
+
+    @property
+    def defaults(self) -> Dict[str, Dict]:
+        return self.header["defaults"]
+
+    def matches_defaults(self, cfg: Optional[Dict[str, Dict]] = None) -> bool:
+        """True if the results were computed with the current (or given) tables."""
+        return self.header["defaults_fingerprint"] == defaults_fingerprint(
+            current_defaults() if cfg is None else cfg)
+
+    def column(self, name: str) -> np.ndarray:
+        """One field of every record, as a strided view of the mapping."""
+        return self.data[name]
+
+    def parts(
+        self,
+        t0: Optional[float] = None,
+        t1: Optional[float] = None,
+        columns: Sequence[str] = tuple(COLUMNS),
+        block_rows: int = SCAN_ROWS,
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """Column arrays per block of ``block_rows`` records with t0 <= ts < t1."""
+        for start in range(0, len(self.data), block_rows):
+            block = self.data[start:start + block_rows]
+            if t0 is None and t1 is None:
+                yield {name: block[name] for name in columns}
+                continue
+            ts = block["ts"]
+            mask = np.ones(len(block), dtype=bool)
+            if t0 is not None:
+                mask &= ts >= t0
+            if t1 is not None:
+                mask &= ts < t1
+            if mask.any():
+                yield {name: block[name][mask] for name in columns}
+
+    def group_sums(
+        self,
+        by: Sequence[str] = GROUP_FIELDS,
+        t0: Optional[float] = None,
+        t1: Optional[float] = None,
+        bucket_s: Optional[float] = None,
+    ) -> Dict[tuple, Tuple[int, float, float, float]]:
+        """Same result as EventStore.group_sums, scanned from the mapping."""
+        columns = list(by) + ["ts", "energy_kwh", "water_l", "carbon_kg"]
+        names = {"model": self.models, "provider": self.providers}
+        return group_parts(self.parts(t0, t1, columns), by, names, bucket_s)
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Command line
+# ────────────────────────────────────────────────────────────────────
+def _convert(inputs: List[str], output: str, chunk_size: int) -> int:
+    written = 0
+    with RecordWriter(output) as out:
+        for path in inputs:
+            with open_log(path) as fh:
+                for chunk in iter_chunks(fh, chunk_size):
+                    written += out.append_chunk(chunk, *impact_of_chunk(chunk))
+    return written
+
+
+def _report(path: str, by: List[str], bucket_s: Optional[float],
+            t0: Optional[float], t1: Optional[float]) -> None:
+    rec = RecordFile(path)
+    if not rec.matches_defaults():
+        print(f"note: {path} was computed with DEFAULTS "
+              f"{rec.header['defaults_fingerprint']}, not the current tables",
+              file=sys.stderr)
+    for key, (n, e, w, c) in sorted(rec.group_sums(by, t0, t1, bucket_s).items()):
+        row = dict(zip(by, key))
+        if bucket_s:
+            row["bucket"] = datetime.fromtimestamp(key[-1], timezone.utc).isoformat()
+        row.update(requests=n, energy_kwh=e, water_l=w, carbon_kg=c)
+        print(json.dumps(row))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m emissions_counter.records",
+        description="Convert request logs to records files and report on them.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    conv = sub.add_parser("convert", help="account JSONL logs and append them to a records file")
+    conv.add_argument("inputs", nargs="+", help="JSONL logs (.gz / .zst accepted, '-' for stdin)")
+    conv.add_argument("-o", "--output", required=True, help="records file to create or extend")
+    conv.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK)
+
+    rep = sub.add_parser("report", help="totals from a records file as JSONL")
+    rep.add_argument("path")
+    rep.add_argument("--by", nargs="*", choices=GROUP_FIELDS, default=list(GROUP_FIELDS))
+    rep.add_argument("--bucket", type=float, default=None, help="also group by time bucket (seconds)")
+    rep.add_argument("--since", type=float, default=None, help="epoch seconds, inclusive")
+    rep.add_argument("--until", type=float, default=None, help="epoch seconds, exclusive")
+
+    args = parser.parse_args(argv)
+    if args.command == "convert":
+        n = _convert(args.inputs, args.output, args.chunk_size)
+        print(f"{n} records appended to {args.output}", file=sys.stderr)
+    else:
+        _report(args.path, args.by, args.bucket, args.since, args.until)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
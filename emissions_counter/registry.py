@@ -0,0 +1,287 @@
+"""
+registry.py  –  Load the lookup tables from files and hot-swap them.
+
+A table source is either
+
+    * one JSON / YAML file with the four sections
+      {"models": …, "hardware": …, "utilisation": …, "env": …}, or
+    * a directory of JSON / YAML files, each named after the section it
+      holds (models.yaml, env.json, …) or holding several sections.
+
+An optional top-level "version" string is kept as a label.  Sections
+missing from the source are taken from the built-in DEFAULTS.  YAML
+needs the optional ``PyYAML`` package.
+
+Loaded tables are validated (every model points at existing hardware
+and utilisation entries, numbers are in range) before they are
+installed with core.install_defaults().  That swap replaces the tables,
+their compiled form and the version in one assignment, so concurrent
+calculate_impact calls never take a lock and never see half an update.
+Derived caches (UtilisationIndex, result caches keyed on
+coefficients_version() or registered with core.on_defaults_change)
+rebuild from the version bump.  A source that
+fails to load or validate leaves the current tables in place.
+
+Library entry point:
+    registry = Registry("config/coefficients/")
+    registry.reload()                # load, validate, install
+    registry.watch(interval_s=5)     # reload whenever the files change
+
+Command line (validate only):
+    python -m emissions_counter.registry config/coefficients.yaml
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from numbers import Real
+from typing import Dict, List, Optional, Tuple
+
+from .core import DEFAULTS, MAX_BATCH, coefficients_version, defaults_fingerprint, install_defaults
+
+
+SECTIONS   = ("models", "hardware", "utilisation", "env")
+EXTENSIONS = (".json", ".yaml", ".yml")
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Loading
+# ────────────────────────────────────────────────────────────────────
+def _read(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as fh:
+        if path.endswith(".json"):
+            data = json.load(fh)
+        else:
+            try:
+                import yaml
+            except ImportError as exc:
+                raise ImportError("reading YAML tables requires the 'PyYAML' package") from exc
+            data = yaml.safe_load(fh)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a mapping at the top level")
+    return data
+
+
+def source_files(path: str) -> List[str]:
+    """The table files of a source (the file itself, or the directory's files)."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.endswith(EXTENSIONS) and not name.startswith(".")
+        )
+    return [path]
+
+
+def load_tables(path: str) -> Tuple[Dict[str, Dict], Optional[str]]:
+    """Return (tables, version label) from a file or directory."""
+    tables: Dict[str, Dict] = {}
+    label = None
+    for file in source_files(path):
+        data = _read(file)
+        label = data.pop("version", label)
+        stem = os.path.splitext(os.path.basename(file))[0]
+        if stem in SECTIONS and not any(key in SECTIONS for key in data):
+            data = {stem: data}
+        for section, entries in data.items():
+            if section not in SECTIONS:
+                raise ValueError(f"{file}: unknown section {section!r}")
+            tables.setdefault(section, {}).update(entries)
+    for section in SECTIONS:
+        if section not in tables:
+            tables[section] = copy.deepcopy(DEFAULTS[section])
+    return tables, None if label is None else str(label)
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Validation
+# ────────────────────────────────────────────────────────────────────
+# section → field → (min, max); None means unbounded
+FIELD_RANGES = {
+    "hardware":    {"node_kw": (0.0, None)},
+    "utilisation": {"gpu": (0.0, 1.0), "non_gpu": (0.0, 1.0)},
+    "env":         {"pue": (1.0, None), "wue_site": (0.0, None),
+                    "wue_src": (0.0, None), "cif": (0.0, None)},
+}
+
+# Phase parameters (core.PHASE_DEFAULTS): optional on models and hardware;
+# utilisation entries may also carry a "by_batch" curve (_check_curve)
+PHASE_RANGES = {"prefill_tps": (1.0, None), "decode_tps": (1.0, None),
+                "ttft_s": (0.0, None), "batch": (1.0, MAX_BATCH)}
+OPTIONAL_FIELD_RANGES = {"models": PHASE_RANGES, "hardware": PHASE_RANGES}
+
+
+def _check_range(problems: List[str], where: str, value, lo, hi) -> None:
+    if not isinstance(value, Real) or isinstance(value, bool):
+        problems.append(f"{where}: expected a number, got {value!r}")
+    elif (lo is not None and value < lo) or (hi is not None and value > hi):
+        problems.append(f"{where}: {value} outside [{lo}, {hi}]")
+
+
+def _check_node_share(problems: List[str], where: str, gpu: list, non_gpu: list) -> None:
+    """gpu + non_gpu is one request's share of the node, so at most 1 (see core.utilisation_at)."""
+    for i, (g, n) in enumerate(zip(gpu, non_gpu)):
+        if all(isinstance(v, Real) and not isinstance(v, bool) for v in (g, n)) and g + n > 1.0:
+            at = f"[{i}]" if len(gpu) > 1 else ""
+            problems.append(f"{where}: gpu{at} + non_gpu{at} = {g + n:g} is more than the whole node (1)")
+
+
+def _check_curve(problems: List[str], where: str, curve) -> None:
+    """A "by_batch" utilisation curve: increasing batch sizes in [1, MAX_BATCH], shares in [0, 1]."""
+    if not isinstance(curve, dict) or set(curve) != {"batch", "gpu", "non_gpu"}:
+        problems.append(f"{where}: expected a mapping with batch, gpu and non_gpu lists")
+        return
+    lengths = {len(v) if isinstance(v, list) else -1 for v in curve.values()}
+    if len(lengths) != 1 or lengths & {-1, 0}:
+        problems.append(f"{where}: batch, gpu and non_gpu must be lists of the same, non-zero length")
+        return
+    for field, (lo, hi) in (("batch", (1.0, MAX_BATCH)), ("gpu", (0.0, 1.0)), ("non_gpu", (0.0, 1.0))):
+        for i, value in enumerate(curve[field]):
+            _check_range(problems, f"{where}.{field}[{i}]", value, lo, hi)
+    batch = curve["batch"]
+    if all(isinstance(b, Real) for b in batch) and any(b1 <= b0 for b0, b1 in zip(batch, batch[1:])):
+        problems.append(f"{where}.batch: must be strictly increasing")
+    _check_node_share(problems, where, curve["gpu"], curve["non_gpu"])
+
+
+def validate_tables(cfg: Dict[str, Dict]) -> List[str]:
+    """Return a list of problems; empty when the tables are usable."""
+    problems = []
+    for section in SECTIONS:
+        if not isinstance(cfg.get(section), dict) or not cfg[section]:
+            problems.append(f"{section}: missing or empty")
+    if problems:
+        return problems
+
+    for section, fields in FIELD_RANGES.items():
+        for key, entry in cfg[section].items():
+            for field, (lo, hi) in fields.items():
+                value = entry.get(field) if isinstance(entry, dict) else None
+                _check_range(problems, f"{section}.{key}.{field}", value, lo, hi)
+
+    for section, fields in OPTIONAL_FIELD_RANGES.items():
+        for key, entry in cfg[section].items():
+            for field, (lo, hi) in fields.items():
+                if isinstance(entry, dict) and field in entry:
+                    _check_range(problems, f"{section}.{key}.{field}", entry[field], lo, hi)
+
+    for key, entry in cfg["utilisation"].items():
+        if not isinstance(entry, dict):
+            continue
+        _check_node_share(problems, f"utilisation.{key}", [entry.get("gpu")], [entry.get("non_gpu")])
+        if "by_batch" in entry:
+            _check_curve(problems, f"utilisation.{key}.by_batch", entry["by_batch"])
+
+    for name, spec in cfg["models"].items():
+        if not isinstance(spec, dict):
+            problems.append(f"models.{name}: expected a mapping")
+            continue
+        if spec.get("hardware") not in cfg["hardware"]:
+            problems.append(f"models.{name}.hardware: unknown hardware {spec.get('hardware')!r}")
+        if spec.get("class") not in cfg["utilisation"]:
+            problems.append(f"models.{name}.class: unknown utilisation class {spec.get('class')!r}")
+    return problems
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Registry
+# ────────────────────────────────────────────────────────────────────
+class Registry:
+    """Loads a table source, installs it, and reloads it when it changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stamp: Optional[dict] = None
+        self._mtimes: Optional[Dict[str, float]] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _source_mtimes(self) -> Dict[str, float]:
+        return {f: os.stat(f).st_mtime for f in source_files(self.path)}
+
+    def reload(self) -> dict:
+        """Load, validate and install the source; returns the version stamp."""
+        with self._reload_lock:
+            # remembered even if loading fails, so a broken file is reported once
+            self._mtimes = self._source_mtimes()
+            cfg, label = load_tables(self.path)
+            problems = validate_tables(cfg)
+            if problems:
+                raise ValueError(f"{self.path}: invalid tables:\n  " + "\n  ".join(problems))
+            version = install_defaults(cfg)
+            self.stamp = {
+                "version":     version,
+                "label":       label,
+                "fingerprint": defaults_fingerprint(cfg),
+                "source":      self.path,
+                "loaded_at":   datetime.now(timezone.utc).isoformat(),
+            }
+            return self.stamp
+
+    def changed(self) -> bool:
+        """True if the source files were added, removed or modified since the last load."""
+        try:
+            return self._source_mtimes() != self._mtimes
+        except OSError:
+            return False
+
+    def reload_if_changed(self) -> bool:
+        if not self.changed():
+            return False
+        self.reload()
+        return True
+
+    def watch(self, interval_s: float = 5.0) -> None:
+        """Poll the source in a daemon thread and reload it when it changes."""
+        if self._thread is not None:
+            return
+
+        def poll():
+            while not self._stop.wait(interval_s):
+                try:
+                    self.reload_if_changed()
+                except Exception as exc:       # keep the current tables and keep watching
+                    print(f"coefficient reload failed: {exc}", file=sys.stderr)
+
+        self._stop.clear()                     # a previous stop() left it set
+        self._thread = threading.Thread(target=poll, name="coefficient-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def info(self) -> dict:
+        """Version stamp of the loaded tables and the current version counter."""
+        return dict(self.stamp or {}, current_version=coefficients_version())
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Command line
+# ────────────────────────────────────────────────────────────────────
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m emissions_counter.registry",
+        description="Validate a coefficient table file or directory.",
+    )
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    cfg, label = load_tables(args.path)
+    problems = validate_tables(cfg)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if not problems:
+        print(json.dumps({"label": label, "fingerprint": defaults_fingerprint(cfg),
+                          "models": len(cfg["models"]), "providers": len(cfg["env"])}))
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
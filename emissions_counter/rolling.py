@@ -0,0 +1,261 @@
+"""
+rolling.py  –  Live rolling totals for a fleet of requests.
+
+Each ingested request adds its energy / water / carbon to fixed-width
+time buckets held in ring buffers, one set per (model, provider):
+
+    per-second buckets   covering the last  2 minutes
+    per-minute buckets   covering the last  2 hours
+    per-hour   buckets   covering the last  2 days
+
+plus a cumulative total since the aggregator was created.  A query over
+the last N seconds reads the finest ring that spans N, so it costs a
+number of bucket reads that depends on the window, never on the number
+of events.  Buckets are reset lazily: every slot remembers which bucket
+index it holds and is zeroed when a newer bucket lands on it.
+
+Library entry point:
+    agg = RollingAggregator()
+    agg.add("o3", "azure-us", e_kwh, w_l, c_kg, ts=time.time())
+    agg.window(300)    → {(model, provider): (requests, energy_kWh, water_L, carbon_kg)}
+    agg.totals()       → cumulative totals, same shape
+
+Timestamps must fall within the longest ring (2 days) before now and at
+most MAX_SKEW_S after it; anything else raises ValueError, so a clock
+error cannot claim slots for buckets that real events then never reach.
+
+The aggregator is in-process; fleet.py shares one between several
+processes (server workers).
+"""
+
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# (bucket width in seconds, number of buckets), finest first
+RESOLUTIONS: Tuple[Tuple[int, int], ...] = ((1, 120), (60, 120), (3600, 48))
+
+# Largest accepted distance of a timestamp into the future, in seconds
+MAX_SKEW_S = 60.0
+
+Key    = Tuple[str, str]
+Totals = Tuple[int, float, float, float]
+
+
+def epoch_seconds(ts) -> float:
+    """Epoch seconds from a number or an ISO 8601 string."""
+    if isinstance(ts, str):
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+    return float(ts)
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Ring buffer of time buckets
+# ────────────────────────────────────────────────────────────────────
+class BucketRing:
+    """``size`` buckets of ``width`` seconds; slot = bucket index mod size."""
+
+    __slots__ = ("width", "size", "index", "n", "e", "w", "c")
+
+    def __init__(self, width: int, size: int):
+        self.width = width
+        self.size  = size
+        self.index: List[int]   = [-1] * size     # bucket held by each slot
+        self.n:     List[int]   = [0] * size
+        self.e:     List[float] = [0.0] * size
+        self.w:     List[float] = [0.0] * size
+        self.c:     List[float] = [0.0] * size
+
+    @property
+    def span(self) -> int:
+        return self.width * self.size
+
+    def add(self, t: float, n: int, e: float, w: float, c: float) -> None:
+        b = int(t // self.width)
+        i = b % self.size
+        if self.index[i] != b:
+            if self.index[i] > b:       # older than anything the ring still holds
+                return
+            self.index[i] = b
+            self.n[i], self.e[i], self.w[i], self.c[i] = n, e, w, c
+        else:
+            self.n[i] += n
+            self.e[i] += e
+            self.w[i] += w
+            self.c[i] += c
+
+    def sum(self, first: int, last: int) -> Totals:
+        """Totals of bucket indices first..last (inclusive) still in the ring."""
+        first = max(first, last - self.size + 1)
+        n, e, w, c = 0, 0.0, 0.0, 0.0
+        for b in range(first, last + 1):
+            i = b % self.size
+            if self.index[i] == b:
+                n += self.n[i]
+                e += self.e[i]
+                w += self.w[i]
+                c += self.c[i]
+        return n, e, w, c
+
+    def series(self, last: int, count: int) -> List[Totals]:
+        """Per-bucket totals of the ``count`` buckets ending at index ``last``."""
+        out = []
+        for b in range(last - count + 1, last + 1):
+            i = b % self.size
+            if self.index[i] == b:
+                out.append((self.n[i], self.e[i], self.w[i], self.c[i]))
+            else:
+                out.append((0, 0.0, 0.0, 0.0))
+        return out
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Aggregator
+# ────────────────────────────────────────────────────────────────────
+class RollingAggregator:
+    """Thread-safe rolling and cumulative totals per (model, provider)."""
+
+    def __init__(
+        self,
+        resolutions: Sequence[Tuple[int, int]] = RESOLUTIONS,
+        max_skew_s: float = MAX_SKEW_S,
+    ):
+        self.resolutions = tuple(sorted(resolutions))
+        self.max_skew_s  = max_skew_s
+        self._rings:  Dict[Key, List[BucketRing]] = {}
+        self._totals: Dict[Key, List[float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def span(self) -> int:
+        """Seconds covered by the longest ring."""
+        return max(width * size for width, size in self.resolutions)
+
+    def accepts(self, ts: float, now: Optional[float] = None) -> bool:
+        """Whether ``ts`` is within [now − span, now + max_skew_s]."""
+        t = time.time() if now is None else now
+        return t - self.span <= ts <= t + self.max_skew_s
+
+    def _check(self, ts: float, now: float) -> None:
+        if not self.accepts(ts, now):
+            raise ValueError(
+                f"timestamp {ts!r} is outside the last {self.span}s "
+                f"(or more than {self.max_skew_s}s ahead)"
+            )
+
+    def _rings_for(self, key: Key) -> List[BucketRing]:
+        rings = self._rings.get(key)
+        if rings is None:
+            rings = self._rings[key] = [BucketRing(w, s) for w, s in self.resolutions]
+            self._totals[key] = [0, 0.0, 0.0, 0.0]
+        return rings
+
+    def add(
+        self,
+        model_name: str,
+        provider: str,
+        e: float,
+        w: float,
+        c: float,
+        ts: Optional[float] = None,
+        n: int = 1,
+    ) -> None:
+        """Record ``n`` requests with the given impact at time ``ts`` (default: now)."""
+        now = time.time()
+        t = now if ts is None else ts
+        self._check(t, now)
+        key = (model_name, provider)
+        with self._lock:
+            for ring in self._rings_for(key):
+                ring.add(t, n, e, w, c)
+            acc = self._totals[key]
+            acc[0] += n
+            acc[1] += e
+            acc[2] += w
+            acc[3] += c
+
+    def add_many(self, rows) -> int:
+        """
+        Record (model, provider, e, w, c, ts) rows under one lock; returns the count.
+
+        All timestamps are checked first: if one is out of range nothing is
+        recorded and ValueError names the row.
+        """
+        now = time.time()
+        rows = [row if row[5] is not None else (*row[:5], now) for row in rows]
+        for i, row in enumerate(rows):
+            try:
+                self._check(row[5], now)
+            except ValueError as exc:
+                raise ValueError(f"row {i}: {exc}") from None
+        count = 0
+        with self._lock:
+            for model_name, provider, e, w, c, t in rows:
+                key = (model_name, provider)
+                for ring in self._rings_for(key):
+                    ring.add(t, 1, e, w, c)
+                acc = self._totals[key]
+                acc[0] += 1
+                acc[1] += e
+                acc[2] += w
+                acc[3] += c
+                count += 1
+        return count
+
+    def _ring_index(self, seconds: float) -> int:
+        if not seconds > 0:
+            raise ValueError(f"window must be a positive number of seconds, got {seconds!r}")
+        for i, (width, size) in enumerate(self.resolutions):
+            if seconds <= width * size:
+                return i
+        raise ValueError(
+            f"window of {seconds}s exceeds the longest ring "
+            f"({self.resolutions[-1][0] * self.resolutions[-1][1]}s)"
+        )
+
+    def window(self, seconds: float, now: Optional[float] = None) -> Dict[Key, Totals]:
+        """Totals of the last ``seconds`` per (model, provider), at bucket granularity."""
+        t = time.time() if now is None else now
+        r = self._ring_index(seconds)
+        width = self.resolutions[r][0]
+        last = int(t // width)
+        first = last - max(1, math.ceil(seconds / width)) + 1
+        with self._lock:
+            out = {key: rings[r].sum(first, last) for key, rings in self._rings.items()}
+        return {key: v for key, v in out.items() if v[0]}
+
+    def series(
+        self, seconds: float, now: Optional[float] = None
+    ) -> Tuple[int, Dict[Key, List[Totals]]]:
+        """(bucket width, per-bucket totals per key) covering the last ``seconds``."""
+        t = time.time() if now is None else now
+        r = self._ring_index(seconds)
+        width = self.resolutions[r][0]
+        count = max(1, math.ceil(seconds / width))
+        last = int(t // width)
+        with self._lock:
+            return width, {key: rings[r].series(last, count) for key, rings in self._rings.items()}
+
+    def totals(self) -> Dict[Key, Totals]:
+        """Cumulative totals per (model, provider) since creation."""
+        with self._lock:
+            return {key: (int(n), e, w, c) for key, (n, e, w, c) in self._totals.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rings.clear()
+            self._totals.clear()
+
+
+def combine(totals: Dict[Key, Totals]) -> Totals:
+    """Sum per-key totals into one (requests, energy_kWh, water_L, carbon_kg)."""
+    n, e, w, c = 0, 0.0, 0.0, 0.0
+    for tn, te, tw, tc in totals.values():
+        n += tn
+        e += te
+        w += tw
+        c += tc
+    return n, e, w, c
@@ -0,0 +1,245 @@
+"""
+scenarios.py  –  What-if sweeps of a workload over parameter overrides.
+
+A Workload reduces any number of requests to four sums per (model,
+provider): requests, output tokens, Σ tokens/tps and Σ latency.  That is
+all the energy equation needs, even after tps, latency or any lookup
+table entry is overridden.  sweep() evaluates the workload on every
+combination of a grid of overrides, e.g.
+
+    sweep(workload, {
+        "provider": ["azure-us", "aws-us"],
+        "hardware": ["H100x2", "A100"],
+        "tps_scale": np.linspace(0.5, 4, 50),
+        "cif": np.linspace(0.1, 0.6, 100),
+    })
+
+Each grid axis is one NumPy dimension, so the paper equations run once
+per workload group over the whole grid by broadcasting; there is no
+Python loop over grid points.  The result is a tidy DataFrame, one row
+per grid point, with a column per axis and energy_kwh / water_l /
+carbon_kg totals for the whole workload.
+
+Axes:
+    model         move every request to this model (its class and hardware)
+    provider      move every request to this provider (PUE, WUE, CIF)
+    hardware      run every model on this hardware key
+    class         use this utilisation class
+    tps           absolute decoding speed       (excludes tps_scale)
+    tps_scale     multiply every request's tps
+    latency_s     absolute latency per request
+    node_kw, pue, wue_site, wue_src, cif
+                  numeric overrides of the lookup tables
+    gpu, non_gpu  numeric overrides of one request's utilisation share
+
+Without a gpu / non_gpu override, the share is the class's at the
+model's batch (core.utilisation_at, resolved like model_phases: the
+model entry, then the hardware in use, then PHASE_DEFAULTS), so the
+baseline equals calculate_impact_batch over the same requests for any
+tables.  Requests are timed by their own tps / latency.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .batch import _broadcast
+from .core import PHASE_DEFAULTS, current_defaults, eq_carbon, eq_energy, eq_water, utilisation_at
+from .stream import DEFAULT_CHUNK, FIELD_DEFAULTS, iter_chunks, open_log
+
+
+NUMERIC_AXES = ("tps", "tps_scale", "latency_s",
+                "node_kw", "gpu", "non_gpu", "pue", "wue_site", "wue_src", "cif")
+NAMED_AXES   = ("model", "provider", "hardware", "class")
+AXES         = NAMED_AXES + NUMERIC_AXES
+
+OUTPUTS = ("energy_kwh", "water_l", "carbon_kg")
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Workload
+# ────────────────────────────────────────────────────────────────────
+class Workload:
+    """Per-(model, provider) sums: requests, tokens, Σ tokens/tps, Σ latency."""
+
+    def __init__(self):
+        self.groups: Dict[Tuple[str, str], np.ndarray] = {}
+
+    def add(self, model_names, tokens_out, tps=400, latency_s=0.075, providers="azure-us") -> None:
+        """Add a batch of requests; arguments broadcast as in calculate_impact_batch."""
+        lengths = [np.shape(v)[0] for v in (model_names, tokens_out, tps, latency_s, providers)
+                   if np.ndim(v) > 0]
+        n = lengths[0] if lengths else 1
+        models  = _broadcast(model_names, n).astype(str)
+        provs   = _broadcast(providers, n).astype(str)
+        tokens  = _broadcast(tokens_out, n, dtype=float)
+        tps_arr = _broadcast(tps, n, dtype=float)
+        latency = _broadcast(latency_s, n, dtype=float)
+
+        keys = np.char.add(np.char.add(models, "\t"), provs)
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        sums = np.vstack([
+            np.bincount(inverse, minlength=len(uniq)),
+            *(np.bincount(inverse, weights=v, minlength=len(uniq))
+              for v in (tokens, tokens / tps_arr, latency)),
+        ])
+        for i, key in enumerate(uniq.tolist()):
+            pair = tuple(key.split("\t", 1))
+            acc = self.groups.get(pair)
+            if acc is None:
+                self.groups[pair] = sums[:, i].copy()
+            else:
+                acc += sums[:, i]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Workload":
+        """From a DataFrame with model and tokens_out (optional provider / tps / latency_s)."""
+        w = cls()
+        w.add(df["model"].to_numpy(), df["tokens_out"].to_numpy(),
+              tps=df["tps"].to_numpy() if "tps" in df else FIELD_DEFAULTS["tps"],
+              latency_s=df["latency_s"].to_numpy() if "latency_s" in df else FIELD_DEFAULTS["latency_s"],
+              providers=df["provider"].to_numpy() if "provider" in df else FIELD_DEFAULTS["provider"])
+        return w
+
+    @classmethod
+    def from_log(cls, path: str, chunk_size: int = DEFAULT_CHUNK) -> "Workload":
+        """From a JSONL request log (see stream.py)."""
+        w = cls()
+        with open_log(path) as fh:
+            for chunk in iter_chunks(fh, chunk_size):
+                w.add(chunk.model, chunk.tokens_out, chunk.tps, chunk.latency_s, chunk.provider)
+        return w
+
+    @property
+    def requests(self) -> int:
+        return int(sum(g[0] for g in self.groups.values()))
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Sweep
+# ────────────────────────────────────────────────────────────────────
+def _lookup(cfg: Dict[str, Dict], section: str, names: Sequence[str], field: str) -> np.ndarray:
+    try:
+        return np.array([cfg[section][name][field] for name in names], dtype=float)
+    except KeyError as exc:
+        raise ValueError(f"unknown {section} entry {exc.args[0]!r}") from exc
+
+
+def sweep(
+    workload: Workload,
+    grid: Dict[str, Iterable],
+    cfg: Optional[Dict[str, Dict]] = None,
+) -> pd.DataFrame:
+    """
+    Total energy / water / carbon of ``workload`` at every grid point.
+
+    ``grid`` maps axis names (see module docstring) to the values to try;
+    axes vary in the order given, the last one fastest.  The baseline
+    totals (no overrides) are in ``df.attrs["baseline"]``.
+    """
+    cfg = current_defaults() if cfg is None else cfg
+    for name in grid:
+        if name not in AXES:
+            raise ValueError(f"unknown axis {name!r}; choose from {AXES}")
+    if "tps" in grid and "tps_scale" in grid:
+        raise ValueError("use either 'tps' or 'tps_scale', not both")
+
+    axes   = {name: list(values) for name, values in grid.items()}
+    names  = list(axes)
+    shape  = tuple(len(v) for v in axes.values())
+
+    def along(name: str, values) -> np.ndarray:
+        """Values laid out along the axis' own dimension."""
+        view = [1] * len(shape)
+        view[names.index(name)] = len(axes[name])
+        return np.asarray(values, dtype=float).reshape(view)
+
+    def model_field(section: str, field: str, spec_key: str, model_name: str):
+        # explicit axis beats "model" axis beats the workload's own model
+        if spec_key in axes:
+            return along(spec_key, _lookup(cfg, section, axes[spec_key], field))
+        if "model" in axes:
+            try:
+                keys = [cfg["models"][m][spec_key] for m in axes["model"]]
+            except KeyError as exc:
+                raise ValueError(f"unknown model {exc.args[0]!r}") from exc
+            return along("model", _lookup(cfg, section, keys, field))
+        return cfg[section][cfg["models"][model_name][spec_key]][field]
+
+    def utilisation(model_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(gpu, non_gpu) at each model's batch, laid out along the model / class / hardware axes."""
+        dims = [name for name in ("model", "class", "hardware") if name in axes]
+        models = axes.get("model", [model_name])
+        gpu = np.empty((len(models), len(axes.get("class", [0])), len(axes.get("hardware", [0]))))
+        non_gpu = np.empty_like(gpu)
+        try:
+            for i, m in enumerate(models):
+                spec = cfg["models"][m]
+                for j, cls in enumerate(axes.get("class", [spec["class"]])):
+                    for k, hw in enumerate(axes.get("hardware", [spec["hardware"]])):
+                        batch = spec.get("batch", cfg["hardware"][hw].get("batch", PHASE_DEFAULTS["batch"]))
+                        gpu[i, j, k], non_gpu[i, j, k] = utilisation_at(cfg["utilisation"][cls], batch)
+        except KeyError as exc:
+            raise ValueError(f"unknown model, class or hardware {exc.args[0]!r}") from exc
+
+        order = sorted(range(len(dims)), key=lambda d: names.index(dims[d]))
+        view = [1] * len(shape)
+        for name in dims:
+            view[names.index(name)] = len(axes[name])
+
+        def lay_out(values: np.ndarray) -> np.ndarray:
+            values = values.reshape([len(axes[name]) for name in dims])
+            return values.transpose(order).reshape(view) if dims else values.item()
+
+        return lay_out(gpu), lay_out(non_gpu)
+
+    energy = np.zeros(shape)
+    water  = np.zeros(shape)
+    carbon = np.zeros(shape)
+    for (model_name, provider), (n, tokens, token_seconds, latency) in workload.groups.items():
+        gpu, non_gpu = utilisation(model_name)
+        p = {
+            "node_kw": model_field("hardware", "node_kw", "hardware", model_name),
+            "gpu":     gpu,
+            "non_gpu": non_gpu,
+        }
+        for field in ("pue", "wue_site", "wue_src", "cif"):
+            if "provider" in axes:
+                p[field] = along("provider", _lookup(cfg, "env", axes["provider"], field))
+            else:
+                p[field] = cfg["env"][provider][field]
+        for field in ("node_kw", "gpu", "non_gpu", "pue", "wue_site", "wue_src", "cif"):
+            if field in axes:
+                p[field] = along(field, axes[field])
+
+        if "tps" in axes:
+            decode_s = tokens / along("tps", axes["tps"])
+        elif "tps_scale" in axes:
+            decode_s = token_seconds / along("tps_scale", axes["tps_scale"])
+        else:
+            decode_s = token_seconds
+        wait_s = n * along("latency_s", axes["latency_s"]) if "latency_s" in axes else latency
+
+        # eq_energy with the group's summed seconds (tokens/tps already applied)
+        e = eq_energy(decode_s, 1, wait_s, p["node_kw"], p["gpu"], p["non_gpu"], p["pue"])
+        energy += e
+        water  += eq_water(e, p["pue"], p["wue_site"], p["wue_src"])
+        carbon += eq_carbon(e, p["cif"])
+
+    codes = np.unravel_index(np.arange(energy.size), shape) if shape else ()
+    columns = {}
+    for name, idx in zip(names, codes):
+        values = axes[name]
+        if name in NAMED_AXES and len(set(values)) == len(values):
+            columns[name] = pd.Categorical.from_codes(idx, categories=values)
+        else:
+            columns[name] = np.asarray(values)[idx]
+    columns.update(energy_kwh=energy.ravel(), water_l=water.ravel(), carbon_kg=carbon.ravel())
+
+    df = pd.DataFrame(columns)
+    df.attrs["requests"] = workload.requests
+    if grid:
+        base = sweep(workload, {}, cfg)
+        df.attrs["baseline"] = {k: float(base[k].iloc[0]) for k in OUTPUTS}
+    return df
@@ -0,0 +1,319 @@
+"""
+store.py  –  Columnar in-memory store for accounted requests.
+
+Keeping one Python tuple or dict per accounted request costs ~200 bytes
+per event.  EventStore keeps fixed-width NumPy columns instead:
+
+    ts          float64   epoch seconds
+    model       uint16    code into EventStore.models
+    provider    uint16    code into EventStore.providers
+    tokens_out  uint32
+    energy_kwh  float32
+    water_l     float32
+    carbon_kg   float32
+
+i.e. 28 bytes per event, so a few hundred million events fit in a few GB.
+Columns are stored in fixed-size blocks, so appending never copies what
+is already stored.  Each block records its time range and whether its
+timestamps are sorted; time slices skip blocks outside the range and use
+a binary search inside sorted blocks.  Group-by sums run np.bincount over
+the integer codes, block by block, without creating per-event objects.
+
+Library entry points:
+    store = EventStore()
+    store.append_chunk(chunk, e, w, c)          # from stream.iter_chunks
+    store.append_batch(models, providers, ts, tokens_out, e, w, c)
+    store.slice(t0, t1)                         → dict of column arrays
+    store.group_sums(by=("model",), t0, t1, bucket_s=3600)
+"""
+
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rolling import epoch_seconds
+
+
+BLOCK_ROWS = 1 << 20
+
+COLUMNS: Dict[str, np.dtype] = {
+    "ts":         np.dtype(np.float64),
+    "model":      np.dtype(np.uint16),
+    "provider":   np.dtype(np.uint16),
+    "tokens_out": np.dtype(np.uint32),
+    "energy_kwh": np.dtype(np.float32),
+    "water_l":    np.dtype(np.float32),
+    "carbon_kg":  np.dtype(np.float32),
+}
+ROW_BYTES = sum(dt.itemsize for dt in COLUMNS.values())
+
+GROUP_FIELDS = ("model", "provider")
+
+
+class _Block:
+    """One fixed-capacity slab of every column."""
+
+    __slots__ = ("cols", "rows", "ts_min", "ts_max", "ts_sorted")
+
+    def __init__(self, capacity: int):
+        self.cols = {name: np.empty(capacity, dtype=dt) for name, dt in COLUMNS.items()}
+        self.rows = 0
+        self.ts_min = np.inf
+        self.ts_max = -np.inf
+        self.ts_sorted = True
+
+    @property
+    def capacity(self) -> int:
+        return len(self.cols["ts"])
+
+    def view(self, name: str) -> np.ndarray:
+        return self.cols[name][: self.rows]
+
+    def bounds(self, t0: Optional[float], t1: Optional[float]) -> Tuple[int, int]:
+        """Row range [lo, hi) with t0 <= ts < t1 (the block must be sorted)."""
+        ts = self.view("ts")
+        lo = 0 if t0 is None else int(np.searchsorted(ts, t0, side="left"))
+        hi = self.rows if t1 is None else int(np.searchsorted(ts, t1, side="left"))
+        return lo, hi
+
+
+class NameCodes:
+    """Dictionary encoding: name ↔ uint16 code, in order of first appearance."""
+
+    def __init__(self, names: Sequence[str] = ()):
+        self.names: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for name in names:
+            self.code(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            if len(self.names) > np.iinfo(np.uint16).max:
+                raise ValueError("too many distinct names for a uint16 code")
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def encode(self, values, n: int) -> np.ndarray:
+        """Codes for a scalar or an array of names; np.unique keeps the Python work per distinct name."""
+        if isinstance(values, str):
+            return np.full(n, self.code(values), dtype=np.uint16)
+        uniq, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        table = np.array([self.code(u) for u in uniq.tolist()], dtype=np.uint16)
+        return table[inverse]
+
+
+def encode_columns(
+    model_codes: NameCodes, provider_codes: NameCodes,
+    models, providers, ts, tokens_out, energy_kwh, water_l, carbon_kg,
+) -> Dict[str, np.ndarray]:
+    """Validate and convert one batch of events to the COLUMNS dtypes."""
+    e = np.asarray(energy_kwh, dtype=COLUMNS["energy_kwh"])
+    n = len(e)
+    cols = {
+        "ts":         np.broadcast_to(np.asarray(ts, dtype=COLUMNS["ts"]), n),
+        "model":      model_codes.encode(models, n),
+        "provider":   provider_codes.encode(providers, n),
+        "tokens_out": np.broadcast_to(np.asarray(tokens_out, dtype=COLUMNS["tokens_out"]), n),
+        "energy_kwh": e,
+        "water_l":    np.asarray(water_l, dtype=COLUMNS["water_l"]),
+        "carbon_kg":  np.asarray(carbon_kg, dtype=COLUMNS["carbon_kg"]),
+    }
+    for name, values in cols.items():
+        if len(values) != n:
+            raise ValueError(f"column {name!r} has {len(values)} values, expected {n}")
+    return cols
+
+
+def chunk_ts(chunk, default_ts: Optional[float] = None) -> np.ndarray:
+    """Epoch-second timestamps of a stream.Chunk; missing "ts" → ``default_ts`` (now)."""
+    now = time.time() if default_ts is None else default_ts
+    return np.fromiter(
+        (now if t is None else epoch_seconds(t) for t in chunk.ts),
+        dtype=np.float64, count=len(chunk),
+    )
+
+
+class EventStore:
+    """Append-only columnar store of per-request results."""
+
+    def __init__(self, block_rows: int = BLOCK_ROWS):
+        self.block_rows = block_rows
+        self._model_codes    = NameCodes()
+        self._provider_codes = NameCodes()
+        self._blocks: List[_Block] = []
+
+    @property
+    def models(self) -> List[str]:
+        return self._model_codes.names
+
+    @property
+    def providers(self) -> List[str]:
+        return self._provider_codes.names
+
+    # ── appending ─────────────────────────────────────────────────────
+    def _tail(self) -> _Block:
+        if not self._blocks or self._blocks[-1].rows == self._blocks[-1].capacity:
+            self._blocks.append(_Block(self.block_rows))
+        return self._blocks[-1]
+
+    def _append_columns(self, cols: Dict[str, np.ndarray]) -> None:
+        n = len(cols["ts"])
+        done = 0
+        while done < n:
+            block = self._tail()
+            take = min(n - done, block.capacity - block.rows)
+            part = slice(done, done + take)
+            rows = slice(block.rows, block.rows + take)
+            for name, values in cols.items():
+                block.cols[name][rows] = values[part]
+
+            ts = cols["ts"][part]
+            if block.ts_sorted:
+                block.ts_sorted = bool(
+                    (block.rows == 0 or ts[0] >= block.ts_max) and np.all(ts[1:] >= ts[:-1])
+                )
+            block.ts_min = min(block.ts_min, float(ts.min()))
+            block.ts_max = max(block.ts_max, float(ts.max()))
+            block.rows += take
+            done += take
+
+    def append_batch(self, models, providers, ts, tokens_out, energy_kwh, water_l, carbon_kg) -> None:
+        """Append arrays of events; ``models`` / ``providers`` may be scalars."""
+        cols = encode_columns(self._model_codes, self._provider_codes,
+                              models, providers, ts, tokens_out, energy_kwh, water_l, carbon_kg)
+        if len(cols["ts"]):
+            self._append_columns(cols)
+
+    def append_chunk(self, chunk, e, w, c, default_ts: Optional[float] = None) -> None:
+        """Append a stream.Chunk and its results; events without "ts" get ``default_ts`` (now)."""
+        self.append_batch(chunk.model, chunk.provider, chunk_ts(chunk, default_ts),
+                          chunk.tokens_out, e, w, c)
+
+    def append(self, model_name: str, provider: str, ts: float, tokens_out: int,
+               e: float, w: float, c: float) -> None:
+        """Append one event (prefer append_batch for volume)."""
+        self.append_batch(model_name, provider, [ts], [tokens_out], [e], [w], [c])
+
+    # ── reading ───────────────────────────────────────────────────────
+    def __len__(self) -> int:
+        return sum(b.rows for b in self._blocks)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes allocated by the column blocks."""
+        return sum(b.capacity for b in self._blocks) * ROW_BYTES
+
+    def _parts(
+        self, t0: Optional[float], t1: Optional[float], columns: Sequence[str]
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """Column views per block restricted to t0 <= ts < t1 (views for sorted blocks)."""
+        for block in self._blocks:
+            if block.rows == 0:
+                continue
+            if (t0 is not None and block.ts_max < t0) or (t1 is not None and block.ts_min >= t1):
+                continue
+            if block.ts_sorted:
+                lo, hi = block.bounds(t0, t1)
+                if hi > lo:
+                    yield {name: block.view(name)[lo:hi] for name in columns}
+                continue
+            ts = block.view("ts")
+            mask = np.ones(block.rows, dtype=bool)
+            if t0 is not None:
+                mask &= ts >= t0
+            if t1 is not None:
+                mask &= ts < t1
+            if mask.any():
+                yield {name: block.view(name)[mask] for name in columns}
+
+    def slice(
+        self, t0: Optional[float] = None, t1: Optional[float] = None,
+        columns: Sequence[str] = tuple(COLUMNS),
+    ) -> Dict[str, np.ndarray]:
+        """Columns of the events with t0 <= ts < t1, concatenated across blocks."""
+        parts = list(self._parts(t0, t1, columns))
+        if len(parts) == 1:
+            return parts[0]
+        return {
+            name: np.concatenate([p[name] for p in parts]) if parts
+            else np.empty(0, dtype=COLUMNS[name])
+            for name in columns
+        }
+
+    def group_sums(
+        self,
+        by: Sequence[str] = GROUP_FIELDS,
+        t0: Optional[float] = None,
+        t1: Optional[float] = None,
+        bucket_s: Optional[float] = None,
+    ) -> Dict[tuple, Tuple[int, float, float, float]]:
+        """
+        {key: (requests, energy_kWh, water_L, carbon_kg)} for t0 <= ts < t1.
+
+        ``by`` is any of "model" / "provider"; with ``bucket_s`` the key also
+        ends with the bucket start (epoch seconds).  Sums are accumulated in
+        float64.
+        """
+        columns = list(by) + ["ts", "energy_kwh", "water_l", "carbon_kg"]
+        names = {"model": self.models, "provider": self.providers}
+        return group_parts(self._parts(t0, t1, columns), by, names, bucket_s)
+
+
+def group_parts(
+    parts, by: Sequence[str], names: Dict[str, List[str]], bucket_s: Optional[float] = None
+) -> Dict[tuple, Tuple[int, float, float, float]]:
+    """
+    Group-by sums over an iterable of column dicts (EventStore blocks,
+    slices of a records file, ...).  ``names`` maps "model" / "provider"
+    to the code → name lists.
+    """
+    for field in by:
+        if field not in GROUP_FIELDS:
+            raise ValueError(f"cannot group by {field!r}; choose from {GROUP_FIELDS}")
+    width = [len(names[f]) for f in by]
+
+    acc: Dict[Tuple[int, Optional[int]], np.ndarray] = {}
+    for part in parts:
+        key = np.zeros(len(part["ts"]), dtype=np.int64)
+        for field, size in zip(by, width):
+            key = key * size + part[field]
+        if bucket_s:
+            bucket = np.floor(part["ts"] / bucket_s).astype(np.int64)
+            base = int(bucket.min())
+            span = int(bucket.max()) - base + 1
+            key = key * span + (bucket - base)
+        uniq, inverse = np.unique(key, return_inverse=True)
+        sums = np.vstack([
+            np.bincount(inverse, minlength=len(uniq)),
+            *(np.bincount(inverse, weights=part[v], minlength=len(uniq))
+              for v in ("energy_kwh", "water_l", "carbon_kg")),
+        ])
+        for i, k in enumerate(uniq.tolist()):
+            if bucket_s:
+                k, b = divmod(k, span)
+                k = (k, b + base)
+            else:
+                k = (k, None)
+            slot = acc.get(k)
+            if slot is None:
+                acc[k] = sums[:, i].copy()
+            else:
+                slot += sums[:, i]
+
+    out = {}
+    for (k, b), (n, e, w, c) in acc.items():
+        key = []
+        for field, size in reversed(list(zip(by, width))):
+            k, code = divmod(k, size)
+            key.append(names[field][code])
+        key.reverse()
+        if b is not None:
+            key.append(b * bucket_s)
+        out[tuple(key)] = (int(n), float(e), float(w), float(c))
+    return out
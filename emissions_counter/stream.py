@@ -0,0 +1,267 @@
+"""
+stream.py  –  Streaming accounting for JSONL request logs.
+
+Each input line is one request, e.g.
+
+    {"model": "o3", "provider": "azure-us", "tokens_out": 812,
+     "tps": 400, "latency_s": 0.075}
+
+Only "model" and "tokens_out" are required; the other fields fall back
+to the calculate_impact defaults.  tokens_out and latency_s must be
+finite numbers >= 0 and tps a finite number > 0; a line that breaks
+this stops the run with its line number instead of turning the totals
+into NaN.  An optional "ts" (epoch seconds or
+ISO 8601) is carried along for time-bucketed accounting.  Files are read
+line by line and evaluated in fixed-size chunks with
+calculate_impact_batch, so memory stays bounded by the chunk size.
+".gz" and ".zst"/".zstd" inputs are decompressed on the fly (zstd needs
+the optional ``zstandard`` package).
+
+Library entry points:
+    stream_impact(path, chunk_size)       → per-chunk results
+    aggregate_impact(path, chunk_size)    → totals per (model, provider)
+
+Command line:
+    python -m emissions_counter.stream requests.jsonl.gz -o results.jsonl
+    python -m emissions_counter.stream requests.jsonl --aggregate
+"""
+
+import argparse
+import gzip
+import io
+import json
+import sys
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .batch import calculate_impact_batch
+
+
+FIELD_DEFAULTS = {"provider": "azure-us", "tps": 400, "latency_s": 0.075}
+DEFAULT_CHUNK  = 50_000
+
+# (model, provider) → [requests, energy_kWh, water_L, carbon_kg]
+Totals = Dict[Tuple[str, str], List[float]]
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Input
+# ────────────────────────────────────────────────────────────────────
+def open_log(path: str) -> IO[str]:
+    """Open a (possibly compressed) JSONL file for text reading; "-" is stdin."""
+    if path == "-":
+        return open(sys.stdin.fileno(), "r", encoding="utf-8", closefd=False)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith((".zst", ".zstd")):
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise ImportError(
+                "reading .zst logs requires the 'zstandard' package"
+            ) from exc
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+class Chunk:
+    """Column lists for one chunk of parsed request records."""
+
+    __slots__ = ("records", "model", "provider", "tokens_out", "tps", "latency_s", "ts")
+
+    def __init__(self):
+        self.records:    List[dict]  = []
+        self.model:      List[str]   = []
+        self.provider:   List[str]   = []
+        self.tokens_out: List[float] = []
+        self.tps:        List[float] = []
+        self.latency_s:  List[float] = []
+        self.ts:         List[object] = []
+
+    def __len__(self) -> int:
+        return len(self.model)
+
+    def append(self, rec: dict) -> None:
+        self.records.append(rec)
+        self.model.append(rec["model"])
+        self.provider.append(rec.get("provider", FIELD_DEFAULTS["provider"]))
+        self.tokens_out.append(rec["tokens_out"])
+        self.tps.append(rec.get("tps", FIELD_DEFAULTS["tps"]))
+        self.latency_s.append(rec.get("latency_s", FIELD_DEFAULTS["latency_s"]))
+        self.ts.append(rec.get("ts"))
+
+
+# field → (accepts 0, expectation in messages)
+NUMERIC_FIELDS = {
+    "tokens_out": (True,  "a finite number >= 0"),
+    "tps":        (False, "a finite number > 0"),
+    "latency_s":  (True,  "a finite number >= 0"),
+}
+
+
+def _float_column(values: List) -> Tuple[np.ndarray, Optional[int]]:
+    """(the values before the first non-numeric one as floats, its index or None)."""
+    try:
+        column = np.asarray(values, dtype=float)
+        if column.shape == (len(values),):
+            return column, None
+    except (TypeError, ValueError):
+        pass
+    head: List[float] = []
+    for value in values:
+        try:
+            head.append(float(value))
+        except (TypeError, ValueError):
+            break
+    return np.array(head), len(head)
+
+
+def invalid_row(chunk: Chunk) -> Optional[Tuple[int, str]]:
+    """(row, problem) of the first record with a bad tokens_out / tps / latency_s, else None."""
+    bad = []
+    for name, (zero_ok, expected) in NUMERIC_FIELDS.items():
+        values = getattr(chunk, name)
+        column, i = _float_column(values)
+        if i is not None:
+            bad.append((i, f"non-numeric {name} {values[i]!r}"))
+        ok = np.isfinite(column) & ((column >= 0) if zero_ok else (column > 0))
+        if not ok.all():
+            i = int(np.argmin(ok))
+            bad.append((i, f"{name} must be {expected}, got {values[i]!r}"))
+    return min(bad, key=lambda b: b[0]) if bad else None
+
+
+def iter_chunks(lines, chunk_size: int = DEFAULT_CHUNK, validate: bool = True) -> Iterator[Chunk]:
+    """
+    Parse JSONL lines into Chunks of at most chunk_size records.
+
+    With ``validate`` each chunk is checked with invalid_row() and the
+    first bad record raises ValueError with its line number.
+    """
+    chunk = Chunk()
+    linenos: List[int] = []
+
+    def checked(chunk: Chunk) -> Chunk:
+        bad = invalid_row(chunk) if validate else None
+        if bad is not None:
+            raise ValueError(f"line {linenos[bad[0]]}: {bad[1]}")
+        return chunk
+
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+            chunk.append(rec)
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError(f"line {lineno}: invalid request record ({exc})") from exc
+        linenos.append(lineno)
+        if len(chunk) >= chunk_size:
+            yield checked(chunk)
+            chunk = Chunk()
+            linenos = []
+    if len(chunk):
+        yield checked(chunk)
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Accounting
+# ────────────────────────────────────────────────────────────────────
+def impact_of_chunk(chunk: Chunk) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Run calculate_impact_batch over one chunk."""
+    return calculate_impact_batch(
+        chunk.model, chunk.tokens_out,
+        tps=chunk.tps, latency_s=chunk.latency_s, providers=chunk.provider,
+    )
+
+
+def stream_impact(
+    path: str, chunk_size: int = DEFAULT_CHUNK
+) -> Iterator[Tuple[Chunk, np.ndarray, np.ndarray, np.ndarray]]:
+    """Yield (chunk, energy_kWh, water_L, carbon_kg) for every chunk of a log."""
+    with open_log(path) as fh:
+        for chunk in iter_chunks(fh, chunk_size):
+            e, w, c = impact_of_chunk(chunk)
+            yield chunk, e, w, c
+
+
+def add_chunk_totals(totals: Totals, chunk: Chunk, e, w, c) -> None:
+    """Fold one chunk's results into per-(model, provider) totals."""
+    keys = np.char.add(
+        np.char.add(np.asarray(chunk.model, dtype=str), "\t"),
+        np.asarray(chunk.provider, dtype=str),
+    )
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(uniq))
+    sums = [np.bincount(inverse, weights=v, minlength=len(uniq)) for v in (e, w, c)]
+    for i, key in enumerate(uniq):
+        model_name, provider = str(key).split("\t", 1)
+        acc = totals.setdefault((model_name, provider), [0, 0.0, 0.0, 0.0])
+        acc[0] += int(counts[i])
+        acc[1] += float(sums[0][i])
+        acc[2] += float(sums[1][i])
+        acc[3] += float(sums[2][i])
+
+
+def aggregate_impact(path: str, chunk_size: int = DEFAULT_CHUNK) -> Totals:
+    """Return {(model, provider): [requests, energy_kWh, water_L, carbon_kg]}."""
+    totals: Totals = {}
+    for chunk, e, w, c in stream_impact(path, chunk_size):
+        add_chunk_totals(totals, chunk, e, w, c)
+    return totals
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Command line
+# ────────────────────────────────────────────────────────────────────
+def _write_requests(path: str, out: IO[str], chunk_size: int) -> None:
+    for chunk, e, w, c in stream_impact(path, chunk_size):
+        for rec, ei, wi, ci in zip(chunk.records, e.tolist(), w.tolist(), c.tolist()):
+            rec["energy_kwh"] = ei
+            rec["water_l"]    = wi
+            rec["carbon_kg"]  = ci
+            out.write(json.dumps(rec))
+            out.write("\n")
+
+
+def _write_totals(totals: Totals, out: IO[str]) -> None:
+    for (model_name, provider), (n, e, w, c) in sorted(totals.items()):
+        out.write(json.dumps({
+            "model": model_name, "provider": provider, "requests": n,
+            "energy_kwh": e, "water_l": w, "carbon_kg": c,
+        }))
+        out.write("\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m emissions_counter.stream",
+        description="Compute energy / water / carbon for a JSONL request log.",
+    )
+    parser.add_argument("input", help="JSONL log (.gz / .zst accepted, '-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output JSONL (default: stdout)")
+    parser.add_argument("--aggregate", action="store_true",
+                        help="write totals per (model, provider) instead of per request")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK,
+                        help=f"records per vectorised batch (default: {DEFAULT_CHUNK})")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        if args.aggregate:
+            _write_totals(aggregate_impact(args.input, args.chunk_size), out)
+        else:
+            _write_requests(args.input, out, args.chunk_size)
+    except ValueError as exc:
+        print(f"{args.input}: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+tables.py  –  Dense impact tables over a bounded token range.
+
+An interactive front end asks for the same handful of (model, provider)
+pairs over and over, with prompt and output lengths from a bounded
+input range.  ImpactTable tabulates, for every pair in the compiled
+coefficient table, the two phase times of calculate_phase_impact:
+
+    prefill_s[p] = ttft_s + p / prefill_tps      p = 0 … max_prompt_tokens
+    decode_s[t]  = t / decode_tps                t = 0 … max_tokens_out
+
+so one query is two list indexings and the same three multiplications
+as the scalar path, and the result is bit-for-bit the one of
+calculate_phase_impact at the model's default batch:
+
+    table  = ImpactTable(max_prompt_tokens=8192, max_tokens_out=2000)
+    e, w, c = table.lookup("o3", "azure-us", prompt_tokens, tokens_out)
+
+Token counts outside the table (or fractional ones) fall back to
+calculate_phase_impact.  The table rebuilds itself on the next lookup
+after the coefficients change, and rebuild() can be hooked to
+core.on_defaults_change to do that work ahead of the next request.
+The built state is published in one assignment, so concurrent lookups
+see either the old or the new table, never a mix.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .core import _Active, _snapshot, calculate_phase_impact
+
+
+class _Row(NamedTuple):
+    prefill_s:     List[float]
+    decode_s:      List[float]
+    kwh_per_s:     float
+    water_per_kwh: float
+    cif:           float
+
+
+class _Table(NamedTuple):
+    version: int
+    rows: Dict[Tuple[str, str], _Row]
+
+
+class ImpactTable:
+    """(energy_kWh, water_L, carbon_kg) by prompt and output tokens, per (model, provider)."""
+
+    def __init__(self, max_prompt_tokens: int, max_tokens_out: int):
+        if max_prompt_tokens < 0 or max_tokens_out < 0:
+            raise ValueError("table bounds must be >= 0")
+        self.max_prompt_tokens = int(max_prompt_tokens)
+        self.max_tokens_out    = int(max_tokens_out)
+        self._table = _Table(-1, {})                         # built on the first lookup
+
+    def _build(self, active: _Active) -> _Table:
+        prompt = np.arange(self.max_prompt_tokens + 1, dtype=float)
+        tokens = np.arange(self.max_tokens_out + 1, dtype=float)
+        rows = {
+            pair: _Row(
+                (k.ttft_s + prompt / k.prefill_tps).tolist(),
+                (tokens / k.decode_tps).tolist(),
+                k.kwh_per_s, k.water_per_kwh, k.cif,
+            )
+            for pair, k in active.table.items()
+        }
+        return _Table(active.version, rows)
+
+    def rebuild(self, active: Optional[_Active] = None) -> None:
+        """Tabulate every pair from the current tables (or the given snapshot)."""
+        self._table = self._build(_snapshot() if active is None else active)
+
+    def _current(self) -> _Table:
+        active = _snapshot()
+        table = self._table
+        if table.version != active.version:
+            table = self._table = self._build(active)
+        return table
+
+    def lookup(
+        self,
+        model_name: str,
+        provider: str,
+        prompt_tokens: int,
+        tokens_out: int,
+    ) -> Tuple[float, float, float]:
+        """Same result as calculate_phase_impact(model_name, prompt_tokens, tokens_out, provider)."""
+        row = self._current().rows.get((model_name, provider))
+        if (row is None
+                or type(prompt_tokens) is not int or type(tokens_out) is not int
+                or not 0 <= prompt_tokens <= self.max_prompt_tokens
+                or not 0 <= tokens_out <= self.max_tokens_out):
+            return calculate_phase_impact(model_name, prompt_tokens, tokens_out, provider)
+        e = (row.prefill_s[prompt_tokens] + row.decode_s[tokens_out]) * row.kwh_per_s
+        return e, e * row.water_per_kwh, e * row.cif
@@ -0,0 +1,278 @@
+"""
+tokens.py  –  Prompt token counting with pluggable backends.
+
+Public entry points:
+    count_tokens(text, model_name=None)   – token count with the model's backend
+    estimate_tokens(text)                 – the app's default heuristic
+    count_words(text)                     – number of \\w+ runs, without building a list
+
+Backends (all offline):
+    "regex"  RegexCounter      words / 0.75 (the original heuristic)
+    "chars"  CharRatioCounter  characters / 4
+    "bpe"    BPECounter        byte-level BPE from a local merges / tokenizer.json file
+
+Backends are registered by name with register_counter() and chosen per
+model through MODEL_TOKENIZERS (models not listed use DEFAULT_TOKENIZER).
+count_tokens keeps an LRU cache keyed on a hash of the text, so a
+re-submitted prompt is not tokenised again.
+
+Interactive use re-counts a prompt that only grew at the end on every
+keystroke.  IncrementalWordCounter remembers the word count of recently
+seen prefixes (cut at a word boundary) and only scans the new tail, so
+the regex work per edit no longer grows with the prompt length.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterable, Optional, Sequence, Tuple
+
+
+WORD_RE  = re.compile(r"\w+")
+_WORD_CH = re.compile(r"\w")
+
+WORDS_PER_TOKEN = 0.75
+CHARS_PER_TOKEN = 4.0
+
+
+def count_words(text: str) -> int:
+    """Count \\w+ runs; subn counts in C without materialising the matches."""
+    return WORD_RE.subn("", text)[1] if text else 0
+
+
+class IncrementalWordCounter:
+    """
+    Word counter that reuses the counts of recently seen prefixes.
+
+    Each call records (prefix, words) where prefix ends just before the
+    text's trailing word, so no word can straddle it.  A later text that
+    starts with a recorded prefix only has its remainder scanned.
+    """
+
+    def __init__(self, history: int = 16):
+        self._states: Deque[Tuple[str, int]] = deque(maxlen=history)
+
+    @staticmethod
+    def _trailing_word_start(text: str) -> int:
+        i = len(text)
+        while i > 0 and _WORD_CH.match(text, i - 1):
+            i -= 1
+        return i
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+
+        base, base_words = "", 0
+        for prefix, words in tuple(self._states):     # snapshot; other threads may append
+            if len(prefix) > len(base) and text.startswith(prefix):
+                base, base_words = prefix, words
+
+        cut = self._trailing_word_start(text)
+        head_words = base_words + count_words(text[len(base):cut])
+        if cut > len(base):
+            self._states.append((text[:cut], head_words))
+        return head_words + (1 if cut < len(text) else 0)
+
+    def clear(self) -> None:
+        self._states.clear()
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Backends
+# ────────────────────────────────────────────────────────────────────
+class TokenCounter:
+    """Base class: count(text) returns the number of tokens."""
+
+    name = "base"
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+
+class RegexCounter(TokenCounter):
+    """Words (\\w+ runs) divided by words-per-token."""
+
+    name = "regex"
+
+    def __init__(self, words_per_token: float = WORDS_PER_TOKEN):
+        self.words_per_token = words_per_token
+        self._words = IncrementalWordCounter()
+
+    def count(self, text: str) -> int:
+        return int(self._words.count(text) / self.words_per_token) if text else 0
+
+
+class CharRatioCounter(TokenCounter):
+    """Characters divided by characters-per-token."""
+
+    name = "chars"
+
+    def __init__(self, chars_per_token: float = CHARS_PER_TOKEN):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token) if text else 0
+
+
+def _bytes_to_unicode() -> Dict[int, str]:
+    """GPT-2's reversible byte → printable-character table."""
+    bs = (list(range(ord("!"), ord("~") + 1))
+          + list(range(ord("¡"), ord("¬") + 1))
+          + list(range(ord("®"), ord("ÿ") + 1)))
+    cs = bs[:]
+    n = 0
+    for b in range(256):
+        if b not in bs:
+            bs.append(b)
+            cs.append(256 + n)
+            n += 1
+    return dict(zip(bs, map(chr, cs)))
+
+
+class BPECounter(TokenCounter):
+    """
+    Byte-level BPE (GPT-2 style) token counter.
+
+    Only the merge list is needed to count tokens.  Load it with
+    from_file() from a ``merges.txt`` or a Hugging Face ``tokenizer.json``.
+    Counts per pre-tokenised piece are cached, so repeated words cost one
+    dict lookup.
+    """
+
+    name = "bpe"
+
+    # GPT-2 pre-tokeniser, expressed with the stdlib ``re`` classes
+    PRETOKEN_RE = re.compile(
+        r"""'s|'t|'re|'ve|'m|'ll|'d| ?[^\W\d_]+| ?\d+| ?(?:[^\s\w]|_)+|\s+(?!\S)|\s+"""
+    )
+    _BYTE_ENCODER = _bytes_to_unicode()
+
+    def __init__(self, merges: Iterable[Tuple[str, str]], cache_size: int = 200_000):
+        self.ranks: Dict[Tuple[str, str], int] = {
+            tuple(pair): i for i, pair in enumerate(merges)
+        }
+        self.cache_size = cache_size
+        self._piece_tokens: Dict[str, int] = {}
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "BPECounter":
+        """Load merges from ``merges.txt`` or a ``tokenizer.json``."""
+        with open(path, "r", encoding="utf-8") as fh:
+            if path.endswith(".json"):
+                merges = json.load(fh)["model"]["merges"]
+                pairs = [m.split(" ", 1) if isinstance(m, str) else m for m in merges]
+            else:
+                pairs = [
+                    line.split()
+                    for line in fh
+                    if line.strip() and not line.startswith("#version")
+                ]
+        return cls(pairs, **kwargs)
+
+    def _bpe_len(self, word: Sequence[str]) -> int:
+        ranks = self.ranks
+        word = tuple(word)
+        while len(word) > 1:
+            pairs = set(zip(word, word[1:]))
+            first, second = min(pairs, key=lambda p: ranks.get(p, float("inf")))
+            if (first, second) not in ranks:
+                break
+            merged, i = [], 0
+            while i < len(word):
+                if i < len(word) - 1 and word[i] == first and word[i + 1] == second:
+                    merged.append(first + second)
+                    i += 2
+                else:
+                    merged.append(word[i])
+                    i += 1
+            word = tuple(merged)
+        return len(word)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        cache = self._piece_tokens
+        enc = self._BYTE_ENCODER
+        total = 0
+        for piece in self.PRETOKEN_RE.findall(text):
+            n = cache.get(piece)
+            if n is None:
+                n = self._bpe_len([enc[b] for b in piece.encode("utf-8")])
+                if len(cache) >= self.cache_size:
+                    cache.clear()
+                cache[piece] = n
+            total += n
+        return total
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Registry and per-model selection
+# ────────────────────────────────────────────────────────────────────
+COUNTERS: Dict[str, TokenCounter] = {
+    "regex": RegexCounter(),
+    "chars": CharRatioCounter(),
+}
+
+# Menu name → backend name; e.g. MODEL_TOKENIZERS["GPT-4o"] = "bpe"
+MODEL_TOKENIZERS: Dict[str, str] = {}
+DEFAULT_TOKENIZER = "regex"
+
+CACHE_SIZE = 4096
+
+_cache: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def register_counter(name: str, counter: TokenCounter) -> None:
+    """Make a backend available to count_tokens under ``name``."""
+    COUNTERS[name] = counter
+    clear_cache()
+
+
+def counter_for(model_name: Optional[str] = None) -> Tuple[str, TokenCounter]:
+    """Return (backend name, backend) for a model."""
+    name = MODEL_TOKENIZERS.get(model_name, DEFAULT_TOKENIZER)
+    return name, COUNTERS[name]
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """Tokens in ``text`` using the backend selected for ``model_name``."""
+    if not text:
+        return 0
+    name, counter = counter_for(model_name)
+    key = (name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+
+    with _cache_lock:
+        n = _cache.get(key)
+        if n is not None:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+            return n
+        _cache_stats["misses"] += 1
+
+    n = counter.count(text)
+    with _cache_lock:
+        _cache[key] = n
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return n
+
+
+def cache_info() -> Dict[str, int]:
+    """Hit / miss / size counters of the count_tokens cache."""
+    with _cache_lock:
+        return dict(_cache_stats, size=len(_cache), maxsize=CACHE_SIZE)
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def estimate_tokens(text: str) -> int:
+    """Token estimate used by the app: words / 0.75, truncated."""
+    return COUNTERS["regex"].count(text)
@@ -0,0 +1,249 @@
+"""
+uncertainty.py  –  Monte Carlo confidence intervals for the impact model.
+
+Every number in DEFAULTS is a point estimate.  UNCERTAINTY assigns a
+distribution around each of them (node power, GPU / non-GPU utilisation,
+PUE, WUEsite, WUEsrc, CIF); impact_percentiles() draws the parameters,
+evaluates eq_energy → eq_water / eq_carbon on NumPy arrays and returns
+percentiles per (model, provider).
+
+The utilisation is centred on the model's share at its batch (or at
+``batch_size``), as in calculate_impact, and with ``prompt_tokens`` the
+request is timed by the model's phase parameters, as in
+calculate_phase_impact; so the median tracks those calculators for any
+tables.
+
+Draws are evaluated in chunks of ``chunk_size`` so the temporaries stay
+bounded; only the three result arrays (8 bytes × draws each) are kept
+for the percentiles.  Each parameter has its own random stream derived
+from the seed and the parameter's name (e.g. env/azure-us/pue), so
+
+    * the same seed gives the same result whatever the chunk size, and
+    * models sharing hardware or a provider see the same draws of it,
+      which keeps comparisons between pairs consistent.
+
+Library entry point:
+    impact_percentiles(tokens_out=1000, draws=1_000_000, seed=0)
+        → {(model, provider): {"energy_kwh": {2.5: …, 50: …, 97.5: …}, …}}
+
+Command line:
+    python -m emissions_counter.uncertainty --tokens 1000 --draws 1000000
+"""
+
+import argparse
+import json
+import sys
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .core import (current_defaults, eq_carbon, eq_energy, eq_phase_energy, eq_water,
+                   model_phases, utilisation_at)
+
+
+DEFAULT_DRAWS       = 1_000_000
+DEFAULT_CHUNK       = 250_000
+DEFAULT_PERCENTILES = (2.5, 50.0, 97.5)
+
+# Field → (distribution, spread).  Every distribution is centred on the
+# DEFAULTS value:
+#   "normal"      sd = spread × value, clipped at 0
+#   "lognormal"   median = value, sigma of log = spread
+#   "uniform"     value × [1 − spread, 1 + spread]
+#   "triangular"  value × [1 − spread, 1 + spread], mode = value
+#   "fixed"       no uncertainty
+UNCERTAINTY: Dict[str, Tuple[str, float]] = {
+    "node_kw":  ("normal",     0.05),
+    "gpu":      ("lognormal",  0.30),
+    "non_gpu":  ("lognormal",  0.30),
+    "pue":      ("triangular", 0.08),
+    "wue_site": ("lognormal",  0.35),
+    "wue_src":  ("lognormal",  0.35),
+    "cif":      ("normal",     0.15),
+}
+
+OUTPUTS = ("energy_kwh", "water_l", "carbon_kg")
+
+Percentiles = Dict[str, Dict[float, float]]
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Parameter streams
+# ────────────────────────────────────────────────────────────────────
+class ParameterStream:
+    """Reproducible draws of one DEFAULTS entry, consumed chunk by chunk."""
+
+    def __init__(self, name: str, value: float, dist: str, spread: float, seed: int):
+        self.value  = value
+        self.dist   = dist
+        self.spread = spread
+        seq = np.random.SeedSequence(seed, spawn_key=(zlib.crc32(name.encode("utf-8")),))
+        self.rng = np.random.Generator(np.random.PCG64(seq))
+
+    def draw(self, n: int) -> np.ndarray:
+        v, s = self.value, self.spread
+        if self.dist == "fixed" or s == 0:
+            return np.full(n, v)
+        if self.dist == "normal":
+            return np.maximum(self.rng.normal(v, s * abs(v), n), 0.0)
+        if self.dist == "lognormal":
+            return v * np.exp(self.rng.normal(0.0, s, n))
+        if self.dist == "uniform":
+            return self.rng.uniform(v * (1 - s), v * (1 + s), n)
+        if self.dist == "triangular":
+            return self.rng.triangular(v * (1 - s), v, v * (1 + s), n)
+        raise ValueError(f"unknown distribution {self.dist!r}")
+
+
+def _streams(
+    model_name: str, provider: str, seed: int,
+    cfg: Dict[str, Dict], spec: Dict[str, Tuple[str, float]],
+    batch_size: Optional[float] = None,
+) -> Dict[str, ParameterStream]:
+    m   = cfg["models"][model_name]
+    hw  = cfg["hardware"][m["hardware"]]
+    env = cfg["env"][provider]
+    # one request's share at the batch it is served at, as in request_it_kw
+    batch = model_phases(model_name, cfg)["batch"] if batch_size is None else batch_size
+    gpu, non_gpu = utilisation_at(cfg["utilisation"][m["class"]], batch)
+    ut  = {"gpu": gpu, "non_gpu": non_gpu}
+    sources = {
+        "node_kw":  (f"hardware/{m['hardware']}", hw),
+        "gpu":      (f"utilisation/{m['class']}", ut),
+        "non_gpu":  (f"utilisation/{m['class']}", ut),
+        "pue":      (f"env/{provider}", env),
+        "wue_site": (f"env/{provider}", env),
+        "wue_src":  (f"env/{provider}", env),
+        "cif":      (f"env/{provider}", env),
+    }
+    streams = {}
+    for field, (prefix, entry) in sources.items():
+        dist, spread = spec.get(field, ("fixed", 0.0))
+        streams[field] = ParameterStream(f"{prefix}/{field}", entry[field], dist, spread, seed)
+    return streams
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Simulation
+# ────────────────────────────────────────────────────────────────────
+def simulate_impact(
+    model_name: str,
+    provider: str = "azure-us",
+    tokens_out: float = 1000,
+    tps: float = 400,
+    latency_s: float = 0.075,
+    draws: int = DEFAULT_DRAWS,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK,
+    cfg: Optional[Dict[str, Dict]] = None,
+    spec: Optional[Dict[str, Tuple[str, float]]] = None,
+    prompt_tokens: Optional[float] = None,
+    batch_size: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return ``draws`` samples of (energy_kWh, water_L, carbon_kg) for one pair.
+
+    With ``prompt_tokens`` the request is timed by the model's prefill /
+    decode / ttft parameters and ``tps`` / ``latency_s`` are unused.
+    """
+    cfg  = current_defaults() if cfg is None else cfg
+    spec = UNCERTAINTY if spec is None else spec
+    streams = _streams(model_name, provider, seed, cfg, spec, batch_size)
+    phases = model_phases(model_name, cfg)
+
+    energy = np.empty(draws)
+    water  = np.empty(draws)
+    carbon = np.empty(draws)
+    for start in range(0, draws, chunk_size):
+        n = min(chunk_size, draws - start)
+        p = {field: stream.draw(n) for field, stream in streams.items()}
+        part = slice(start, start + n)
+        if prompt_tokens is None:
+            e = eq_energy(tokens_out, tps, latency_s, p["node_kw"], p["gpu"], p["non_gpu"], p["pue"])
+        else:
+            e = eq_phase_energy(prompt_tokens, tokens_out, phases["prefill_tps"], phases["decode_tps"],
+                                phases["ttft_s"], p["node_kw"], p["gpu"], p["non_gpu"], p["pue"])
+        energy[part] = e
+        water[part]  = eq_water(e, p["pue"], p["wue_site"], p["wue_src"])
+        carbon[part] = eq_carbon(e, p["cif"])
+    return energy, water, carbon
+
+
+def impact_percentiles(
+    model_names: Optional[Iterable[str]] = None,
+    providers: Optional[Iterable[str]] = None,
+    tokens_out: float = 1000,
+    tps: float = 400,
+    latency_s: float = 0.075,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    draws: int = DEFAULT_DRAWS,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK,
+    cfg: Optional[Dict[str, Dict]] = None,
+    spec: Optional[Dict[str, Tuple[str, float]]] = None,
+    prompt_tokens: Optional[float] = None,
+    batch_size: Optional[float] = None,
+) -> Dict[Tuple[str, str], Percentiles]:
+    """
+    Percentiles of energy / water / carbon per (model, provider).
+
+    Defaults to every model and provider in ``cfg``.  The result maps
+    each pair to {"energy_kwh": {p: value}, "water_l": …, "carbon_kg": …}.
+    ``prompt_tokens`` and ``batch_size`` are as in simulate_impact.
+    """
+    cfg = current_defaults() if cfg is None else cfg
+    model_names = list(cfg["models"]) if model_names is None else list(model_names)
+    providers   = list(cfg["env"]) if providers is None else list(providers)
+    qs = list(percentiles)
+
+    out: Dict[Tuple[str, str], Percentiles] = {}
+    for model_name in model_names:
+        for provider in providers:
+            samples = simulate_impact(model_name, provider, tokens_out, tps, latency_s,
+                                      draws, seed, chunk_size, cfg, spec, prompt_tokens, batch_size)
+            out[model_name, provider] = {
+                name: dict(zip(qs, np.percentile(values, qs).tolist()))
+                for name, values in zip(OUTPUTS, samples)
+            }
+    return out
+
+
+# ────────────────────────────────────────────────────────────────────
+#  Command line
+# ────────────────────────────────────────────────────────────────────
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m emissions_counter.uncertainty",
+        description="Monte Carlo percentiles of energy / water / carbon per model and provider.",
+    )
+    parser.add_argument("--model", action="append", help="model (repeatable; default: all)")
+    parser.add_argument("--provider", action="append", help="provider (repeatable; default: all)")
+    parser.add_argument("--tokens", type=float, default=1000, help="output tokens (default: 1000)")
+    parser.add_argument("--tps", type=float, default=400)
+    parser.add_argument("--latency", type=float, default=0.075)
+    parser.add_argument("--prompt-tokens", type=float, default=None,
+                        help="time the request by the model's prefill / decode parameters")
+    parser.add_argument("--batch-size", type=float, default=None,
+                        help="concurrent requests (default: each model's batch)")
+    parser.add_argument("--draws", type=int, default=DEFAULT_DRAWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK)
+    parser.add_argument("--percentiles", type=float, nargs="+", default=list(DEFAULT_PERCENTILES))
+    args = parser.parse_args(argv)
+
+    results = impact_percentiles(
+        args.model, args.provider, args.tokens, args.tps, args.latency,
+        args.percentiles, args.draws, args.seed, args.chunk_size,
+        prompt_tokens=args.prompt_tokens, batch_size=args.batch_size,
+    )
+    for (model_name, provider), stats in results.items():
+        row = {"model": model_name, "provider": provider}
+        for name, values in stats.items():
+            row[name] = {f"p{q:g}": v for q, v in values.items()}
+        print(json.dumps(row))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
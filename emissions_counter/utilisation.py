@@ -0,0 +1,107 @@
+"""
+utilisation.py  –  Dense index of per-request power by concurrency.
+
+core.utilisation_at() reads a class's utilisation curve for one batch
+size.  Evaluating it per request does not vectorise, so UtilisationIndex
+tabulates core.request_it_kw() for every model at every integer batch
+size 1..top, where ``top`` is the last knot of any curve (beyond it the
+curves are flat, and it is at most core.MAX_BATCH).  A batch of requests
+with per-request concurrency is then two array gathers and one linear
+blend:
+
+    index = UtilisationIndex()
+    it_kw = index.it_kw(model_codes, model_names, batch_size)
+
+Integer batch sizes give exactly the scalar result; fractional ones are
+interpolated between the neighbouring integers, which is the same line
+as the curve's as long as no knot (nor the one-node cap of
+core.utilisation_at) falls between them.  The index
+rebuilds itself on the next lookup after the coefficients change; the
+built state is published in one assignment, so concurrent lookups see
+either the old or the new index, never a mix.
+"""
+
+from typing import Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .core import BATCH_SCALING, MAX_BATCH, _Active, _snapshot, request_it_kw
+
+
+class _Index(NamedTuple):
+    version: int
+    rows: Dict[str, int]
+    it_kw: np.ndarray
+
+
+class UtilisationIndex:
+    """IT kW of one request, by model and integer batch size."""
+
+    def __init__(self):
+        self._index = _Index(-1, {}, np.empty((0, 0)))     # built on the first lookup
+
+    @staticmethod
+    def _build(active: _Active) -> _Index:
+        cfg = active.cfg
+        knots = [BATCH_SCALING["batch"][-1]]
+        knots += [u["by_batch"]["batch"][-1] for u in cfg["utilisation"].values() if "by_batch" in u]
+        top = max(1, int(np.ceil(max(knots))))
+        if top > MAX_BATCH:
+            raise ValueError(f"utilisation curve knot {max(knots)} is above MAX_BATCH ({MAX_BATCH})")
+
+        names = list(cfg["models"])
+        it_kw = np.empty((len(names), top + 1))
+        for row, model_name in enumerate(names):
+            it_kw[row] = [request_it_kw(model_name, max(b, 1), cfg) for b in range(top + 1)]
+        return _Index(active.version, {name: row for row, name in enumerate(names)}, it_kw)
+
+    def rebuild(self, active: Optional[_Active] = None) -> None:
+        """Tabulate every model from the current tables (or the given snapshot)."""
+        self._index = self._build(_snapshot() if active is None else active)
+
+    def _current(self, active: Optional[_Active]) -> _Index:
+        active = _snapshot() if active is None else active
+        index = self._index
+        if index.version != active.version:
+            index = self._index = self._build(active)
+        return index
+
+    @property
+    def top(self) -> int:
+        """Largest tabulated batch size."""
+        return self._index.it_kw.shape[1] - 1
+
+    def it_kw(
+        self,
+        codes: np.ndarray,
+        model_names: Sequence[str],
+        batch_size,
+        active: Optional[_Active] = None,
+    ) -> np.ndarray:
+        """
+        IT kW per request.
+
+        ``codes`` index into ``model_names`` (as returned by np.unique);
+        ``batch_size`` is a scalar or one value per request.  Batch sizes
+        below 1 count as 1; NaN or infinite ones raise ValueError.
+        ``active`` is the core snapshot to read the tables from (default:
+        the current one).
+        """
+        index = self._current(active)
+        try:
+            rows = np.array([index.rows[name] for name in model_names], dtype=np.intp)[codes]
+        except KeyError as exc:
+            raise KeyError(exc.args[0]) from None
+
+        top = index.it_kw.shape[1] - 1
+        b = np.asarray(batch_size, dtype=float)
+        if not np.isfinite(b).all():
+            raise ValueError(f"batch sizes must be finite numbers, got {float(b[~np.isfinite(b)].flat[0])!r}")
+        b = np.clip(b, 1.0, top)
+        lo = np.floor(b).astype(np.intp)
+        out = index.it_kw[rows, lo]
+        frac = b - lo
+        if np.any(frac):
+            hi = np.minimum(lo + 1, top)
+            out = out + (index.it_kw[rows, hi] - out) * frac
+        return out
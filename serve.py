@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Production launcher: uvicorn serving asgi:app with several worker processes.
+
+    python serve.py                    # Dash UI + impact API
+    python serve.py --api-only         # impact API only, no Dash import
+    python serve.py --workers 8 --port 8000
+
+Defaults come from PORT / SPACE_PORT and WEB_CONCURRENCY (falling back to
+the CPU count).  uvloop and httptools are used when installed.
+
+With more than one worker the live fleet totals (POST /api/v1/events,
+GET /api/v1/fleet, the fleet dashboard) are kept by a single aggregator
+in a separate manager process that every worker talks to, so each worker
+reports the whole fleet (see emissions_counter/fleet.py).
+"""
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the emissions calculator with uvicorn")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int,
+                        default=int(os.environ.get('PORT', os.environ.get('SPACE_PORT', 7860))))
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument('--api-only', action='store_true',
+                        help='serve only /api/v1/impact and /healthz')
+    parser.add_argument('--backlog', type=int, default=4096)
+    args = parser.parse_args()
+
+    if args.api_only:
+        # Read by asgi.py in every worker process
+        os.environ['API_ONLY'] = 'true'
+
+    fleet_manager = None
+    if args.workers > 1 and 'FLEET_ADDRESS' not in os.environ:
+        # Read by api.py in every worker process
+        from emissions_counter.fleet import format_address, serve_shared
+        authkey = os.urandom(16)
+        fleet_manager = serve_shared(authkey)
+        os.environ['FLEET_ADDRESS'] = format_address(fleet_manager.address)
+        os.environ['FLEET_AUTHKEY'] = authkey.hex()
+
+    import uvicorn
+
+    print(f"Starting uvicorn on port {args.port} with {args.workers} worker(s)...")
+    uvicorn.run(
+        'asgi:app',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        backlog=args.backlog,
+        proxy_headers=True,
+        access_log=False,
+        timeout_keep_alive=5,
+    )
+    if fleet_manager is not None:
+        fleet_manager.shutdown()
+
+
+if __name__ == '__main__':
+    main()
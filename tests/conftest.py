@@ -0,0 +1,12 @@
+"""Shared fixtures: every test starts and ends with the built-in tables."""
+
+import pytest
+
+from emissions_counter.core import DEFAULTS, install_defaults
+
+
+@pytest.fixture(autouse=True)
+def builtin_tables():
+    install_defaults(DEFAULTS)
+    yield
+    install_defaults(DEFAULTS)
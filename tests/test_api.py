@@ -0,0 +1,97 @@
+"""The Flask JSON API: results, and HTTP 400 for every kind of bad input."""
+
+import json
+import time
+
+import flask
+import pytest
+
+from api import NDJSON, register_api
+from emissions_counter.core import calculate_impact
+
+
+@pytest.fixture(scope="module")
+def client():
+    server = flask.Flask(__name__)
+    register_api(server)
+    return server.test_client()
+
+
+def test_impact_matches_calculate_impact(client):
+    body = {"requests": [{"id": "a", "model": "o3", "tokens_out": 812},
+                         {"model": "GPT-4o", "provider": "aws-us", "tokens_out": 10, "tps": 50}]}
+    out = client.post("/api/v1/impact", json=body).get_json()
+    assert out["results"][0] == dict(zip(("id", "energy_kwh", "water_l", "carbon_kg"),
+                                          ("a", *calculate_impact("o3", 812))))
+    assert out["results"][1]["energy_kwh"] == calculate_impact("GPT-4o", 10, 50, provider="aws-us")[0]
+    assert out["totals"]["requests"] == 2
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"requests": "o3"},                                  "expected a JSON list"),
+    ([{"tokens_out": 1}],                                 "requests[0]: missing or invalid field"),
+    (["o3"],                                              "requests[0]: missing or invalid field"),
+    ([{"model": "o3", "tokens_out": 1}, {"model": "o3", "tokens_out": -5}],
+                                                          "requests[1]: tokens_out must be a finite number >= 0"),
+    ([{"model": "o3", "tokens_out": "x"}],                "requests[0]: non-numeric tokens_out 'x'"),
+    ([{"model": "o3", "tokens_out": None}],               "requests[0]: tokens_out must be"),
+    ([{"model": "o3", "tokens_out": 1, "tps": 0}],        "requests[0]: tps must be a finite number > 0"),
+    ([{"model": "o3", "tokens_out": 1, "latency_s": -1}], "requests[0]: latency_s must be"),
+    ([{"model": "GPT-5", "tokens_out": 1}],               "unknown model or provider: ('GPT-5', 'azure-us')"),
+    ([{"model": "o3", "tokens_out": 1, "provider": "moon"}], "unknown model or provider"),
+])
+def test_impact_rejects_bad_batches(client, body, message):
+    response = client.post("/api/v1/impact", json=body)
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_impact_rejects_non_json(client):
+    response = client.post("/api/v1/impact", data="nope", content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "request body must be JSON"
+
+
+def test_ndjson_body_rejects_bad_first_chunk(client):
+    body = json.dumps({"model": "o3", "tokens_out": 1}) + "\n" + json.dumps({"model": "o3", "tokens_out": -1})
+    response = client.post("/api/v1/impact", data=body, content_type=NDJSON)
+    assert response.status_code == 400
+    assert "requests[1]: tokens_out" in response.get_json()["error"]
+
+
+def test_ndjson_round_trip(client):
+    body = "".join(json.dumps({"model": "o3", "tokens_out": t}) + "\n" for t in (1, 2, 3))
+    response = client.post("/api/v1/impact", data=body, content_type=NDJSON)
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [r["energy_kwh"] for r in rows] == [calculate_impact("o3", t)[0] for t in (1, 2, 3)]
+
+
+@pytest.mark.parametrize("ts, message", [
+    ("yesterday-ish", 'invalid "ts"'),
+    (time.time() + 3600, "in the future"),
+    (0, "old"),
+])
+def test_events_reject_bad_timestamps(client, ts, message):
+    response = client.post("/api/v1/events", json=[{"model": "o3", "tokens_out": 1, "ts": ts}])
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_events_reject_bad_values(client):
+    body = json.dumps({"model": "o3", "tokens_out": 1}) + "\n" + json.dumps({"model": "o3", "tokens_out": "x"})
+    response = client.post("/api/v1/events", data=body, content_type=NDJSON)
+    assert response.status_code == 400
+    assert "requests[1]: non-numeric tokens_out" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("window", ["abc", "0", "-5", "nan"])
+def test_fleet_rejects_bad_windows(client, window):
+    response = client.get(f"/api/v1/fleet?window={window}")
+    assert response.status_code == 400
+
+
+def test_events_feed_the_fleet_totals(client):
+    before = client.get("/api/v1/fleet").get_json()["total"]["requests"]
+    response = client.post("/api/v1/events", json=[{"model": "o3", "tokens_out": 1, "ts": time.time()}])
+    assert response.get_json() == {"ingested": 1}
+    assert client.get("/api/v1/fleet").get_json()["total"]["requests"] == before + 1
@@ -0,0 +1,36 @@
+"""The app's chart and counters agree on every model's numbers."""
+
+import pytest
+
+dash_app = pytest.importorskip("app")
+
+from emissions_counter import tokens
+from emissions_counter.core import calculate_phase_impact
+from emissions_counter.tokens import CharRatioCounter, register_counter
+
+PROMPT = "Please summarise the following paragraph in two short sentences for a newsletter."
+
+
+@pytest.fixture
+def o3_counts_characters(monkeypatch):
+    register_counter("chars", CharRatioCounter())
+    monkeypatch.setitem(tokens.MODEL_TOKENIZERS, "o3", "chars")
+
+
+def test_chart_counts_each_models_prompt_with_its_tokenizer(o3_counts_characters):
+    key = ("o3", "GPT-4o")
+    prompt_tokens = dash_app.chart_prompt_tokens(PROMPT, key)
+    assert prompt_tokens == tuple(dash_app.estimate_prompt_tokens(PROMPT, m) for m in key)
+    assert prompt_tokens[0] != prompt_tokens[1]
+
+    _, co2, energy, water = dash_app.chart_values(key, prompt_tokens, 500)
+    for i, model in enumerate(key):
+        e, w, c = dash_app.selected_model_impact(prompt_tokens[i], 500, model)
+        assert (energy[i], water[i], co2[i]) == (e * 1000, w * 1000, c * 1000)
+
+
+def test_chart_accepts_one_count_for_every_model():
+    assert dash_app.chart_values(("o3", "GPT-4o"), 40, 300) == dash_app.chart_values(("o3", "GPT-4o"), (40, 40), 300)
+    models, _, energy, _ = dash_app.chart_values((), 40, 300)
+    assert models == ["o3"]
+    assert energy == [calculate_phase_impact("o3", 40, 300)[0] * 1000]
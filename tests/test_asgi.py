@@ -0,0 +1,114 @@
+"""The ASGI front end answers the API itself, with the same 400s as Flask."""
+
+import asyncio
+import importlib
+import json
+import time
+
+import pytest
+
+from api import NDJSON
+from emissions_counter.core import calculate_impact
+
+
+@pytest.fixture(scope="module")
+def asgi():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("API_ONLY", "true")          # never import the Dash app
+        return importlib.import_module("asgi").ImpactASGI()
+
+
+def call(app, method, path, body=b"", content_type="application/json", query=b"", parts=1):
+    """Run one request through ``app``; returns (status, body bytes)."""
+    size = max(1, -(-len(body) // parts))
+    pieces = [body[i:i + size] for i in range(0, len(body), size)] or [b""]
+    messages = [{"type": "http.request", "body": p, "more_body": i < len(pieces) - 1}
+                for i, p in enumerate(pieces)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query,
+             "headers": [(b"content-type", content_type.encode())]}
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def post_json(app, path, obj):
+    status, body = call(app, "POST", path, json.dumps(obj).encode())
+    return status, json.loads(body)
+
+
+def test_impact_matches_calculate_impact(asgi):
+    status, out = post_json(asgi, "/api/v1/impact", [{"model": "o3", "tokens_out": 812}])
+    assert status == 200
+    assert out["results"][0]["energy_kwh"] == calculate_impact("o3", 812)[0]
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"requests": 3},                                     "expected a JSON list"),
+    ([{"tokens_out": 1}],                                 "requests[0]: missing or invalid field"),
+    ([{"model": "o3", "tokens_out": 1}, {"model": "o3", "tokens_out": -5}],
+                                                          "requests[1]: tokens_out must be a finite number >= 0"),
+    ([{"model": "o3", "tokens_out": "x"}],                "requests[0]: non-numeric tokens_out 'x'"),
+    ([{"model": "o3", "tokens_out": 1, "tps": 0}],        "requests[0]: tps must be a finite number > 0"),
+    ([{"model": "GPT-5", "tokens_out": 1}],               "unknown model or provider"),
+])
+def test_impact_rejects_bad_batches(asgi, body, message):
+    status, out = post_json(asgi, "/api/v1/impact", body)
+    assert status == 400
+    assert message in out["error"]
+
+
+def test_impact_rejects_non_json(asgi):
+    status, body = call(asgi, "POST", "/api/v1/impact", b"nope")
+    assert (status, json.loads(body)) == (400, {"error": "request body must be JSON"})
+
+
+def test_ndjson_body_rejects_bad_records(asgi):
+    body = (json.dumps({"model": "o3", "tokens_out": 1}) + "\n"
+            + json.dumps({"model": "o3", "tokens_out": 1, "latency_s": -1}) + "\n").encode()
+    status, out = call(asgi, "POST", "/api/v1/impact", body, NDJSON, parts=3)
+    assert status == 400
+    assert "requests[1]: latency_s must be" in json.loads(out)["error"]
+
+
+def test_ndjson_round_trip_in_pieces(asgi):
+    body = "".join(json.dumps({"model": "o3", "tokens_out": t}) + "\n" for t in range(1, 6)).encode()
+    status, out = call(asgi, "POST", "/api/v1/impact", body, NDJSON, parts=4)
+    assert status == 200
+    rows = [json.loads(line) for line in out.decode().splitlines()]
+    assert [r["energy_kwh"] for r in rows] == [calculate_impact("o3", t)[0] for t in range(1, 6)]
+
+
+def test_events_reject_bad_records(asgi):
+    status, out = post_json(asgi, "/api/v1/events", [{"model": "o3", "tokens_out": 1, "ts": time.time() + 3600}])
+    assert status == 400 and "in the future" in out["error"]
+    body = (json.dumps({"model": "o3", "tokens_out": 1}) + "\n"
+            + json.dumps({"model": "o3", "tokens_out": None}) + "\n").encode()
+    status, out = call(asgi, "POST", "/api/v1/events", body, NDJSON)
+    out = json.loads(out)
+    assert status == 400 and "requests[1]: tokens_out" in out["error"]
+
+
+@pytest.mark.parametrize("window", [b"abc", b"0", b"-1"])
+def test_fleet_rejects_bad_windows(asgi, window):
+    status, _ = call(asgi, "GET", "/api/v1/fleet", query=b"window=" + window)
+    assert status == 400
+
+
+def test_events_feed_the_fleet_totals(asgi):
+    _, before = call(asgi, "GET", "/api/v1/fleet")
+    status, out = post_json(asgi, "/api/v1/events", [{"model": "o3", "tokens_out": 1, "ts": time.time()}])
+    assert (status, out) == (200, {"ingested": 1})
+    _, after = call(asgi, "GET", "/api/v1/fleet")
+    assert json.loads(after)["total"]["requests"] == json.loads(before)["total"]["requests"] + 1
+
+
+def test_wrong_method_and_unknown_path(asgi):
+    assert call(asgi, "GET", "/api/v1/impact")[0] == 405
+    assert call(asgi, "GET", "/nowhere")[0] == 404
@@ -0,0 +1,71 @@
+"""Vectorised results match the scalar calculators element for element."""
+
+import numpy as np
+import pytest
+
+from emissions_counter.batch import calculate_impact_batch, calculate_phase_impact_batch
+from emissions_counter.core import DEFAULTS, calculate_impact, calculate_phase_impact
+
+MODELS    = list(DEFAULTS["models"])
+PROVIDERS = list(DEFAULTS["env"])
+
+
+def _cases(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.choice(MODELS, n).tolist(),
+        rng.choice(PROVIDERS, n).tolist(),
+        rng.integers(0, 4000, n).tolist(),
+        rng.integers(0, 8000, n).tolist(),
+    )
+
+
+def test_impact_batch_matches_scalar():
+    models, providers, tokens_out, _ = _cases()
+    tps = np.linspace(50, 900, len(models)).tolist()
+    latency = np.linspace(0, 2, len(models)).tolist()
+    e, w, c = calculate_impact_batch(models, tokens_out, tps, latency, providers)
+    for i, row in enumerate(zip(models, tokens_out, tps, latency, providers)):
+        m, t, s, l, p = row
+        assert (e[i], w[i], c[i]) == calculate_impact(m, t, s, l, provider=p)
+
+
+def test_phase_batch_matches_scalar():
+    models, providers, tokens_out, prompt = _cases()
+    e, w, c = calculate_phase_impact_batch(models, prompt, tokens_out, providers)
+    for i, (m, p, t, q) in enumerate(zip(models, providers, tokens_out, prompt)):
+        assert (e[i], w[i], c[i]) == calculate_phase_impact(m, q, t, p)
+
+
+@pytest.mark.parametrize("batch_size", [1, 8, 32, 4096])
+def test_scalar_batch_size_matches_scalar(batch_size):
+    models, providers, tokens_out, prompt = _cases(100)
+    e, w, c = calculate_phase_impact_batch(models, prompt, tokens_out, providers, batch_size)
+    for i, (m, p, t, q) in enumerate(zip(models, providers, tokens_out, prompt)):
+        expected = calculate_phase_impact(m, q, t, p, batch_size=batch_size)
+        assert (e[i], w[i], c[i]) == pytest.approx(expected, rel=1e-12)
+
+
+def test_per_request_batch_size_matches_scalar():
+    models, providers, tokens_out, prompt = _cases(300)
+    batch = np.random.default_rng(1).integers(1, 200, len(models)).tolist()
+    e, w, c = calculate_phase_impact_batch(models, prompt, tokens_out, providers, batch)
+    for i, (m, p, t, q, b) in enumerate(zip(models, providers, tokens_out, prompt, batch)):
+        expected = calculate_phase_impact(m, q, t, p, batch_size=b)
+        assert (e[i], w[i], c[i]) == pytest.approx(expected, rel=1e-12)
+
+    e, w, c = calculate_impact_batch(models, tokens_out, providers=providers, batch_size=batch)
+    for i, (m, p, t, b) in enumerate(zip(models, providers, tokens_out, batch)):
+        expected = calculate_impact(m, t, provider=p, batch_size=b)
+        assert (e[i], w[i], c[i]) == pytest.approx(expected, rel=1e-12)
+
+
+def test_scalars_broadcast_and_empty_batches():
+    e, w, c = calculate_impact_batch("o3", [100, 200])
+    assert list(e) == [calculate_impact("o3", 100)[0], calculate_impact("o3", 200)[0]]
+    assert all(len(v) == 0 for v in calculate_impact_batch([], []))
+
+
+def test_unknown_model_raises_key_error():
+    with pytest.raises(KeyError):
+        calculate_impact_batch(["o3", "no-such-model"], [1, 2])
@@ -0,0 +1,104 @@
+"""Sharded accounting: totals do not depend on the worker, shard or chunk layout."""
+
+import gzip
+import json
+import math
+import random
+
+import numpy as np
+import pytest
+
+from emissions_counter.batch import calculate_impact_batch
+from emissions_counter.core import DEFAULTS
+from emissions_counter.parallel import ExactSum, account_parallel, group_units, plan_shards
+
+
+@pytest.fixture(scope="module")
+def log(tmp_path_factory):
+    rng = random.Random(0)
+    records = [
+        {"model": rng.choice(list(DEFAULTS["models"])),
+         "provider": rng.choice(list(DEFAULTS["env"])),
+         "tokens_out": rng.randint(0, 5000),
+         "tps": rng.uniform(20, 900),
+         "latency_s": rng.uniform(0, 3),
+         "ts": 1_700_000_000 + rng.randint(0, 4 * 3600)}
+        for _ in range(3000)
+    ]
+    path = tmp_path_factory.mktemp("logs") / "requests.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+    return str(path), records
+
+
+def _expected(records, bucket_s=None):
+    """Correctly rounded per-group sums of the per-request results."""
+    e, w, c = calculate_impact_batch(
+        [r["model"] for r in records], [r["tokens_out"] for r in records],
+        [r["tps"] for r in records], [r["latency_s"] for r in records],
+        [r["provider"] for r in records])
+    groups = {}
+    for r, ei, wi, ci in zip(records, e.tolist(), w.tolist(), c.tolist()):
+        bucket = None if bucket_s is None else r["ts"] // bucket_s * bucket_s
+        groups.setdefault((r["model"], r["provider"], bucket), []).append((ei, wi, ci))
+    return {
+        key: (len(rows), *(math.fsum(col) for col in zip(*rows)))
+        for key, rows in groups.items()
+    }
+
+
+@pytest.mark.parametrize("workers, chunk_size, min_shard_bytes", [
+    (1, 50_000, 1 << 30),
+    (1, 7, 1 << 30),
+    (1, 100, 4096),
+    (3, 13, 4096),
+    (4, 1000, 1),
+])
+def test_totals_are_exact_for_any_layout(log, workers, chunk_size, min_shard_bytes):
+    path, records = log
+    got = account_parallel([path], workers, None, chunk_size, min_shard_bytes)
+    assert got == _expected(records)
+
+
+def test_bucketed_totals_are_exact(log):
+    path, records = log
+    one = account_parallel([path], 1, 3600)
+    assert one == _expected(records, 3600)
+    assert account_parallel([path], 3, 3600, 17, 2048) == one
+
+
+def test_shards_cover_the_file_once(log, tmp_path):
+    path, records = log
+    gz = tmp_path / "more.jsonl.gz"
+    with gzip.open(gz, "wt") as fh:
+        fh.write(json.dumps(records[0]) + "\n")
+    shards = plan_shards([path, str(gz)], workers=4, min_shard_bytes=1)
+    plain = [s for s in shards if s[0] == path]
+    assert plain[0][1] == 0 and all(a[2] == b[1] for a, b in zip(plain, plain[1:]))
+    assert (str(gz), 0, None) in shards
+    totals = account_parallel([path, str(gz)], 2, None, 500, 1)
+    assert sum(n for n, *_ in totals.values()) == len(records) + 1
+
+
+def test_exact_sum_is_order_independent():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(0, 1, 1000) * 10.0 ** rng.integers(-300, 300, 1000),
+                             [5e-324, -5e-324, 1e300, -1e300]])
+    expected = math.fsum(values.tolist())
+    for seed in range(5):
+        order = np.random.default_rng(seed).permutation(len(values))
+        codes = np.zeros(len(values), dtype=np.intp)
+        halves = [group_units(codes[part], values[order][part], 1)[0]
+                  for part in (slice(0, 400), slice(400, None))]
+        total = ExactSum()
+        for half in reversed(halves) if seed % 2 else halves:
+            total.merge(half)
+        assert total.value == expected
+
+
+def test_exact_sum_carries_nan_and_infinity():
+    s = ExactSum()
+    for x in (1.0, math.inf, 2.0):
+        s.add(x)
+    assert s.value == math.inf
+    s.add(math.nan)
+    assert math.isnan(s.value)
@@ -0,0 +1,112 @@
+"""Coefficient registry: validation, installation and the watch thread."""
+
+import copy
+import json
+import os
+import time
+
+import pytest
+
+from emissions_counter.core import DEFAULTS, MAX_BATCH, coefficients_version, current_defaults
+from emissions_counter.registry import Registry, validate_tables
+
+
+def _tables(**changes):
+    cfg = copy.deepcopy(DEFAULTS)
+    for path, value in changes.items():
+        *keys, field = path.split("__")
+        entry = cfg
+        for key in keys:
+            entry = entry[key]
+        entry[field] = value
+    return cfg
+
+
+def test_builtin_tables_are_valid():
+    assert validate_tables(copy.deepcopy(DEFAULTS)) == []
+
+
+@pytest.mark.parametrize("changes, problem", [
+    ({"env__azure-us__pue": 0.9},                   "env.azure-us.pue"),
+    ({"env__azure-us__cif": "high"},                "expected a number"),
+    ({"hardware__H100__node_kw": -1},               "hardware.H100.node_kw"),
+    ({"utilisation__XL__gpu": 1.5},                 "utilisation.XL.gpu"),
+    ({"utilisation__XL__non_gpu": True},            "expected a number"),
+    ({"utilisation__XL__gpu": 0.95},                "more than the whole node"),
+    ({"models__o3__hardware": "TPU"},               "unknown hardware"),
+    ({"models__o3__class": "XXL"},                  "unknown utilisation class"),
+    ({"models__o3__decode_tps": 0},                 "models.o3.decode_tps"),
+    ({"models__o3__batch": MAX_BATCH + 1},          "models.o3.batch"),
+])
+def test_invalid_tables_are_rejected(changes, problem):
+    problems = validate_tables(_tables(**changes))
+    assert any(problem in p for p in problems), problems
+
+
+@pytest.mark.parametrize("curve, problem", [
+    ({"batch": [1, 8]},                                              "expected a mapping"),
+    ({"batch": [1, 8], "gpu": [0.5], "non_gpu": [0.1, 0.1]},         "same, non-zero length"),
+    ({"batch": [8, 1], "gpu": [0.5, 0.1], "non_gpu": [0.1, 0.1]},    "strictly increasing"),
+    ({"batch": [0, 8], "gpu": [0.5, 0.1], "non_gpu": [0.1, 0.1]},    "by_batch.batch[0]"),
+    ({"batch": [1, 8], "gpu": [0.8, 0.1], "non_gpu": [0.3, 0.1]},    "more than the whole node"),
+])
+def test_invalid_curves_are_rejected(curve, problem):
+    problems = validate_tables(_tables(utilisation__XL__by_batch=curve))
+    assert any(problem in p for p in problems), problems
+
+
+def test_missing_section_is_rejected():
+    cfg = copy.deepcopy(DEFAULTS)
+    del cfg["env"]
+    assert validate_tables(cfg) == ["env: missing or empty"]
+
+
+def test_invalid_file_is_not_installed(tmp_path):
+    path = tmp_path / "env.json"
+    path.write_text(json.dumps({"azure-us": {"pue": 0.5, "wue_site": 0, "wue_src": 0, "cif": 0}}))
+    version = coefficients_version()
+    with pytest.raises(ValueError, match="invalid tables"):
+        Registry(str(path)).reload()
+    assert coefficients_version() == version
+    assert current_defaults()["env"] == DEFAULTS["env"]
+
+
+def test_reload_installs_a_valid_directory(tmp_path):
+    (tmp_path / "env.json").write_text(json.dumps(
+        {"version": "v2", "azure-us": {"pue": 1.5, "wue_site": 0.3, "wue_src": 3.0, "cif": 0.4}}))
+    stamp = Registry(str(tmp_path)).reload()
+    assert stamp["label"] == "v2"
+    assert stamp["version"] == coefficients_version()
+    assert current_defaults()["env"]["azure-us"]["pue"] == 1.5
+    assert current_defaults()["models"] == DEFAULTS["models"]
+
+
+def _wait_for(condition, timeout_s=5.0):
+    deadline = time.monotonic() + timeout_s
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_watch_can_be_restarted_after_stop(tmp_path):
+    path = tmp_path / "env.json"
+
+    def write(pue):
+        path.write_text(json.dumps({"azure-us": {"pue": pue, "wue_site": 0.3, "wue_src": 3.0, "cif": 0.4}}))
+
+    write(1.2)
+    registry = Registry(str(path))
+    registry.reload()
+    registry.watch(0.01)
+    registry.stop()
+
+    registry.watch(0.01)
+    try:
+        write(1.3)
+        bump = time.time() + 10                 # make sure the mtime moves
+        os.utime(path, (bump, bump))
+        assert _wait_for(lambda: current_defaults()["env"]["azure-us"]["pue"] == 1.3)
+    finally:
+        registry.stop()
@@ -0,0 +1,59 @@
+"""JSONL ingestion: bad records stop the run with their line number."""
+
+import json
+
+import pytest
+
+from emissions_counter.core import calculate_impact
+from emissions_counter.stream import aggregate_impact, iter_chunks, main
+
+
+def _lines(*records):
+    return [r if isinstance(r, str) else json.dumps(r) for r in records]
+
+
+GOOD = {"model": "o3", "tokens_out": 100}
+
+
+@pytest.mark.parametrize("record, message", [
+    ({"model": "o3", "tokens_out": -1},                    "tokens_out must be a finite number >= 0"),
+    ({"model": "o3", "tokens_out": "many"},                "non-numeric tokens_out 'many'"),
+    ({"model": "o3", "tokens_out": None},                  "tokens_out must be a finite number >= 0"),
+    ({"model": "o3", "tokens_out": 10, "tps": 0},          "tps must be a finite number > 0"),
+    ({"model": "o3", "tokens_out": 10, "latency_s": -0.5}, "latency_s must be a finite number >= 0"),
+    ('{"model": "o3", "tokens_out": NaN}',                 "tokens_out must be a finite number >= 0"),
+    ('{"model": "o3", "tokens_out": Infinity}',            "tokens_out must be a finite number >= 0"),
+    ({"tokens_out": 10},                                   "invalid request record"),
+    ("{not json",                                          "invalid request record"),
+])
+def test_bad_record_reports_its_line(record, message):
+    lines = _lines(GOOD, "", GOOD, record, GOOD)
+    with pytest.raises(ValueError, match=r"^line 4: ") as exc:
+        list(iter_chunks(lines, chunk_size=2))
+    assert message in str(exc.value)
+
+
+def test_first_bad_row_wins_across_fields():
+    lines = _lines(GOOD, {"model": "o3", "tokens_out": 5, "tps": -1}, {"model": "o3", "tokens_out": "x"})
+    with pytest.raises(ValueError, match="^line 2: tps"):
+        list(iter_chunks(lines))
+
+
+def test_validation_can_be_skipped():
+    chunks = list(iter_chunks(_lines({"model": "o3", "tokens_out": -1}), validate=False))
+    assert chunks[0].tokens_out == [-1]
+
+
+def test_aggregate_and_command_line(tmp_path, capsys):
+    log = tmp_path / "log.jsonl"
+    log.write_text("\n".join(_lines(GOOD, GOOD, {"model": "GPT-4o", "tokens_out": 50,
+                                                 "provider": "aws-us"})) + "\n")
+    totals = aggregate_impact(str(log), chunk_size=2)
+    assert totals[("o3", "azure-us")][0] == 2
+    assert totals[("o3", "azure-us")][1] == 2 * calculate_impact("o3", 100)[0]
+    assert totals[("GPT-4o", "aws-us")][1] == calculate_impact("GPT-4o", 50, provider="aws-us")[0]
+
+    bad = tmp_path / "bad.jsonl"
+    bad.write_text("\n".join(_lines(GOOD, {"model": "o3", "tokens_out": 1, "tps": 0})) + "\n")
+    assert main([str(bad), "--aggregate"]) == 1
+    assert "line 2: tps must be a finite number > 0" in capsys.readouterr().err
@@ -0,0 +1,33 @@
+"""ImpactTable gives calculate_phase_impact's results bit for bit."""
+
+import random
+
+from emissions_counter.core import DEFAULTS, calculate_phase_impact, update_defaults
+from emissions_counter.tables import ImpactTable
+
+
+def test_lookup_matches_calculate_phase_impact():
+    table = ImpactTable(max_prompt_tokens=1000, max_tokens_out=500)
+    rng = random.Random(0)
+    for _ in range(2000):
+        model = rng.choice(list(DEFAULTS["models"]))
+        provider = rng.choice(list(DEFAULTS["env"]))
+        prompt, tokens_out = rng.randint(0, 1200), rng.randint(0, 600)   # some outside the table
+        assert (table.lookup(model, provider, prompt, tokens_out)
+                == calculate_phase_impact(model, prompt, tokens_out, provider))
+
+
+def test_fractional_counts_fall_back():
+    table = ImpactTable(100, 100)
+    assert table.lookup("o3", "azure-us", 10.5, 20) == calculate_phase_impact("o3", 10.5, 20, "azure-us")
+
+
+def test_table_follows_coefficient_changes():
+    table = ImpactTable(100, 100)
+    table.rebuild()
+    before = table.lookup("o3", "azure-us", 50, 50)
+    update_defaults("models", "o3", decode_tps=100, ttft_s=0.5)
+    update_defaults("env", "azure-us", pue=1.5)
+    after = table.lookup("o3", "azure-us", 50, 50)
+    assert after != before
+    assert after == calculate_phase_impact("o3", 50, 50, "azure-us")
@@ -0,0 +1,57 @@
+"""Concurrency-aware utilisation: one request never draws more than its node."""
+
+import copy
+import math
+
+import numpy as np
+import pytest
+
+from emissions_counter.batch import calculate_impact_batch
+from emissions_counter.core import (
+    DEFAULTS, MAX_BATCH, install_defaults, request_it_kw, utilisation_at,
+)
+from emissions_counter.utilisation import UtilisationIndex
+
+
+def test_one_request_is_capped_at_one_node():
+    # XL at batch 1 scales gpu + non_gpu = 0.65 above 1 before the cap
+    assert request_it_kw("o3", 1) == DEFAULTS["hardware"]["H100x2"]["node_kw"]
+    gpu, non_gpu = utilisation_at({"gpu": 0.9, "non_gpu": 0.6}, 1)
+    assert gpu + non_gpu == pytest.approx(1.0)
+    assert gpu / non_gpu == pytest.approx(0.9 / 0.6)
+
+
+def test_curve_shares_are_capped_too():
+    curve = {"by_batch": {"batch": [1, 8], "gpu": [0.8, 0.1], "non_gpu": [0.5, 0.05]}}
+    gpu, non_gpu = utilisation_at(curve, 1)
+    assert gpu + non_gpu == pytest.approx(1.0)
+    assert utilisation_at(curve, 8) == (0.1, 0.05)
+
+
+@pytest.mark.parametrize("batch", [math.nan, math.inf, -math.inf])
+def test_non_finite_batch_is_rejected(batch):
+    with pytest.raises(ValueError):
+        utilisation_at(DEFAULTS["utilisation"]["XL"], batch)
+    with pytest.raises(ValueError):
+        UtilisationIndex().it_kw(np.array([0]), ["o3"], [batch])
+    with pytest.raises(ValueError):
+        calculate_impact_batch(["o3"], [100], batch_size=[batch])
+
+
+def test_index_matches_scalar_and_clips():
+    index = UtilisationIndex()
+    names = list(DEFAULTS["models"])
+    codes = np.repeat(np.arange(len(names)), 4)
+    batch = np.tile([0.5, 1, 8, MAX_BATCH * 2], len(names))
+    got = index.it_kw(codes, names, batch)
+    for code, b, kw in zip(codes, batch, got):
+        assert kw == request_it_kw(names[code], min(max(b, 1), index.top))
+
+
+def test_index_rebuilds_when_the_tables_change():
+    index = UtilisationIndex()
+    before = index.it_kw(np.array([0]), ["o3"], 8)[0]
+    cfg = copy.deepcopy(DEFAULTS)
+    cfg["hardware"]["H100x2"]["node_kw"] *= 2
+    install_defaults(cfg)
+    assert index.it_kw(np.array([0]), ["o3"], 8)[0] == pytest.approx(2 * before)